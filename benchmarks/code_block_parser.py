@@ -0,0 +1,72 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+Compare the incremental code block parser with re-running a regex over the
+streamed text. Run from the app directory:
+
+	python benchmarks/code_block_parser.py
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leet_devops.api.code_block_parser import FENCE, CodeBlockParser
+
+
+def benchmark():
+	definition = {
+		"doctype": "DocType",
+		"name": "Sample",
+		"module": "Sample",
+		"fields": [
+			{"fieldname": f"field_{i}", "fieldtype": "Data", "label": f"Field {i}"}
+			for i in range(40)
+		]
+	}
+	section = (
+		"Here is the next DocType, with a short explanation of the fields.\n\n"
+		"```json\n" + json.dumps(definition, indent=2) + "\n```\n\n"
+		"And an example controller:\n\n"
+		"```python\nclass Sample(Document):\n\tpass\n```\n\n"
+	)
+	reply = section * 200
+	pattern = re.compile(r"```json\s*(.*?)\s*```", re.DOTALL)
+
+	print(f"reply: {len(reply) / 1024:.0f} KiB, {reply.count(FENCE) // 2} blocks")
+
+	start = time.perf_counter()
+	expected = pattern.findall(reply)
+	print(f"regex over the full text:   {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+	for chunk_size in (16, 128, 4096):
+		chunks = [reply[i:i + chunk_size] for i in range(0, len(reply), chunk_size)]
+		parser = CodeBlockParser(["json"])
+
+		start = time.perf_counter()
+		blocks = []
+		for chunk in chunks:
+			blocks.extend(parser.feed(chunk))
+		elapsed = time.perf_counter() - start
+
+		if [block.content for block in blocks] != expected:
+			raise SystemExit(f"parser found other blocks than the regex with {chunk_size} char chunks")
+		print(f"parser, {chunk_size:4d} char chunks: {elapsed * 1000:8.2f} ms")
+
+	# What re-running the regex after every chunk would cost
+	chunks = [reply[i:i + 128] for i in range(0, len(reply), 128)]
+	start = time.perf_counter()
+	received = ""
+	for chunk in chunks[:len(chunks) // 10]:
+		received += chunk
+		pattern.findall(received)
+	print(f"regex per 128 char chunk, first 10% only: {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+	benchmark()
@@ -0,0 +1,326 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+
+import frappe
+from frappe.utils import now_datetime
+
+from leet_devops.api import claude_client, retry, session_events
+from leet_devops.api.claude_api import get_doctype_system_prompt, parse_doctype_from_response
+
+BATCH_PROMPTS = {
+	"Validate": """Review the current definition of this DocType for mistakes: invalid field types, Link and Select fields without options, fieldnames that are not snake_case, a field_order that doesn't match the fields, and anything else Frappe would reject on import.
+
+Respond with the corrected complete definition in a single ```json code block. If the definition is already correct, return it unchanged.""",
+	"Regenerate": """Write the complete definition of this DocType again, following Frappe best practices. Keep existing fieldnames where they are still suitable, so data and code referring to them keeps working.
+
+Respond with the definition in a single ```json code block."""
+}
+
+# Ingested rows are committed in chunks of this size
+INGEST_COMMIT_EVERY = 50
+
+
+@frappe.whitelist()
+def submit_batch(batch_name):
+	"""
+	Queue the submission of a Claude Batch
+	"""
+	try:
+		batch = frappe.get_doc("Claude Batch", batch_name)
+		batch.check_permission("write")
+
+		if batch.status not in ("Draft", "Failed") or batch.batch_id:
+			return {"error": f"Batch {batch.name} was submitted already"}
+
+		frappe.enqueue(
+			"leet_devops.api.batch_api.process_batch_submission",
+			queue="long",
+			enqueue_after_commit=True,
+			batch_name=batch.name
+		)
+
+		return {
+			"success": True,
+			"message": f"Batch {batch.name} queued for submission"
+		}
+
+	except Exception as e:
+		return {
+			"error": str(e)
+		}
+
+
+@frappe.whitelist()
+def refresh_batch(batch_name):
+	"""
+	Poll a submitted Claude Batch now instead of waiting for the hourly job,
+	or retry the ingestion of an ended batch that failed
+	"""
+	try:
+		batch = frappe.get_doc("Claude Batch", batch_name)
+		batch.check_permission("write")
+
+		if batch.status == "Failed" and batch.ended_on:
+			enqueue_ingestion(batch)
+			batch.save(ignore_permissions=True)
+			frappe.db.commit()
+		elif batch.status == "Submitted":
+			poll_batch(batch)
+		else:
+			return {"error": f"Batch {batch.name} is not in progress"}
+
+		return {
+			"success": True,
+			"status": batch.status,
+			"processing_status": batch.processing_status
+		}
+
+	except Exception as e:
+		return {
+			"error": str(e)
+		}
+
+
+def get_batch_rows(batch):
+	"""DocType Session rows covered by a batch"""
+	filters = {"parenttype": "App Development Session"}
+	if batch.session:
+		filters["parent"] = batch.session
+
+	rows = frappe.get_all(
+		"DocType Session",
+		filters=filters,
+		fields=["name", "parent", "doctype_name", "doctype_definition"],
+		order_by="parent asc, idx asc"
+	)
+
+	if batch.mode == "Validate":
+		# Nothing to review without a definition
+		rows = [row for row in rows if row.doctype_definition]
+
+	return rows
+
+
+def process_batch_submission(batch_name):
+	"""
+	Background job: build one request per DocType Session and submit them
+	as a single Message Batch
+	"""
+	batch = frappe.get_doc("Claude Batch", batch_name)
+	if batch.batch_id:
+		return
+
+	try:
+		settings = frappe.get_single("Claude API Settings")
+		if not settings.api_key:
+			raise Exception("Claude API Key not configured")
+
+		rows = get_batch_rows(batch)
+		if not rows:
+			raise Exception("No DocType Sessions to process")
+
+		prompt = BATCH_PROMPTS[batch.mode]
+		request_map = {}
+		batch_requests = []
+
+		for row in rows:
+			# Child row names are unique and valid custom_ids
+			request_map[row.name] = {
+				"session": row.parent,
+				"doctype_name": row.doctype_name,
+				"definition_hash": get_definition_hash(row.doctype_definition)
+			}
+			batch_requests.append({
+				"custom_id": row.name,
+				"params": {
+					"model": settings.model,
+					"max_tokens": settings.max_tokens,
+					"temperature": settings.temperature,
+					"system": get_doctype_system_prompt(row),
+					"messages": [{"role": "user", "content": prompt}]
+				}
+			})
+
+		timeout = claude_client.get_timeout(settings)
+		response, _ = retry.call_with_retry(
+			settings,
+			lambda attempt: (claude_client.create_batch(settings, batch_requests, timeout), None)
+		)
+		if response.status_code != 200:
+			raise Exception(f"API Error: {response.status_code}\n{response.text}")
+
+		result = response.json()
+		batch.update({
+			"batch_id": result["id"],
+			"status": "Submitted",
+			"processing_status": result.get("processing_status"),
+			"request_count": len(batch_requests),
+			"request_map": json.dumps(request_map, indent=2),
+			"submitted_on": now_datetime(),
+			"error": None,
+			"error_details": None
+		})
+
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Claude Batch Submit Error")
+		batch.status = "Failed"
+		batch.error = str(e)
+		batch.error_details = frappe.get_traceback()
+
+	batch.save(ignore_permissions=True)
+	frappe.db.commit()
+
+
+def poll_batches():
+	"""
+	Scheduled job: check all submitted batches and ingest the ended ones
+	"""
+	for batch_name in frappe.get_all("Claude Batch", filters={"status": "Submitted"}, pluck="name"):
+		try:
+			poll_batch(frappe.get_doc("Claude Batch", batch_name))
+		except Exception:
+			frappe.log_error(frappe.get_traceback(), "Claude Batch Poll Error")
+
+
+def poll_batch(batch):
+	"""Update the progress of a batch and queue its ingestion once it ended"""
+	settings = frappe.get_single("Claude API Settings")
+	response = claude_client.get_batch(settings, batch.batch_id, claude_client.get_timeout(settings))
+	response.raise_for_status()
+
+	result = response.json()
+	counts = result.get("request_counts") or {}
+	batch.update({
+		"processing_status": result.get("processing_status"),
+		"succeeded_count": counts.get("succeeded", 0),
+		"errored_count": counts.get("errored", 0) + counts.get("canceled", 0) + counts.get("expired", 0)
+	})
+
+	if result.get("processing_status") == "ended":
+		batch.ended_on = now_datetime()
+		enqueue_ingestion(batch, result.get("results_url"))
+
+	batch.save(ignore_permissions=True)
+	frappe.db.commit()
+
+
+def enqueue_ingestion(batch, results_url=None):
+	batch.status = "Ended"
+	frappe.enqueue(
+		"leet_devops.api.batch_api.ingest_batch_results",
+		queue="long",
+		timeout=3600,
+		enqueue_after_commit=True,
+		batch_name=batch.name,
+		results_url=results_url
+	)
+
+
+def ingest_batch_results(batch_name, results_url=None):
+	"""
+	Background job: write the definitions of an ended batch back to its
+	DocType Session rows
+
+	Rows whose definition changed after the batch was submitted are skipped,
+	so manual edits made in the meantime are never overwritten.
+	"""
+	batch = frappe.get_doc("Claude Batch", batch_name)
+	if batch.status != "Ended":
+		return
+
+	settings = frappe.get_single("Claude API Settings")
+	request_map = batch.get_request_map()
+	prompt = BATCH_PROMPTS[batch.mode]
+	usage_by_session = {}
+	applied = skipped = processed = 0
+
+	try:
+		results = claude_client.iter_batch_results(
+			settings,
+			{"id": batch.batch_id, "results_url": results_url},
+			claude_client.get_timeout(settings)
+		)
+
+		for entry in results:
+			request = request_map.get(entry.get("custom_id"))
+			result = entry.get("result") or {}
+			if not request or result.get("type") != "succeeded":
+				continue
+
+			message = result.get("message") or {}
+			claude_client.add_usage(usage_by_session.setdefault(request["session"], {}), message.get("usage") or {})
+
+			if apply_batch_result(entry["custom_id"], request, prompt, claude_client.get_response_text(message)):
+				applied += 1
+			else:
+				skipped += 1
+
+			processed += 1
+			if processed % INGEST_COMMIT_EVERY == 0:
+				frappe.db.commit()
+
+		total_usage = {}
+		for session_name, usage in usage_by_session.items():
+			if frappe.db.exists("App Development Session", session_name):
+				frappe.get_doc("App Development Session", session_name).db_add_usage(usage)
+			claude_client.add_usage(total_usage, usage)
+
+		batch.update({
+			"status": "Ingested",
+			"applied_count": applied,
+			"skipped_count": skipped,
+			"usage": json.dumps(total_usage, indent=2),
+			"error": None,
+			"error_details": None
+		})
+
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(frappe.get_traceback(), "Claude Batch Ingest Error")
+		batch.reload()
+		batch.status = "Failed"
+		batch.error = str(e)
+		batch.error_details = frappe.get_traceback()
+
+	batch.save(ignore_permissions=True)
+	frappe.db.commit()
+
+
+def apply_batch_result(row_name, request, prompt, assistant_message):
+	"""
+	Write one batch reply to its DocType Session row
+
+	Returns True when the definition was updated.
+	"""
+	if not frappe.db.exists("DocType Session", row_name):
+		return False
+
+	row = frappe.get_doc("DocType Session", row_name)
+	if get_definition_hash(row.doctype_definition) != request["definition_hash"]:
+		# Edited after submission, the reply is based on an outdated definition
+		return False
+
+	parsed = parse_doctype_from_response(assistant_message)
+	if not parsed.get("success"):
+		return False
+
+	definition = json.dumps(parsed["doctype_definition"], indent=2)
+	if definition == row.doctype_definition:
+		return False
+
+	row.add_message("user", prompt)
+	row.add_message("assistant", assistant_message)
+	row.doctype_definition = definition
+	row.status = "Modified" if row.status == "Applied" else "Ready"
+	row.validate()
+	row.db_update()
+	session_events.publish_doctype_session(row)
+
+	return True
+
+
+def get_definition_hash(definition):
+	return hashlib.sha256((definition or "").encode("utf-8")).hexdigest()
@@ -5,18 +5,263 @@ import frappe
 import requests
 import json
 import os
+import queue
+import signal
 import subprocess
+import threading
+import time
+from collections import deque
 from frappe import _
+from frappe.utils import add_days, add_to_date, cint, get_bench_path, now_datetime, time_diff_in_seconds
+
+from leet_devops.api import (
+	claude_client, code_block_parser, context_builder, doctype_tool, file_manifest, json_patch, json_repair, migrate_queue,
+	rate_limiter, response_cache, retry, session_events
+)
+from leet_devops.leet_devops.doctype.doctype_definition_revision import doctype_definition_revision
+from leet_devops.leet_devops.doctype.extracted_doctype_definition import extracted_doctype_definition
+from leet_devops.leet_devops.doctype.file_change_log import file_change_log
+from leet_devops.leet_devops.doctype.session_message import session_message
+
+# A reply cut off by max_tokens inside a ```json block is continued at most this often
+MAX_CONTINUATIONS = 2
+
+# Code block language of the RFC 6902 patches asked for in DocType chats
+PATCH_LANGUAGE = "json-patch"
+
+# Seconds bench migrate may run before it is stopped, and the apply job around it,
+# which may first wait for the migrates of other applies
+MIGRATE_TIMEOUT = 900
+APPLY_JOB_TIMEOUT = migrate_queue.WAIT_TIMEOUT + MIGRATE_TIMEOUT + 600
+
+# Lines of bench migrate output kept for the apply result, older lines are dropped
+MIGRATE_OUTPUT_LINES = 500
+
+# Seconds between checks for a cancelled apply while migrate prints nothing
+MIGRATE_POLL_INTERVAL = 1
+
+APPLY_CANCEL_PREFIX = "leet_devops:apply_cancel:"
+
+# Finished Claude Chat Jobs are deleted after this many days, they repeat
+# the message and the reply
+CHAT_JOB_RETENTION_DAYS = 7
+
+
+class ApplyCancelled(Exception):
+	pass
+
 
 @frappe.whitelist()
-def send_message_to_claude(session_name, message, doctype_session_name=None):
+def send_message_to_claude(session_name, message, doctype_session_name=None, stream=0, stream_id=None):
 	"""
 	Send a message to Claude API and get response
-	
+
+	When "Run in Background" is enabled in Claude API Settings the call is
+	queued as a Claude Chat Job and the job name is returned right away.
+	The reply is then delivered by a `claude_job_update` realtime event and
+	can be polled with `get_chat_job`.
+
 	Args:
 		session_name: Name of the App Development Session
 		message: User's message
 		doctype_session_name: Optional - specific DocType Session to chat with
+		stream: Optional - push the reply token-by-token as `claude_stream` realtime events
+		stream_id: Optional - client generated id echoed in every stream event
+	"""
+	try:
+		settings = frappe.get_single("Claude API Settings")
+		if not settings.api_key:
+			return {"error": "Claude API Key not configured"}
+
+		if not settings.run_in_background:
+			return process_message(session_name, message, doctype_session_name, stream, stream_id)
+
+		frappe.has_permission("App Development Session", "write", session_name, throw=True)
+
+		job = frappe.get_doc({
+			"doctype": "Claude Chat Job",
+			"session": session_name,
+			"doctype_session_name": doctype_session_name,
+			"message": message,
+			"stream_id": stream_id if cint(stream) else None,
+			"status": "Queued"
+		}).insert(ignore_permissions=True)
+
+		frappe.enqueue(
+			"leet_devops.api.claude_api.process_chat_job",
+			queue=settings.job_queue or "long",
+			timeout=get_chat_job_timeout(settings),
+			enqueue_after_commit=True,
+			chat_job=job.name
+		)
+		frappe.db.commit()
+
+		return {
+			"success": True,
+			"queued": True,
+			"job": job.name,
+			"status": job.status
+		}
+
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Claude API Error")
+		return {
+			"error": str(e),
+			"traceback": frappe.get_traceback()
+		}
+
+
+def process_chat_job(chat_job):
+	"""
+	Background job: run a queued Claude Chat Job and publish its result
+	"""
+	job = frappe.get_doc("Claude Chat Job", chat_job)
+	if job.status != "Queued":
+		return
+
+	job.db_set("status", "Running", commit=True)
+	if job.generation:
+		publish_generation_update(job)
+
+	try:
+		if job.job_type == "Generate DocType":
+			result = generate_doctype_definition(job)
+		else:
+			result = process_message(
+				job.session,
+				job.message,
+				job.doctype_session_name,
+				stream=1 if job.stream_id else 0,
+				stream_id=job.stream_id
+			)
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Claude Chat Job Error")
+		result = {"error": str(e), "details": frappe.get_traceback()}
+
+	job.reload()
+	if result.get("error"):
+		job.status = "Failed"
+		job.error = result["error"]
+		job.error_details = result.get("details") or result.get("traceback")
+	else:
+		job.status = "Completed"
+		job.response = result.get("message")
+		job.usage = json.dumps(result.get("usage", {}), indent=2)
+
+	job.save(ignore_permissions=True)
+	frappe.db.commit()
+
+	if job.generation:
+		publish_generation_update(job)
+	else:
+		frappe.publish_realtime("claude_job_update", job.get_result(), user=job.owner)
+
+
+def get_chat_job_timeout(settings):
+	"""
+	Seconds a Claude Chat Job may run
+
+	Every call of a turn, the first one and each continuation, may wait for
+	rate limit capacity and run into the request timeout on every attempt,
+	with the longest `retry-after` honoured in between.
+	"""
+	attempts = (cint(settings.max_retries) or retry.DEFAULT_MAX_RETRIES) + 1
+	wait_timeout = cint(settings.rate_limit_wait_timeout) or rate_limiter.DEFAULT_WAIT_TIMEOUT
+	call_timeout = attempts * (wait_timeout + claude_client.get_timeout(settings)) + (attempts - 1) * retry.MAX_RETRY_AFTER
+	return (1 + MAX_CONTINUATIONS) * call_timeout + 60
+
+
+def fail_stale_chat_jobs(filters):
+	"""
+	Mark Queued and Running Claude Chat Jobs matching `filters` as Failed
+	once they are older than the job timeout
+
+	A job killed by the timeout never records its result, without this it
+	would stay Running and keep the chat waiting for it.
+	"""
+	settings = frappe.get_single("Claude API Settings")
+	cutoff = add_to_date(now_datetime(), seconds=-get_chat_job_timeout(settings))
+	stale = frappe.get_all(
+		"Claude Chat Job",
+		filters=dict(filters, status=["in", ["Queued", "Running"]], modified=["<", cutoff]),
+		pluck="name"
+	)
+	
+	for name in stale:
+		frappe.db.set_value("Claude Chat Job", name, {
+			"status": "Failed",
+			"error": "The job did not finish in time, please send the message again"
+		})
+	
+	if stale:
+		frappe.db.commit()
+
+
+def delete_old_chat_jobs():
+	"""
+	Scheduled job: fail chat jobs whose worker died and delete finished jobs
+	older than CHAT_JOB_RETENTION_DAYS
+	"""
+	fail_stale_chat_jobs({})
+	frappe.db.delete("Claude Chat Job", {
+		"status": ["in", ["Completed", "Failed"]],
+		"modified": ["<", add_days(now_datetime(), -CHAT_JOB_RETENTION_DAYS)]
+	})
+	frappe.db.commit()
+
+
+@frappe.whitelist()
+def get_chat_job(job_name):
+	"""
+	Poll the state of a Claude Chat Job
+	"""
+	try:
+		fail_stale_chat_jobs({"name": job_name})
+		job = frappe.get_doc("Claude Chat Job", job_name)
+		frappe.has_permission("App Development Session", "read", job.session, throw=True)
+		return job.get_result()
+
+	except Exception as e:
+		return {
+			"error": str(e)
+		}
+
+
+@frappe.whitelist()
+def get_active_chat_jobs(session_name):
+	"""
+	Get queued and running Claude Chat Jobs of a session, so a reloaded page
+	can pick up replies that are still being generated
+	"""
+	try:
+		frappe.has_permission("App Development Session", "read", session_name, throw=True)
+		fail_stale_chat_jobs({"session": session_name})
+
+		jobs = frappe.get_all(
+			"Claude Chat Job",
+			filters={
+				"session": session_name,
+				"generation": ["is", "not set"],
+				"status": ["in", ["Queued", "Running"]]
+			},
+			fields=["name", "status", "doctype_session_name", "message", "stream_id"],
+			order_by="creation asc"
+		)
+
+		return {
+			"success": True,
+			"jobs": jobs
+		}
+
+	except Exception as e:
+		return {
+			"error": str(e)
+		}
+
+
+def process_message(session_name, message, doctype_session_name=None, stream=0, stream_id=None):
+	"""
+	Call Claude for one chat turn and save both messages to the session
 	"""
 	try:
 		# Get API settings
@@ -27,10 +272,8 @@ def send_message_to_claude(session_name, message, doctype_session_name=None):
 		# Get session
 		session = frappe.get_doc("App Development Session", session_name)
 		
-		# Build conversation history for Claude
-		history = session.get_conversation_history()
-		
 		# Prepare system prompt based on context
+		patch_edits = False
 		if doctype_session_name:
 			# Get specific DocType session
 			doctype_session = None
@@ -42,21 +285,9 @@ def send_message_to_claude(session_name, message, doctype_session_name=None):
 			if not doctype_session:
 				return {"error": f"DocType Session {doctype_session_name} not found"}
 			
-			system_prompt = f"""You are a Frappe framework expert helping to develop the DocType: {doctype_session.doctype_name}.
-
-Current DocType Definition:
-{doctype_session.doctype_definition or 'Not yet defined'}
-
-Previous conversation about this DocType:
-{doctype_session.conversation_history or 'No previous conversation'}
-
-Your role:
-1. Help modify and improve this specific DocType
-2. Provide the complete updated JSON definition when changes are requested
-3. Explain your changes clearly
-4. Consider Frappe best practices for field types, naming, and structure
-
-Always respond with valid Frappe DocType JSON when providing definitions."""
+			# Changes to an existing definition come back as a patch, not the whole definition
+			patch_edits = bool(settings.json_patch_edits and doctype_session.doctype_definition)
+			system_prompt = get_doctype_system_prompt(doctype_session, patch_edits)
 		else:
 			# Main session - app level conversation
 			system_prompt = f"""You are a Frappe framework expert helping to develop a custom app called: {session.app_name}
@@ -95,13 +326,23 @@ Remember:
 - Follow naming conventions (snake_case for fieldnames)
 - Consider relationships between DocTypes"""
 		
-		# Prepare messages for Claude API
-		messages = []
-		for msg in history[-10:]:  # Last 10 messages for context
-			messages.append({
-				"role": msg["role"],
-				"content": msg["content"]
-			})
+		# Build conversation history for Claude, a DocType chat uses its own history
+		if doctype_session_name:
+			history = doctype_session.get_conversation_history()
+			summarized_count = 0
+		else:
+			history = session.get_conversation_history()
+			summarized_count = min(cint(session.summarized_message_count), len(history))
+			if summarized_count and session.conversation_summary:
+				system_prompt += f"""
+
+Summary of the earlier conversation (those messages are not repeated below):
+{session.conversation_summary}"""
+		
+		# Prepare messages for Claude API: newest messages that fit the token budget
+		budget = cint(settings.context_token_budget) or context_builder.DEFAULT_BUDGET
+		history_budget = budget - context_builder.estimate_tokens(system_prompt) - context_builder.estimate_tokens(message)
+		window_start, messages = context_builder.build_context(history, history_budget, min_start=summarized_count)
 		
 		# Add current message
 		messages.append({
@@ -110,12 +351,6 @@ Remember:
 		})
 		
 		# Call Claude API
-		headers = {
-			"x-api-key": settings.get_password("api_key"),
-			"anthropic-version": "2023-06-01",
-			"content-type": "application/json"
-		}
-		
 		payload = {
 			"model": settings.model,
 			"max_tokens": settings.max_tokens,
@@ -124,82 +359,157 @@ Remember:
 			"messages": messages
 		}
 		
-		# Retry logic with increased timeout
-		max_retries = 3
-		retry_count = 0
-		last_error = None
-		
-		# Get timeout from settings, default to 180 seconds (3 minutes)
-		api_timeout = settings.timeout if hasattr(settings, 'timeout') and settings.timeout else 180
-		
-		while retry_count < max_retries:
-			try:
-				response = requests.post(
-					settings.api_endpoint,
-					headers=headers,
-					json=payload,
-					timeout=api_timeout
-				)
-				
-				if response.status_code != 200:
-					return {
-						"error": f"API Error: {response.status_code}",
-						"details": response.text
-					}
-				
-				result = response.json()
-				assistant_message = result["content"][0]["text"]
-				
-				# Save messages to conversation history
-				if doctype_session_name:
-					# Update specific DocType session
-					for dt_sess in session.doctype_sessions:
-						if dt_sess.doctype_name == doctype_session_name:
-							dt_sess.add_message("user", message)
-							dt_sess.add_message("assistant", assistant_message)
-							break
-				else:
-					# Update main session
-					session.add_message("user", message)
-					session.add_message("assistant", assistant_message)
-				
-				session.save()
-				frappe.db.commit()
-				
-				return {
+		structured = bool(settings.structured_doctype_output) and not patch_edits
+		if structured:
+			# Definitions come back as parsed tool input instead of ```json blocks
+			doctype_tool.add_tool(payload)
+		
+		if settings.enable_prompt_caching:
+			# Cache the system prompt and the history already sent last turn
+			claude_client.add_cache_breakpoints(payload)
+		
+		use_response_cache = response_cache.is_enabled(settings)
+		if use_response_cache and stream_id:
+			# A resend of a request that was answered already, its turn is in
+			# the conversation, so only the reply is returned again
+			sent = response_cache.get_sent_reply(session.name, stream_id)
+			if sent:
+				return dict(sent, cached=True)
+		
+		# Serve an identical earlier request (double-click) from cache
+		if use_response_cache:
+			request_hash = response_cache.get_request_hash(
+				payload, session.name, doctype_session_name, history, message
+			)
+			cached = response_cache.get_response(request_hash)
+			if cached:
+				saved_definitions = save_tool_definitions(session, doctype_session_name, cached.get("definitions") or [])
+				save_chat_turn(session, message, cached["message"], doctype_session_name, origin=stream_id)
+				reply = {
 					"success": True,
-					"message": assistant_message,
-					"usage": result.get("usage", {})
+					"message": cached["message"],
+					"usage": cached.get("usage", {}),
+					"saved_definitions": saved_definitions
 				}
-				
-			except requests.exceptions.Timeout:
-				retry_count += 1
-				last_error = f"Request timeout (attempt {retry_count}/{max_retries})"
-				frappe.log_error(f"Claude API Timeout - Attempt {retry_count}", "Claude API Timeout")
-				
-				if retry_count < max_retries:
-					# Wait before retrying (exponential backoff)
-					import time
-					time.sleep(2 ** retry_count)  # 2, 4, 8 seconds
-					continue
-				else:
-					return {
-						"error": "Request timed out after multiple attempts. The API might be slow or overloaded. Please try again.",
-						"details": last_error
-					}
+				if stream_id:
+					response_cache.store_sent_reply(settings, session.name, stream_id, reply)
+				return dict(reply, cached=True)
+		
+		# Stream text deltas to the browser when requested and enabled
+		use_stream = bool(cint(stream) and settings.enable_streaming)
+		
+		# Get timeout from settings, default to 180 seconds (3 minutes)
+		api_timeout = claude_client.get_timeout(settings)
+		estimated_tokens = context_builder.estimate_request_tokens(payload)
+		
+		# Finished DocType definitions are announced while the reply is still streaming
+		definition_stream = code_block_parser.DocTypeDefinitionStream()
+		
+		def publish_delta(text):
+			publish_stream_event(stream_id, delta=text, definitions=definition_stream.feed(text) or None)
+		
+		def send(attempt):
+			# Wait for a fair turn under the limits shared by all workers
+			with rate_limiter.reserve(settings, estimated_tokens) as lease:
+				if use_stream:
+					if attempt:
+						# Drop the text streamed by the failed attempt
+						publish_stream_event(stream_id, reset=True)
+						definition_stream.reset()
 					
-			except requests.exceptions.ConnectionError as e:
-				return {
-					"error": "Connection error. Please check your internet connection.",
-					"details": str(e)
-				}
+					on_text = claude_client.TextDeltaPublisher(publish_delta)
+					response, result = claude_client.stream_message(
+						settings, payload, api_timeout, on_text=on_text
+					)
+					on_text.flush()
+				else:
+					response = claude_client.post_message(settings, payload, api_timeout)
+					result = response.json() if response.status_code == 200 else None
 				
-			except requests.exceptions.RequestException as e:
-				return {
-					"error": "Network error occurred.",
-					"details": str(e)
-				}
+				# Failed requests consumed nothing, return their reservation
+				lease.record_usage(result.get("usage", {}) if result else {})
+			
+			return response, result
 		
+		try:
+			response, result = retry.call_with_retry(settings, send)
+			
+		except requests.exceptions.Timeout as e:
+			return {
+				"error": "Request timed out after multiple attempts. The API might be slow or overloaded. Please try again.",
+				"details": str(e)
+			}
+			
+		except (retry.CircuitOpenError, rate_limiter.RateLimitTimeout) as e:
+			return {
+				"error": str(e)
+			}
+		
+		except requests.exceptions.ConnectionError as e:
+			return {
+				"error": "Connection error. Please check your internet connection.",
+				"details": str(e)
+			}
+			
+		except requests.exceptions.RequestException as e:
+			return {
+				"error": "Network error occurred.",
+				"details": str(e)
+			}
+		
+		if response.status_code != 200:
+			return {
+				"error": f"API Error: {response.status_code}",
+				"details": response.text
+			}
+		
+		result = continue_truncated_reply(settings, payload, result, publish_delta if use_stream else None)
+		
+		assistant_message = claude_client.get_response_text(result)
+		definitions = doctype_tool.get_definitions(result, session.app_title) if structured else []
+		if definitions:
+			assistant_message = doctype_tool.get_message_text(assistant_message, definitions)
+		
+		saved_definitions = save_tool_definitions(session, doctype_session_name, definitions)
+		patch_result = apply_definition_patch(session, doctype_session, assistant_message) if patch_edits else None
+		save_chat_turn(session, message, assistant_message, doctype_session_name, result.get("usage", {}), stream_id)
+		
+		if not doctype_session_name and window_start > summarized_count:
+			# Fold the messages that fell out of the window into the summary.
+			# Summarizing down to half the budget leaves headroom, so the
+			# window (and the prompt cache prefix) stays put for a few turns.
+			summary_upto, _ = context_builder.build_context(
+				history, history_budget // 2, min_start=window_start
+			)
+			frappe.enqueue(
+				"leet_devops.api.claude_api.update_conversation_summary",
+				queue=settings.job_queue or "long",
+				enqueue_after_commit=True,
+				session_name=session.name,
+				upto=summary_upto
+			)
+		
+		if use_response_cache:
+			response_cache.store_response(settings, request_hash, {
+				"message": assistant_message,
+				"usage": result.get("usage", {}),
+				"definitions": definitions
+			})
+		
+		reply = {
+			"success": True,
+			"message": assistant_message,
+			"usage": result.get("usage", {}),
+			"saved_definitions": saved_definitions,
+			"patch": patch_result
+		}
+		if use_response_cache and stream_id:
+			response_cache.store_sent_reply(settings, session.name, stream_id, reply)
+		
+		if use_stream:
+			publish_stream_event(stream_id, done=True)
+		
+		return dict(reply, streamed=use_stream)
 		
 	except Exception as e:
 		frappe.log_error(frappe.get_traceback(), "Claude API Error")
@@ -209,6 +519,389 @@ Remember:
 		}
 
 
+def continue_truncated_reply(settings, payload, result, on_text=None):
+	"""
+	Let Claude finish a reply that hit max_tokens inside a ```json or
+	```json-patch block
+	
+	The reply so far is sent back as a prefilled assistant turn, so only
+	the missing tail is generated instead of the whole reply again. Gives
+	up quietly on errors, the caller then repairs what it has.
+	
+	Returns `result` with the text of all parts joined and their usage
+	added up. `on_text` receives the text of each continuation.
+	"""
+	if (payload.get("tool_choice") or {}).get("type") == "tool":
+		# A forced tool call can't be combined with a prefill
+		return result
+	
+	for _ in range(MAX_CONTINUATIONS):
+		text = claude_client.get_response_text(result)
+		if result.get("stop_reason") != "max_tokens" or not code_block_parser.get_open_block(text, ["json", PATCH_LANGUAGE]):
+			break
+		
+		# The API rejects a prefill ending in whitespace
+		prefill = text.rstrip()
+		request = dict(payload, messages=payload["messages"] + [{"role": "assistant", "content": prefill}])
+		estimated_tokens = context_builder.estimate_request_tokens(request)
+		
+		def send(attempt):
+			with rate_limiter.reserve(settings, estimated_tokens) as lease:
+				response = claude_client.post_message(settings, request, claude_client.get_timeout(settings))
+				part = response.json() if response.status_code == 200 else None
+				lease.record_usage(part.get("usage", {}) if part else {})
+			return response, part
+		
+		try:
+			response, part = retry.call_with_retry(settings, send)
+		except (requests.exceptions.RequestException, retry.CircuitOpenError, rate_limiter.RateLimitTimeout):
+			break
+		
+		if response.status_code != 200:
+			break
+		
+		tail = claude_client.get_response_text(part)
+		if on_text and tail:
+			on_text(tail)
+		
+		result = dict(
+			result,
+			content=[{"type": "text", "text": prefill + tail}] + [
+				block for block in result.get("content", []) if block.get("type") != "text"
+			],
+			stop_reason=part.get("stop_reason"),
+			usage=claude_client.add_usage(dict(result.get("usage") or {}), part.get("usage") or {})
+		)
+	
+	return result
+
+
+def get_doctype_system_prompt(doctype_session, patch_edits=False):
+	"""
+	System prompt for a chat about one DocType of the app
+	
+	With `patch_edits` changes are asked for as a JSON Patch against the
+	stored definition, so a small change costs a few output tokens instead
+	of the whole definition.
+	"""
+	if not patch_edits:
+		return f"""You are a Frappe framework expert helping to develop the DocType: {doctype_session.doctype_name}.
+
+Current DocType Definition:
+{doctype_session.doctype_definition or 'Not yet defined'}
+
+Your role:
+1. Help modify and improve this specific DocType
+2. Provide the complete updated JSON definition when changes are requested
+3. Explain your changes clearly
+4. Consider Frappe best practices for field types, naming, and structure
+
+Always respond with valid Frappe DocType JSON when providing definitions."""
+	
+	try:
+		fields = json.loads(doctype_session.doctype_definition).get("fields") or []
+		positions = ", ".join(f"{i} {field.get('fieldname')}" for i, field in enumerate(fields))
+	except (ValueError, AttributeError):
+		positions = "unknown"
+	
+	return f"""You are a Frappe framework expert helping to develop the DocType: {doctype_session.doctype_name}.
+
+Current DocType Definition:
+{doctype_session.doctype_definition}
+
+Positions in "fields": {positions}
+
+Your role:
+1. Help modify and improve this specific DocType
+2. Explain your changes clearly
+3. Consider Frappe best practices for field types, naming, and structure
+
+When changes are requested, do not repeat the definition. Respond with an RFC 6902 JSON Patch against the current definition in a single ```{PATCH_LANGUAGE} code block, for example:
+```{PATCH_LANGUAGE}
+[
+  {{"op": "replace", "path": "/fields/3/label", "value": "Customer Name"}},
+  {{"op": "add", "path": "/fields/-", "value": {{"fieldname": "remarks", "fieldtype": "Small Text", "label": "Remarks"}}}},
+  {{"op": "add", "path": "/field_order/-", "value": "remarks"}}
+]
+```
+Operations are applied in order, so array indices shift after every add or remove. Keep "field_order" in step with "fields"."""
+
+
+def apply_definition_patch(session, doctype_session, assistant_message):
+	"""
+	Apply the ```json-patch blocks of a reply to the definition of a
+	DocType Session and record the result as a new revision
+	
+	Returns None when the reply has no patch, else a dict with the new
+	`revision` or the `error` that kept the patch from being applied; a
+	failing or cut off patch changes nothing. The row is written directly,
+	the caller commits.
+	"""
+	if code_block_parser.get_open_block(assistant_message, [PATCH_LANGUAGE]):
+		# The reply was cut off inside a block, its operations are incomplete
+		return {"error": "The patch could not be applied: the reply ended inside the patch, ask for it again"}
+	
+	blocks = code_block_parser.get_code_blocks(assistant_message, [PATCH_LANGUAGE])
+	if not blocks:
+		return None
+	
+	try:
+		patch = []
+		for block in blocks:
+			operations, repairs = json_repair.repair_json(block.content)
+			if json_repair.is_truncated(repairs):
+				raise ValueError(f"the patch is incomplete ({', '.join(repairs)}), ask for it again")
+			patch.extend(operations if isinstance(operations, list) else [operations])
+		
+		previous = doctype_session.doctype_definition
+		definition = json_patch.apply_patch(json.loads(previous), patch)
+	except ValueError as e:
+		return {"error": f"The patch could not be applied: {e}"}
+	
+	if not code_block_parser.is_doctype_definition(definition) or not isinstance(definition.get("fields"), list):
+		return {"error": "The patch could not be applied: the result is not a DocType definition"}
+	
+	fieldnames = [field.get("fieldname") for field in definition["fields"] if isinstance(field, dict)]
+	if "field_order" in definition and sorted(definition["field_order"] or []) != sorted(fieldnames):
+		# Fields were added or removed without updating field_order
+		definition["field_order"] = fieldnames
+	
+	doctype_session.doctype_definition = json.dumps(definition, indent=2)
+	doctype_session.status = "Modified" if doctype_session.status == "Applied" else "Ready"
+	doctype_session.validate()
+	doctype_session.db_update()
+	session_events.publish_doctype_session(doctype_session)
+	
+	revision = doctype_definition_revision.add_revision(
+		session.name,
+		doctype_session.doctype_name,
+		definition,
+		patch,
+		previous_definition=previous
+	)
+	
+	return {
+		"revision": revision,
+		"operations": len(patch)
+	}
+
+
+def update_conversation_summary(session_name, upto):
+	"""
+	Background job: fold main session messages before index `upto` into the
+	rolling conversation summary
+	"""
+	settings = frappe.get_single("Claude API Settings")
+	session = frappe.get_doc("App Development Session", session_name)
+	summarized_count = cint(session.summarized_message_count)
+	history = session.get_conversation_history()
+	upto = min(cint(upto), len(history))
+	
+	if upto <= summarized_count:
+		# Already covered by a previous run
+		return
+	
+	payload = {
+		"model": settings.model,
+		"max_tokens": context_builder.SUMMARY_MAX_TOKENS,
+		"temperature": 0,
+		"messages": [{
+			"role": "user",
+			"content": context_builder.get_summary_prompt(
+				session.conversation_summary,
+				history[summarized_count:upto]
+			)
+		}]
+	}
+	
+	estimated_tokens = context_builder.estimate_request_tokens(payload)
+	
+	def send(attempt):
+		with rate_limiter.reserve(settings, estimated_tokens) as lease:
+			response = claude_client.post_message(settings, payload, claude_client.get_timeout(settings))
+			result = response.json() if response.status_code == 200 else None
+			lease.record_usage(result.get("usage", {}) if result else {})
+		return response, result
+	
+	response, result = retry.call_with_retry(settings, send)
+	if response.status_code != 200:
+		frappe.log_error(response.text, "Conversation Summary Error")
+		return
+	
+	session.db_add_usage(result.get("usage", {}))
+	frappe.db.set_value("App Development Session", session.name, {
+		"conversation_summary": claude_client.get_response_text(result),
+		"summarized_message_count": upto
+	}, update_modified=False)
+	frappe.db.commit()
+
+
+def save_chat_turn(session, message, assistant_message, doctype_session_name=None, usage=None, origin=None):
+	"""
+	Save one user/assistant exchange to the session and commit
+
+	Both messages are appended as Session Message rows and the usage totals
+	are added in place, so a turn is one small transaction no matter how
+	long the conversation already is. `origin` is the stream id of the
+	request, the page that sent it skips the realtime events of the turn.
+	"""
+	session.add_message("user", message, doctype_session_name, origin=origin)
+	session.add_message("assistant", assistant_message, doctype_session_name, usage=usage, origin=origin)
+	
+	if usage:
+		session.db_add_usage(usage)
+	
+	frappe.db.commit()
+
+
+def save_tool_definitions(session, doctype_session_name, definitions):
+	"""
+	Write the DocType definitions Claude returned through the DocType tool
+	
+	In a DocType chat the last definition replaces the one of that DocType.
+	In the main chat DocTypes without a definition get theirs, and unknown
+	ones a new DocType Session; defined DocTypes are changed in their own
+	chat only. Rows are written directly, the caller commits.
+	
+	Returns the names of the DocTypes written.
+	"""
+	if doctype_session_name:
+		definitions = definitions[-1:]
+	
+	rows = {dt.doctype_name: dt for dt in session.doctype_sessions}
+	saved = []
+	
+	for definition in definitions:
+		doctype_name = doctype_session_name or definition["name"]
+		row = rows.get(doctype_name)
+		
+		if row and row.doctype_definition and not doctype_session_name:
+			continue
+		
+		is_new = not row
+		if is_new:
+			row = rows[doctype_name] = session.append("doctype_sessions", {
+				"doctype_name": doctype_name,
+				"doctype_title": doctype_name.replace("_", " ").title()
+			})
+		
+		row.doctype_definition = json.dumps(definition, indent=2)
+		row.status = "Modified" if row.status == "Applied" else "Ready"
+		row.validate()
+		if is_new:
+			row.db_insert()
+		else:
+			row.db_update()
+		
+		session_events.publish_doctype_session(row)
+		saved.append(doctype_name)
+	
+	return saved
+
+
+def publish_stream_event(stream_id, delta=None, reset=False, done=False, definitions=None):
+	"""
+	Push a streaming update for `stream_id` to the requesting user
+	
+	`definitions` are the DocType definitions whose ```json block closed
+	within this delta.
+	"""
+	frappe.publish_realtime(
+		"claude_stream",
+		{
+			"stream_id": stream_id,
+			"delta": delta,
+			"reset": reset,
+			"done": done,
+			"definitions": definitions
+		},
+		user=frappe.session.user
+	)
+
+
+@frappe.whitelist()
+def get_session_overview(session_name):
+	"""
+	Session metadata and DocType tabs for the chat pages, without message
+	histories or DocType definitions
+	"""
+	try:
+		frappe.has_permission("App Development Session", "read", session_name, throw=True)
+		
+		session = frappe.db.get_value(
+			"App Development Session",
+			session_name,
+			["name", "app_name", "app_title", "status", "created_date", "description"],
+			as_dict=True
+		)
+		session.doctype_sessions = frappe.get_all(
+			"DocType Session",
+			filters={"parent": session_name, "parenttype": "App Development Session"},
+			fields=["doctype_name", "doctype_title", "status", "fields_count"],
+			order_by="idx asc"
+		)
+		
+		return {
+			"success": True,
+			"session": session
+		}
+		
+	except Exception as e:
+		return {
+			"error": str(e)
+		}
+
+
+@frappe.whitelist()
+def get_session_messages(session_name, doctype_session_name=None, limit=50, before=None, after=None):
+	"""
+	Get the latest messages of a conversation, the page before a cursor, or
+	only the messages newer than the last one a client has cached
+	
+	Args:
+		session_name: Name of the App Development Session
+		doctype_session_name: Optional - DocType whose conversation to read
+		limit: Optional - number of messages per page (at most 200)
+		before: Optional - cursor returned by the previous page, to load the
+			messages older than it
+		after: Optional - name of the newest message the client has; if it
+			is unknown or too far behind, the latest page is returned with
+			`reset` set and the client has to drop its copy
+	"""
+	try:
+		frappe.has_permission("App Development Session", "read", session_name, throw=True)
+		
+		limit = min(max(cint(limit), 1), 200)
+		
+		if after:
+			messages = session_message.get_messages_after(
+				session_name, doctype_session_name, limit, after
+			)
+			if messages is not None:
+				return {
+					"success": True,
+					"messages": messages,
+					"delta": True
+				}
+		
+		messages, has_more = session_message.get_message_page(
+			session_name, doctype_session_name, limit, before
+		)
+		
+		return {
+			"success": True,
+			"messages": messages,
+			"has_more": has_more,
+			"cursor": messages[0].name if messages else None,
+			"reset": bool(after)
+		}
+		
+	except Exception as e:
+		return {
+			"error": str(e)
+		}
+
+
 @frappe.whitelist()
 def parse_doctype_from_response(response_text):
 	"""
@@ -216,15 +909,12 @@ def parse_doctype_from_response(response_text):
 	"""
 	try:
 		# Try to extract JSON from code blocks
-		import re
-		json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-		
-		if json_match:
-			json_str = json_match.group(1)
-			doctype_def = json.loads(json_str)
+		blocks = code_block_parser.get_code_blocks(response_text, ["json"])
+		json_values = code_block_parser.load_json_blocks(blocks)
+		if json_values:
 			return {
 				"success": True,
-				"doctype_definition": doctype_def
+				"doctype_definition": json_values[0]
 			}
 		
 		# Try direct JSON parsing
@@ -237,6 +927,27 @@ def parse_doctype_from_response(response_text):
 		except:
 			pass
 		
+		# Repair malformed blocks, or the block a max_tokens cut-off left open
+		candidates = [block.content for block in blocks]
+		open_block = code_block_parser.get_open_block(response_text, ["json"])
+		if open_block:
+			candidates.append(open_block.content)
+		elif response_text.lstrip().startswith("{"):
+			candidates.append(response_text)
+		
+		for candidate in candidates:
+			try:
+				doctype_def, repairs = json_repair.repair_json(candidate)
+			except ValueError:
+				continue
+			
+			if isinstance(doctype_def, dict):
+				return {
+					"success": True,
+					"doctype_definition": doctype_def,
+					"repairs": repairs
+				}
+		
 		return {
 			"success": False,
 			"message": "No valid JSON definition found in response"
@@ -273,6 +984,7 @@ def create_doctype_session(session_name, doctype_name, doctype_definition=None):
 		})
 		
 		session.save()
+		session_events.publish_doctype_session(session.doctype_sessions[-1])
 		frappe.db.commit()
 		
 		return {
@@ -288,81 +1000,326 @@ def create_doctype_session(session_name, doctype_name, doctype_definition=None):
 
 
 @frappe.whitelist()
-def scan_and_create_doctype_sessions(session_name):
+def scan_and_create_doctype_sessions(session_name):
+	"""
+	Scan conversation history and create DocType sessions for all found definitions
+	
+	Only the messages added since the last scan are parsed, their
+	definitions go to the Extracted DocType Definition index. Sessions are
+	then created from the index for the DocTypes that have none yet.
+	"""
+	try:
+		session = frappe.get_doc("App Development Session", session_name)
+		
+		last_scanned = extracted_doctype_definition.index_new_messages(
+			session.name, session.last_scanned_message
+		)
+		if last_scanned != session.last_scanned_message:
+			session.db_set("last_scanned_message", last_scanned, update_modified=False)
+		
+		# Track existing DocType sessions
+		existing_doctypes = [dt.doctype_name for dt in session.doctype_sessions]
+		
+		filters = {"session": session.name}
+		if existing_doctypes:
+			filters["doctype_name"] = ["not in", existing_doctypes]
+		
+		found_doctypes = []
+		created_count = 0
+		
+		# The first definition found for a DocType is used, as before
+		for indexed in frappe.get_all(
+			"Extracted DocType Definition",
+			filters=filters,
+			fields=["doctype_name", "definition"],
+			order_by="creation asc"
+		):
+			doctype_name = indexed.doctype_name
+			if doctype_name in found_doctypes:
+				continue
+			
+			found_doctypes.append(doctype_name)
+			session.append("doctype_sessions", {
+				"doctype_name": doctype_name,
+				"doctype_title": doctype_name.replace("_", " ").title(),
+				"status": "Draft",
+				"doctype_definition": indexed.definition
+			})
+			created_count += 1
+		
+		if created_count > 0:
+			session.save()
+			for dt_sess in session.doctype_sessions[-created_count:]:
+				session_events.publish_doctype_session(dt_sess)
+			frappe.db.commit()
+			
+			return {
+				"success": True,
+				"created": created_count,
+				"doctypes": found_doctypes,
+				"message": f"Created {created_count} DocType session(s): {', '.join(found_doctypes)}"
+			}
+		else:
+			frappe.db.commit()
+			return {
+				"success": True,
+				"created": 0,
+				"message": "No new DocType definitions found in conversation history"
+			}
+		
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Scan DocType Sessions Error")
+		return {
+			"error": str(e),
+			"traceback": frappe.get_traceback()
+		}
+
+
+@frappe.whitelist()
+def generate_doctypes(session_name, doctypes):
+	"""
+	Generate the JSON definitions of several DocTypes concurrently
+
+	Every DocType becomes its own Claude Chat Job, so the calls run in
+	parallel on all background workers, throttled by the shared rate limiter.
+	Each definition is written to its DocType Session as soon as it arrives
+	and `claude_generation_update` realtime events report the progress.
+
+	Args:
+		session_name: Name of the App Development Session
+		doctypes: JSON list of {"name", "spec"} objects or plain DocType
+			names; DocType Sessions that don't exist yet are created
+	"""
+	try:
+		settings = frappe.get_single("Claude API Settings")
+		if not settings.api_key:
+			return {"error": "Claude API Key not configured"}
+		
+		session = frappe.get_doc("App Development Session", session_name)
+		session.check_permission("write")
+		
+		if isinstance(doctypes, str):
+			doctypes = json.loads(doctypes)
+		
+		specs = {}
+		for dt in doctypes or []:
+			if isinstance(dt, str):
+				dt = {"name": dt}
+			doctype_name = (dt.get("name") or "").strip()
+			if doctype_name:
+				specs[doctype_name] = (dt.get("spec") or "").strip()
+		
+		if not specs:
+			return {"error": "No DocTypes to generate"}
+		
+		existing_doctypes = [dt.doctype_name for dt in session.doctype_sessions]
+		new_doctypes = [name for name in specs if name not in existing_doctypes]
+		for doctype_name in new_doctypes:
+			session.append("doctype_sessions", {
+				"doctype_name": doctype_name,
+				"doctype_title": doctype_name.replace("_", " ").title(),
+				"status": "Draft"
+			})
+		
+		if new_doctypes:
+			session.save()
+			for dt_sess in session.doctype_sessions[-len(new_doctypes):]:
+				session_events.publish_doctype_session(dt_sess)
+		
+		generation = frappe.generate_hash(length=10)
+		jobs = []
+		
+		for doctype_name, spec in specs.items():
+			job = frappe.get_doc({
+				"doctype": "Claude Chat Job",
+				"job_type": "Generate DocType",
+				"generation": generation,
+				"session": session.name,
+				"doctype_session_name": doctype_name,
+				"message": get_generation_prompt(session, doctype_name, spec, list(specs)),
+				"status": "Queued"
+			}).insert(ignore_permissions=True)
+			
+			frappe.enqueue(
+				"leet_devops.api.claude_api.process_chat_job",
+				queue=settings.job_queue or "long",
+				timeout=get_chat_job_timeout(settings),
+				enqueue_after_commit=True,
+				chat_job=job.name
+			)
+			jobs.append(job.name)
+		
+		frappe.db.commit()
+		
+		return {
+			"success": True,
+			"generation": generation,
+			"jobs": jobs,
+			"total": len(jobs)
+		}
+		
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Generate DocTypes Error")
+		return {
+			"error": str(e),
+			"traceback": frappe.get_traceback()
+		}
+
+
+@frappe.whitelist()
+def get_generation_status(generation):
 	"""
-	Scan conversation history and create DocType sessions for all found definitions
+	Poll the progress of a `generate_doctypes` run
 	"""
 	try:
-		session = frappe.get_doc("App Development Session", session_name)
-		
-		# Get conversation history
-		try:
-			history = json.loads(session.conversation_history) if session.conversation_history else []
-		except:
-			history = []
-		
-		# Track existing DocType sessions
-		existing_doctypes = [dt.doctype_name for dt in session.doctype_sessions]
-		
-		# Scan for DocType definitions in conversation
-		found_doctypes = []
-		created_count = 0
+		fail_stale_chat_jobs({"generation": generation})
+		jobs = frappe.get_all(
+			"Claude Chat Job",
+			filters={"generation": generation},
+			fields=["name", "session", "doctype_session_name", "status", "error"],
+			order_by="creation asc"
+		)
+		if not jobs:
+			return {"error": f"Generation {generation} not found"}
 		
-		for msg in history:
-			if msg.get("role") == "assistant":
-				content = msg.get("content", "")
-				
-				# Look for JSON code blocks
-				import re
-				json_blocks = re.findall(r'```json\s*([\s\S]*?)```', content)
-				
-				for json_str in json_blocks:
-					try:
-						definition = json.loads(json_str)
-						
-						# Check if it's a DocType definition
-						if isinstance(definition, dict) and definition.get("doctype") == "DocType" and definition.get("name"):
-							doctype_name = definition["name"]
-							
-							# Check if not already exists
-							if doctype_name not in existing_doctypes and doctype_name not in found_doctypes:
-								found_doctypes.append(doctype_name)
-								
-								# Create session
-								session.append("doctype_sessions", {
-									"doctype_name": doctype_name,
-									"doctype_title": doctype_name.replace("_", " ").title(),
-									"status": "Draft",
-									"doctype_definition": json.dumps(definition, indent=2)
-								})
-								
-								created_count += 1
-					except:
-						continue
+		frappe.has_permission("App Development Session", "read", jobs[0].session, throw=True)
 		
-		if created_count > 0:
-			session.save()
-			frappe.db.commit()
-			
-			return {
-				"success": True,
-				"created": created_count,
-				"doctypes": found_doctypes,
-				"message": f"Created {created_count} DocType session(s): {', '.join(found_doctypes)}"
-			}
-		else:
-			return {
-				"success": True,
-				"created": 0,
-				"message": "No new DocType definitions found in conversation history"
-			}
+		return dict(get_generation_counts(jobs), success=True, generation=generation, jobs=jobs)
 		
 	except Exception as e:
-		frappe.log_error(frappe.get_traceback(), "Scan DocType Sessions Error")
 		return {
-			"error": str(e),
-			"traceback": frappe.get_traceback()
+			"error": str(e)
+		}
+
+
+def get_generation_prompt(session, doctype_name, spec, doctype_names):
+	"""
+	Request for the definition of one DocType of a `generate_doctypes` run
+	"""
+	others = [name for name in doctype_names if name != doctype_name]
+	
+	return f"""Create the complete Frappe DocType JSON definition for the DocType: {doctype_name}
+
+App: {session.app_name}
+{session.description or ''}
+
+Requirements:
+{spec or 'Infer suitable fields from the DocType name and the app description.'}
+
+Other DocTypes generated together with this one (use them for Link fields where appropriate):
+{', '.join(others) if others else 'None'}
+
+Respond with the definition in a single ```json code block."""
+
+
+def generate_doctype_definition(job):
+	"""
+	Call Claude for the definition requested by a "Generate DocType" job
+	and write it to the DocType Session row
+	"""
+	settings = frappe.get_single("Claude API Settings")
+	session = frappe.get_doc("App Development Session", job.session)
+	
+	doctype_session = None
+	for dt_sess in session.doctype_sessions:
+		if dt_sess.doctype_name == job.doctype_session_name:
+			doctype_session = dt_sess
+			break
+	
+	if not doctype_session:
+		return {"error": f"DocType Session {job.doctype_session_name} not found"}
+	
+	payload = {
+		"model": settings.model,
+		"max_tokens": settings.max_tokens,
+		"temperature": settings.temperature,
+		"system": get_doctype_system_prompt(doctype_session),
+		"messages": [{"role": "user", "content": job.message}]
+	}
+	if settings.structured_doctype_output:
+		# The reply is the definition, so the tool call is required
+		doctype_tool.add_tool(payload, force=True)
+	estimated_tokens = context_builder.estimate_request_tokens(payload)
+	
+	def send(attempt):
+		with rate_limiter.reserve(settings, estimated_tokens) as lease:
+			response = claude_client.post_message(settings, payload, claude_client.get_timeout(settings))
+			result = response.json() if response.status_code == 200 else None
+			lease.record_usage(result.get("usage", {}) if result else {})
+		return response, result
+	
+	response, result = retry.call_with_retry(settings, send)
+	if response.status_code != 200:
+		return {
+			"error": f"API Error: {response.status_code}",
+			"details": response.text
+		}
+	
+	result = continue_truncated_reply(settings, payload, result)
+	
+	assistant_message = claude_client.get_response_text(result)
+	definitions = doctype_tool.get_definitions(result, session.app_title)
+	if definitions:
+		assistant_message = doctype_tool.get_message_text(assistant_message, definitions[:1])
+		parsed = {"success": True, "doctype_definition": definitions[0]}
+	else:
+		parsed = parse_doctype_from_response(assistant_message)
+	
+	if not parsed.get("success"):
+		return {
+			"error": "No valid JSON definition found in response",
+			"details": assistant_message
 		}
+	
+	# Sibling jobs update other rows of the same session at the same time,
+	# so write this row and the usage totals directly instead of saving the
+	# whole session
+	doctype_session.add_message("user", job.message)
+	doctype_session.add_message("assistant", assistant_message, usage=result.get("usage", {}))
+	doctype_session.doctype_definition = json.dumps(parsed["doctype_definition"], indent=2)
+	doctype_session.status = "Modified" if doctype_session.status == "Applied" else "Ready"
+	doctype_session.validate()
+	doctype_session.db_update()
+	session.db_add_usage(result.get("usage", {}))
+	session_events.publish_doctype_session(doctype_session)
+	
+	return {
+		"success": True,
+		"message": assistant_message,
+		"usage": result.get("usage", {}),
+		"repairs": parsed.get("repairs")
+	}
+
+
+def get_generation_counts(jobs):
+	counts = {"total": len(jobs), "completed": 0, "failed": 0}
+	for job in jobs:
+		if job.status == "Completed":
+			counts["completed"] += 1
+		elif job.status == "Failed":
+			counts["failed"] += 1
+	
+	counts["done"] = counts["completed"] + counts["failed"] == counts["total"]
+	return counts
+
+
+def publish_generation_update(job):
+	"""Push the state of one generation job plus the run totals to its owner"""
+	jobs = frappe.get_all(
+		"Claude Chat Job",
+		filters={"generation": job.generation},
+		fields=["status"]
+	)
+	
+	frappe.publish_realtime("claude_generation_update", dict(
+		get_generation_counts(jobs),
+		generation=job.generation,
+		session=job.session,
+		job=job.name,
+		doctype_name=job.doctype_session_name,
+		status=job.status,
+		error=job.error
+	), user=job.owner)
 
 
 @frappe.whitelist()
@@ -843,6 +1800,7 @@ def create_app_structure(session_name):
 	"""
 	Create complete Frappe app structure with all necessary files
 	"""
+	log = None
 	try:
 		settings = frappe.get_single("Claude API Settings")
 		session = frappe.get_doc("App Development Session", session_name)
@@ -854,6 +1812,8 @@ def create_app_structure(session_name):
 		app_module_path = os.path.join(app_path, session.app_name)
 		
 		results = []
+		# Log entries are inserted together once all files are written
+		log = file_change_log.FileChangeLogWriter(session_name, session.app_name)
 		
 		# Create main app directory
 		os.makedirs(app_path, exist_ok=True)
@@ -863,7 +1823,7 @@ def create_app_structure(session_name):
 		
 		# 1. Create __init__.py
 		init_content = f"__version__ = '0.0.1'\n"
-		create_file_with_log(session_name, session.app_name, 
+		create_file_with_log(log,
 			os.path.join(app_module_path, "__init__.py"), init_content, results)
 		
 		# 2. Create hooks.py
@@ -1048,22 +2008,22 @@ user_data_fields = [
 # 	"{session.app_name}.auth.validate"
 # ]
 """
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(app_module_path, "hooks.py"), hooks_content, results)
 		
 		# 3. Create modules.txt
 		module_name = session.app_title or session.app_name.replace("_", " ").title()
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(app_module_path, "modules.txt"), f"{module_name}\n", results)
 		
 		# 4. Create patches.txt
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(app_module_path, "patches.txt"), "", results)
 		
 		# 5. Create config directory
 		config_path = os.path.join(app_module_path, "config")
 		os.makedirs(config_path, exist_ok=True)
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(config_path, "__init__.py"), "", results)
 		
 		# Create desktop.py
@@ -1080,34 +2040,34 @@ def get_data():
 		}}
 	]
 """
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(config_path, "desktop.py"), desktop_content, results)
 		
 		# 6. Create public directory structure
 		public_path = os.path.join(app_module_path, "public")
 		for subdir in ["css", "js", "images"]:
 			os.makedirs(os.path.join(public_path, subdir), exist_ok=True)
-			create_file_with_log(session_name, session.app_name,
+			create_file_with_log(log,
 				os.path.join(public_path, subdir, "__init__.py"), "", results)
 		
 		# Create build.json
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(public_path, "build.json"), "{}", results)
 		
 		# Create main CSS file
 		css_content = f"/* {session.app_title or session.app_name} CSS */\n"
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(public_path, "css", f"{session.app_name}.css"), css_content, results)
 		
 		# Create main JS file
 		js_content = f"// {session.app_title or session.app_name} JavaScript\n"
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(public_path, "js", f"{session.app_name}.js"), js_content, results)
 		
 		# 7. Create templates directory
 		templates_path = os.path.join(app_module_path, "templates")
 		os.makedirs(templates_path, exist_ok=True)
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(templates_path, "__init__.py"), "", results)
 		
 		for subdir in ["pages", "includes", "generators"]:
@@ -1124,20 +2084,20 @@ def get_data():
 		# 10. Create module directory
 		module_path = os.path.join(app_module_path, module_name.lower().replace(" ", "_"))
 		os.makedirs(module_path, exist_ok=True)
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(module_path, "__init__.py"), "", results)
 		
 		# Create subdirectories in module
 		for subdir in ["doctype", "page", "report", "web_form"]:
 			subdir_path = os.path.join(module_path, subdir)
 			os.makedirs(subdir_path, exist_ok=True)
-			create_file_with_log(session_name, session.app_name,
+			create_file_with_log(log,
 				os.path.join(subdir_path, "__init__.py"), "", results)
 		
 		# 11. Create api directory
 		api_path = os.path.join(app_module_path, "api")
 		os.makedirs(api_path, exist_ok=True)
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(api_path, "__init__.py"), "", results)
 		
 		# 12. Create tasks.py
@@ -1162,7 +2122,7 @@ def weekly():
 def monthly():
 	pass
 """
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(app_module_path, "tasks.py"), tasks_content, results)
 		
 		# 13. Create root level files
@@ -1186,11 +2146,11 @@ setup(
 	install_requires=install_requires
 )
 """
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(app_path, "setup.py"), setup_content, results)
 		
 		# requirements.txt
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(app_path, "requirements.txt"), "frappe\n", results)
 		
 		# README.md
@@ -1209,7 +2169,7 @@ bench --site your-site install-app {session.app_name}
 
 MIT
 """
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(app_path, "README.md"), readme_content, results)
 		
 		# license.txt
@@ -1235,7 +2195,7 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(app_path, "license.txt"), license_content, results)
 		
 		# .gitignore
@@ -1255,7 +2215,7 @@ build
 node_modules
 *.compiled
 """
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(app_path, ".gitignore"), gitignore_content, results)
 		
 		# MANIFEST.in
@@ -1278,9 +2238,11 @@ recursive-include {session.app_name} *.svg
 recursive-include {session.app_name} *.txt
 recursive-exclude {session.app_name} *.pyc
 """
-		create_file_with_log(session_name, session.app_name,
+		create_file_with_log(log,
 			os.path.join(app_path, "MANIFEST.in"), manifest_content, results)
 		
+		add_log_failures(log, results)
+		
 		return {
 			"success": True,
 			"message": f"Created complete app structure with {len(results)} files",
@@ -1289,28 +2251,22 @@ recursive-exclude {session.app_name} *.pyc
 		
 	except Exception as e:
 		frappe.log_error(frappe.get_traceback(), "Create App Structure Error")
+		if log:
+			# The files written before the error are logged all the same
+			log.flush()
 		return {
 			"error": str(e),
 			"traceback": frappe.get_traceback()
 		}
 
 
-def create_file_with_log(session_name, app_name, file_path, content, results_list):
-	"""Helper function to create file and log it"""
+def create_file_with_log(log, file_path, content, results_list):
+	"""Helper function to create file and log it with a FileChangeLogWriter"""
 	try:
 		with open(file_path, 'w') as f:
 			f.write(content)
 		
-		# Log file creation
-		frappe.get_doc({
-			"doctype": "File Change Log",
-			"session_reference": session_name,
-			"app_name": app_name,
-			"operation_type": "Create",
-			"file_path": file_path,
-			"file_content": content[:1000],  # Store first 1000 chars
-			"status": "Applied"
-		}).insert(ignore_permissions=True)
+		log.add(file_path, content)
 		
 		results_list.append({
 			"file": file_path,
@@ -1325,34 +2281,164 @@ def create_file_with_log(session_name, app_name, file_path, content, results_lis
 		})
 
 
+def add_log_failures(log, results):
+	"""Insert the buffered log entries, marking the results of files whose entry failed"""
+	failed = {failure["file_path"]: failure["error"] for failure in log.flush()}
+	for result in results:
+		for file_path in result.get("files") or [result.get("file")]:
+			if file_path in failed:
+				result["log_error"] = failed[file_path]
+
+
 @frappe.whitelist()
 def apply_changes(session_name):
 	"""
-	Apply pending changes - create/modify files
-	First creates complete app structure, then creates DocTypes
+	Queue applying the pending changes of a session
+	
+	The background job first creates the complete app structure if needed,
+	then writes the DocTypes and syncs or migrates them. Its progress is
+	pushed as `apply_progress` session events, the outcome as an
+	`apply_result` event and can be polled with `get_apply_status`.
 	"""
 	try:
 		settings = frappe.get_single("Claude API Settings")
 		session = frappe.get_doc("App Development Session", session_name)
+		session.check_permission("write")
 		
 		if not settings.app_path:
 			return {"error": "Apps path not configured in settings"}
 		
-		app_path = os.path.join(settings.app_path, session.app_name)
-		results = []
+		# A job that died without resetting the status doesn't block forever
+		if session.status == "Applying Changes" and time_diff_in_seconds(now_datetime(), session.modified) < APPLY_JOB_TIMEOUT:
+			return {"error": "Changes are being applied already"}
 		
-		# Update session status
+		cache = frappe.cache()
+		cache.delete(cache.make_key(APPLY_CANCEL_PREFIX + session.name))
 		session.status = "Applying Changes"
 		session.save()
+		session_events.publish_status(session)
+		
+		frappe.enqueue(
+			"leet_devops.api.claude_api.run_apply_changes",
+			queue="long",
+			timeout=APPLY_JOB_TIMEOUT,
+			enqueue_after_commit=True,
+			session_name=session.name
+		)
 		frappe.db.commit()
 		
+		return {
+			"success": True,
+			"queued": True
+		}
+		
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Apply Changes Error")
+		return {"error": str(e)}
+
+
+@frappe.whitelist()
+def cancel_apply(session_name):
+	"""
+	Ask the running apply job of a session to stop
+	
+	The job stops before the next DocType, or terminates bench migrate.
+	Files written so far stay, the next apply writes and migrates them again.
+	"""
+	session = frappe.get_doc("App Development Session", session_name)
+	session.check_permission("write")
+	
+	if session.status != "Applying Changes":
+		return {"error": "No changes are being applied"}
+	
+	cache = frappe.cache()
+	cache.set(cache.make_key(APPLY_CANCEL_PREFIX + session.name), 1, ex=APPLY_JOB_TIMEOUT)
+	return {"success": True}
+
+
+@frappe.whitelist()
+def get_apply_status(session_name):
+	"""Status and results of the last apply, for pages without realtime"""
+	session = frappe.get_doc("App Development Session", session_name)
+	session.check_permission("read")
+	
+	result = {
+		"status": session.status,
+		"applying": session.status == "Applying Changes"
+	}
+	if session.status == "Error":
+		result["error"] = "Applying changes failed, see the Error Log for details"
+	elif not result["applying"] and session.pending_changes:
+		result["results"] = json.loads(session.pending_changes)
+		error = get_apply_error(result["results"])
+		if error:
+			result["error"] = error
+	
+	return result
+
+
+def get_apply_error(results):
+	"""
+	Why the results of an apply leave changes out of the site, or None
+
+	A sync that failed is followed by a migrate, the outcome of the last
+	one counts.
+	"""
+	errors = [
+		f"{result['doctype']}: {result.get('error')}"
+		for result in results
+		if result.get("doctype") and result.get("status") == "error"
+	]
+	
+	operations = [result for result in results if result.get("operation") in ("sync", "migrate")]
+	if operations and operations[-1]["status"] == "error":
+		operation = operations[-1]
+		errors.append(f"{operation['operation']} failed: {operation.get('error') or 'see the output'}")
+	
+	return "; ".join(errors) or None
+
+
+def is_apply_cancelled(session_name):
+	cache = frappe.cache()
+	return bool(cache.get(cache.make_key(APPLY_CANCEL_PREFIX + session_name)))
+
+
+def run_apply_changes(session_name):
+	"""
+	Background job: apply the pending changes of a session
+	
+	Returns the result that is also published as `apply_result` event.
+	"""
+	result = _run_apply_changes(session_name)
+	cache = frappe.cache()
+	cache.delete(cache.make_key(APPLY_CANCEL_PREFIX + session_name))
+	session_events.publish(session_name, "apply_result", result=result)
+	frappe.db.commit()
+	return result
+
+
+def _run_apply_changes(session_name):
+	results = []
+	log = None
+	
+	try:
+		settings = frappe.get_single("Claude API Settings")
+		session = frappe.get_doc("App Development Session", session_name)
+		
+		if not settings.app_path:
+			raise frappe.ValidationError("Apps path not configured in settings")
+		
+		app_path = os.path.join(settings.app_path, session.app_name)
+		
 		# Step 1: Create complete app structure if it doesn't exist
-		if not os.path.exists(app_path):
-			frappe.msgprint("Creating complete app structure...")
+		app_existed = os.path.exists(app_path)
+		if not app_existed:
+			session_events.publish_apply_progress(session_name, "scaffold")
 			structure_result = create_app_structure(session_name)
 			if structure_result.get("error"):
 				session.status = "Error"
 				session.save()
+				session_events.publish_status(session)
 				frappe.db.commit()
 				return structure_result
 			
@@ -1363,94 +2449,64 @@ def apply_changes(session_name):
 				"message": "Complete app structure created"
 			})
 		
-		# Step 2: Process each DocType session
+		# Step 2: Write the files of each DocType session whose content changed since the last apply
 		module_name = (session.app_title or session.app_name.replace("_", " ").title()).lower().replace(" ", "_")
+		manifest = file_manifest.load(session.file_manifest)
+		log = file_change_log.FileChangeLogWriter(session_name, session.app_name)
+		# Hashes of the files written now, they go into the manifest once migrate succeeded
+		written = {}
+		changed_doctypes = []
+		changed_json_files = []
+		# DocType Sessions whose files were written or are unchanged, and those that changed
+		written_sessions = []
+		changed_sessions = []
 		
 		for dt_sess in session.doctype_sessions:
 			if not dt_sess.doctype_definition:
 				continue
 			
+			if is_apply_cancelled(session_name):
+				raise ApplyCancelled
+			
 			try:
-				doctype_def = json.loads(dt_sess.doctype_definition)
-				doctype_name = dt_sess.doctype_name
-				
-				# Create DocType directory
-				doctype_path = os.path.join(
-					app_path,
-					session.app_name,
-					module_name,
-					"doctype",
-					doctype_name.lower().replace(" ", "_")
-				)
-				os.makedirs(doctype_path, exist_ok=True)
-				
-				# Create JSON file
-				json_file = os.path.join(doctype_path, f"{doctype_name.lower().replace(' ', '_')}.json")
-				with open(json_file, 'w') as f:
-					json.dump(doctype_def, f, indent=2)
-				
-				# Log file creation
-				frappe.get_doc({
-					"doctype": "File Change Log",
-					"session_reference": session_name,
-					"app_name": session.app_name,
-					"operation_type": "Create",
-					"file_path": json_file,
-					"file_type": "JSON",
-					"file_content": json.dumps(doctype_def, indent=2)[:1000],
-					"status": "Applied"
-				}).insert(ignore_permissions=True)
-				
-				# Create Python file
-				py_file = os.path.join(doctype_path, f"{doctype_name.lower().replace(' ', '_')}.py")
-				py_content = f"""# Copyright (c) 2025, Your Company and contributors
-# For license information, please see license.txt
-
-import frappe
-from frappe.model.document import Document
-
-class {doctype_name.replace(' ', '')}(Document):
-	pass
-"""
-				with open(py_file, 'w') as f:
-					f.write(py_content)
-				
-				# Log Python file
-				frappe.get_doc({
-					"doctype": "File Change Log",
-					"session_reference": session_name,
-					"app_name": session.app_name,
-					"operation_type": "Create",
-					"file_path": py_file,
-					"file_type": "Python",
-					"file_content": py_content,
-					"status": "Applied"
-				}).insert(ignore_permissions=True)
+				files = get_doctype_files(session.app_name, module_name, dt_sess)
+				changed = [
+					(relative_path, file_type, content) for relative_path, file_type, content in files
+					if file_manifest.is_changed(manifest, app_path, relative_path, content)
+				]
 				
-				# Create __init__.py
-				init_file = os.path.join(doctype_path, "__init__.py")
-				with open(init_file, 'w') as f:
-					f.write("")
+				for relative_path, file_type, content in changed:
+					file_path = os.path.join(app_path, relative_path)
+					os.makedirs(os.path.dirname(file_path), exist_ok=True)
+					with open(file_path, 'w') as f:
+						f.write(content)
+					
+					if file_type:
+						log.add(
+							file_path,
+							content,
+							operation_type="Update" if relative_path in manifest else "Create",
+							file_type=file_type
+						)
+					
+					written[relative_path] = file_manifest.get_hash(content)
 				
-				# Create test file
-				test_file = os.path.join(doctype_path, f"test_{doctype_name.lower().replace(' ', '_')}.py")
-				test_content = f"""# Copyright (c) 2025, Your Company and Contributors
-# See license.txt
-
-import frappe
-import unittest
-
-class Test{doctype_name.replace(' ', '')}(unittest.TestCase):
-	pass
-"""
-				with open(test_file, 'w') as f:
-					f.write(test_content)
+				written_sessions.append(dt_sess)
+				if changed:
+					changed_sessions.append(dt_sess)
+					changed_doctypes.append(dt_sess.doctype_name)
+					changed_json_files.append(os.path.join(app_path, files[0][0]))
+					session_events.publish_apply_progress(
+						session_name,
+						"files",
+						doctype=dt_sess.doctype_name,
+						files=len(changed)
+					)
 				
-				dt_sess.status = "Applied"
 				results.append({
-					"doctype": doctype_name,
-					"status": "success",
-					"files": [json_file, py_file, init_file, test_file]
+					"doctype": dt_sess.doctype_name,
+					"status": "success" if changed else "unchanged",
+					"files": [os.path.join(app_path, file[0]) for file in changed]
 				})
 				
 			except Exception as e:
@@ -1460,42 +2516,185 @@ class Test{doctype_name.replace(' ', '')}(unittest.TestCase):
 					"error": str(e)
 				})
 		
-		# Run bench migrate
-		try:
-			migrate_result = run_migrate(session.app_name)
+		add_log_failures(log, results)
+		
+		# Sync only the changed DocTypes, a full migrate is needed for a new app or changed hooks and patches
+		migrate_files = file_manifest.get_changed_migrate_files(manifest, app_path, session.app_name)
+		migrate_reason = None
+		# DocType Sessions whose files are in the site now
+		applied_sessions = []
+		
+		if not changed_doctypes and not migrate_files:
 			results.append({
 				"operation": "migrate",
-				"status": "success" if migrate_result["success"] else "error",
-				"output": migrate_result.get("output", "")
+				"status": "skipped",
+				"message": "No DocType changed since the last apply"
 			})
-		except Exception as e:
+		elif not migrate_files:
+			# Keep the files and their log whatever the sync leaves behind, a failed
+			# sync is recovered by the full migrate below
+			frappe.db.commit()
+			
+			# A sync changes tables too, it must not overlap with a migrate of the bench
+			lock = migrate_queue.wait_for_lock(lambda: is_apply_cancelled(session_name))
+			if not lock:
+				raise ApplyCancelled
+			
+			try:
+				session_events.publish_apply_progress(session_name, "sync", doctypes=changed_doctypes)
+				sync_result = sync_doctypes(session.app_name, changed_json_files)
+			finally:
+				migrate_queue.release_lock(lock)
+			
 			results.append({
-				"operation": "migrate",
-				"status": "error",
-				"error": str(e)
+				"operation": "sync",
+				"status": "success" if sync_result["success"] else "error",
+				"doctypes": changed_doctypes,
+				"error": sync_result.get("error")
 			})
+			if sync_result["success"]:
+				manifest.update(written)
+				applied_sessions = changed_sessions
+			else:
+				migrate_reason = "DocType sync failed"
+		else:
+			migrate_reason = "Changed: " + ", ".join(sorted(migrate_files))
+		
+		if migrate_reason:
+			if is_apply_cancelled(session_name):
+				raise ApplyCancelled
+			
+			# Release the row locks taken so far, e.g. on the log naming series, before
+			# waiting in the queue: other applies of the site have to get to the queue too
+			frappe.db.commit()
+			session_events.publish_apply_progress(session_name, "migrate", reason=migrate_reason)
+			try:
+				# Waits for other migrates of the bench, applies queued meanwhile share one migrate
+				migrate_result = migrate_queue.migrate(session_name, session.app_name, run_migrate, is_apply_cancelled)
+				if migrate_result["success"]:
+					manifest.update(written)
+					manifest.update(migrate_files)
+					# A migrate syncs every DocType of the app
+					applied_sessions = written_sessions
+				results.append({
+					"operation": "migrate",
+					"status": "success" if migrate_result["success"] else "error",
+					"reason": migrate_reason,
+					"doctypes": changed_doctypes,
+					"apps": migrate_result.get("apps"),
+					"output": migrate_result.get("output", ""),
+					"error": migrate_result.get("error")
+				})
+				if migrate_result.get("cancelled"):
+					raise ApplyCancelled
+			except ApplyCancelled:
+				raise
+			except Exception as e:
+				results.append({
+					"operation": "migrate",
+					"status": "error",
+					"error": str(e)
+				})
 		
-		session.status = "Completed"
+		for dt_sess in applied_sessions:
+			dt_sess.status = "Applied"
+		
+		# Files of a failed sync or migrate are written and migrated again by the next apply
+		error = get_apply_error(results)
+		session.file_manifest = file_manifest.dump(manifest)
+		session.status = "Pending Changes" if error else "Completed"
 		session.pending_changes = json.dumps(results, indent=2)
 		session.save()
+		session_events.publish_status(session)
+		for dt_sess in applied_sessions:
+			session_events.publish_doctype_session(dt_sess)
 		frappe.db.commit()
 		
+		if error:
+			return {
+				"error": error,
+				"changed_doctypes": changed_doctypes,
+				"results": results
+			}
+		
 		return {
 			"success": True,
+			"changed_doctypes": changed_doctypes,
+			"results": results
+		}
+		
+	except ApplyCancelled:
+		# Written files stay out of the manifest, so the next apply picks them up again
+		if log:
+			add_log_failures(log, results)
+		results.append({
+			"operation": "apply",
+			"status": "cancelled"
+		})
+		session.status = "Pending Changes"
+		session.pending_changes = json.dumps(results, indent=2)
+		session.save()
+		session_events.publish_status(session)
+		frappe.db.commit()
+		return {
+			"cancelled": True,
 			"results": results
 		}
 		
 	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(frappe.get_traceback(), "Apply Changes Error")
+		session = frappe.get_doc("App Development Session", session_name)
 		session.status = "Error"
 		session.save()
+		session_events.publish_status(session)
 		frappe.db.commit()
-		frappe.log_error(frappe.get_traceback(), "Apply Changes Error")
 		return {
 			"error": str(e),
 			"traceback": frappe.get_traceback()
 		}
 
 
+def get_doctype_files(app_name, module_name, dt_sess):
+	"""
+	Files generated for a DocType Session as (path relative to the app
+	directory, File Change Log file type, content) tuples
+	
+	Files without a file type are not logged.
+	"""
+	doctype_def = json.loads(dt_sess.doctype_definition)
+	doctype_name = dt_sess.doctype_name
+	scrubbed = doctype_name.lower().replace(" ", "_")
+	class_name = doctype_name.replace(" ", "")
+	doctype_dir = os.path.join(app_name, module_name, "doctype", scrubbed)
+	
+	py_content = f"""# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class {class_name}(Document):
+	pass
+"""
+	test_content = f"""# Copyright (c) 2025, Your Company and Contributors
+# See license.txt
+
+import frappe
+import unittest
+
+class Test{class_name}(unittest.TestCase):
+	pass
+"""
+	
+	return [
+		(os.path.join(doctype_dir, f"{scrubbed}.json"), "JSON", json.dumps(doctype_def, indent=2)),
+		(os.path.join(doctype_dir, f"{scrubbed}.py"), "Python", py_content),
+		(os.path.join(doctype_dir, "__init__.py"), None, ""),
+		(os.path.join(doctype_dir, f"test_{scrubbed}.py"), None, test_content)
+	]
+
+
 @frappe.whitelist()
 def verify_files(session_name):
     """
@@ -1514,6 +2713,7 @@ def verify_files(session_name):
         
         session.verification_status = "Verifying"
         session.save()
+        session_events.publish_status(session)
         frappe.db.commit()
         
         for dt_sess in session.doctype_sessions:
@@ -1550,6 +2750,8 @@ def verify_files(session_name):
         session.verification_status = "Verified" if all_verified else "Failed"
         session.verification_details = json.dumps(verification_results, indent=2)
         session.save()
+        session_events.publish_status(session)
+        session_events.publish_verification(session.name, all_verified, verification_results)
         frappe.db.commit()
         
         return {
@@ -1561,6 +2763,7 @@ def verify_files(session_name):
     except Exception as e:
         session.verification_status = "Failed"
         session.save()
+        session_events.publish_status(session)
         frappe.db.commit()
         frappe.log_error(frappe.get_traceback(), "Verification Error")
         return {
@@ -1568,30 +2771,135 @@ def verify_files(session_name):
         }
 
 
-@frappe.whitelist()
-def run_migrate(app_name=None):
+def run_migrate(on_output=None, is_cancelled=None):
 	"""
-	Run bench migrate for the app
+	Run bench migrate for the current site, which covers all of its apps
+	
+	Each output line is passed to `on_output` as soon as bench prints it,
+	only the last MIGRATE_OUTPUT_LINES lines are kept for the result.
+	`is_cancelled` is polled while migrate runs, once it returns True the
+	process is terminated.
 	"""
+	cmd = ["bench", "--site", frappe.local.site, "migrate"]
+	
 	try:
-		cmd = ["bench", "migrate"]
-		if app_name:
-			cmd.extend(["--app", app_name])
-		
-		result = subprocess.run(
+		process = subprocess.Popen(
 			cmd,
-			capture_output=True,
+			cwd=get_bench_path(),
+			stdout=subprocess.PIPE,
+			stderr=subprocess.STDOUT,
 			text=True,
-			timeout=300
+			bufsize=1,
+			# bench runs the migrate in a child process, stopping has to reach it too
+			start_new_session=True
 		)
-		
+	except Exception as e:
+		return {
+			"success": False,
+			"error": str(e)
+		}
+	
+	# The pipe is read in a thread, so cancellation is noticed while bench prints nothing
+	lines = queue.Queue()
+	threading.Thread(target=_read_lines, args=(process.stdout, lines), daemon=True).start()
+	
+	output = deque(maxlen=MIGRATE_OUTPUT_LINES)
+	deadline = time.monotonic() + MIGRATE_TIMEOUT
+	stopped = None
+	
+	while True:
+		try:
+			line = lines.get(timeout=MIGRATE_POLL_INTERVAL)
+		except queue.Empty:
+			line = ""
+		
+		if line is None:
+			break
+		
+		if line:
+			line = line.rstrip("\n")
+			output.append(line)
+			if on_output:
+				on_output(line)
+		
+		if is_cancelled and is_cancelled():
+			stopped = "cancelled"
+		elif time.monotonic() > deadline:
+			stopped = "timed out"
+		
+		if stopped:
+			_signal_process_group(process, signal.SIGTERM)
+			break
+	
+	try:
+		returncode = process.wait(timeout=30)
+	except subprocess.TimeoutExpired:
+		_signal_process_group(process, signal.SIGKILL)
+		returncode = process.wait()
+	
+	result = {
+		"success": returncode == 0 and not stopped,
+		"cancelled": stopped == "cancelled",
+		"output": "\n".join(output)
+	}
+	if stopped == "timed out":
+		result["error"] = f"bench migrate timed out after {MIGRATE_TIMEOUT} seconds"
+	elif returncode and not stopped:
+		result["error"] = f"bench migrate exited with code {returncode}"
+	
+	return result
+
+
+def _signal_process_group(process, sig):
+	try:
+		os.killpg(process.pid, sig)
+	except ProcessLookupError:
+		pass
+
+
+def _read_lines(stream, lines):
+	for line in stream:
+		lines.put(line)
+	
+	stream.close()
+	lines.put(None)
+
+
+def sync_doctypes(app_name, json_files):
+	"""
+	Import changed DocType JSON files into the site in process
+	
+	Much faster than a full `bench migrate`, which runs the patches and
+	syncs the DocTypes of every installed app. Only possible while hooks and
+	patches of the app are unchanged, and for an app installed on the site.
+	
+	A failed sync can't be undone: importing a DocType alters its table, and
+	DDL commits implicitly, so the DocTypes imported before the failure stay
+	synced. The caller recovers with a full migrate, which syncs every
+	DocType of the app again.
+	"""
+	from frappe.modules.import_file import import_file_by_path
+	
+	if app_name not in frappe.get_installed_apps():
 		return {
-			"success": result.returncode == 0,
-			"output": result.stdout,
-			"error": result.stderr
+			"success": False,
+			"error": f"{app_name} is not installed on this site"
 		}
+	
+	try:
+		for json_file in json_files:
+			import_file_by_path(json_file, force=True)
+		
+		frappe.db.commit()
+		frappe.clear_cache()
+		
+		return {"success": True}
 		
 	except Exception as e:
+		# Drops what the failing import wrote since its last DDL, not the synced DocTypes
+		frappe.db.rollback()
+		frappe.clear_cache()
+		frappe.log_error(frappe.get_traceback(), "DocType Sync Error")
 		return {
 			"success": False,
 			"error": str(e)
@@ -1628,4 +2936,23 @@ def get_app_list():
 	except Exception as e:
 		return {
 			"error": str(e)
-		}
\ No newline at end of file
+		}
+
+@frappe.whitelist()
+def get_http_pool_stats():
+	"""
+	Get keep-alive pool hit/miss counters of the worker serving this request
+	"""
+	try:
+		frappe.only_for("System Manager")
+		
+		return {
+			"success": True,
+			"pid": os.getpid(),
+			"stats": claude_client.get_http_pool_stats()
+		}
+		
+	except Exception as e:
+		return {
+			"error": str(e)
+		}
@@ -0,0 +1,386 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ANTHROPIC_VERSION = "2023-06-01"
+
+# Keep-alive connections kept per worker process when the pool size is not set
+DEFAULT_POOL_SIZE = 4
+
+# Process-level HTTP session, rebuilt whenever Claude API Settings change
+_http_session = None
+_http_session_key = None
+_http_session_lock = threading.Lock()
+
+# Counters of sessions that were replaced, so stats survive a rebuild
+_retired_stats = {"requests": 0, "connections": 0}
+
+# Minimum interval (seconds) and buffer size (chars) between two realtime
+# pushes of streamed text, so a fast stream doesn't flood Redis/socketio
+STREAM_FLUSH_INTERVAL = 0.1
+STREAM_FLUSH_CHARS = 200
+
+
+def get_headers(settings):
+	"""Build the request headers for the Anthropic Messages API"""
+	return {
+		"x-api-key": settings.get_password("api_key"),
+		"anthropic-version": ANTHROPIC_VERSION,
+		"content-type": "application/json"
+	}
+
+
+def get_timeout(settings):
+	"""Request timeout from settings, default to 180 seconds (3 minutes)"""
+	return settings.timeout if hasattr(settings, 'timeout') and settings.timeout else 180
+
+
+def get_http_session(settings):
+	"""
+	Get the pooled keep-alive session used for all Anthropic requests
+
+	One session is kept per worker process, so consecutive calls reuse open
+	TCP+TLS connections. It is rebuilt when the endpoint, the pool size or
+	any other Claude API Settings value changes.
+	"""
+	global _http_session, _http_session_key
+
+	key = (settings.api_endpoint, settings.http_pool_size, str(settings.modified))
+	if _http_session is not None and _http_session_key == key:
+		return _http_session
+
+	with _http_session_lock:
+		if _http_session is None or _http_session_key != key:
+			pool_size = int(settings.http_pool_size or 0) or DEFAULT_POOL_SIZE
+
+			session = requests.Session()
+			adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+			session.mount("https://", adapter)
+			session.mount("http://", adapter)
+
+			reset_http_session()
+			_http_session, _http_session_key = session, key
+
+	return _http_session
+
+
+def reset_http_session():
+	"""Close the pooled session of this process, the next call builds a new one"""
+	global _http_session, _http_session_key
+
+	if _http_session is None:
+		return
+
+	stats = _get_pool_counters(_http_session)
+	_retired_stats["requests"] += stats["requests"]
+	_retired_stats["connections"] += stats["connections"]
+
+	_http_session.close()
+	_http_session, _http_session_key = None, None
+
+
+def get_http_pool_stats():
+	"""
+	Connection pool counters of this worker process
+
+	A hit is a request served on an already open keep-alive connection, a
+	miss is a request that had to open a new connection.
+	"""
+	stats = _get_pool_counters(_http_session) if _http_session is not None else {"requests": 0, "connections": 0}
+	requests_count = stats["requests"] + _retired_stats["requests"]
+	connections = stats["connections"] + _retired_stats["connections"]
+
+	return {
+		"requests": requests_count,
+		"hits": max(requests_count - connections, 0),
+		"misses": connections,
+		"open_pools": stats.get("pools", 0)
+	}
+
+
+def _get_pool_counters(session):
+	counters = {"requests": 0, "connections": 0, "pools": 0}
+
+	for adapter in set(session.adapters.values()):
+		pools = adapter.poolmanager.pools
+		for pool_key in pools.keys():
+			pool = pools.get(pool_key)
+			if pool is None:
+				continue
+			counters["requests"] += pool.num_requests
+			counters["connections"] += pool.num_connections
+			counters["pools"] += 1
+
+	return counters
+
+
+def add_cache_breakpoints(payload):
+	"""
+	Mark the stable prompt prefix with `cache_control` breakpoints
+
+	One breakpoint goes on the system prompt and one on the last message
+	before the new user turn, so the next turn reads both the system prompt
+	and the whole previous history from the prompt cache.
+	"""
+	system = payload.get("system")
+	if isinstance(system, str) and system:
+		payload["system"] = [text_block(system, cache=True)]
+
+	messages = payload.get("messages") or []
+	if len(messages) >= 2:
+		prefix_end = messages[-2]
+		content = prefix_end["content"]
+		if isinstance(content, str):
+			prefix_end["content"] = [text_block(content, cache=True)]
+		elif content:
+			content[-1] = dict(content[-1], cache_control={"type": "ephemeral"})
+
+	return payload
+
+
+def text_block(text, cache=False):
+	"""Build a text content block, optionally ending a cacheable prefix"""
+	block = {"type": "text", "text": text}
+	if cache:
+		block["cache_control"] = {"type": "ephemeral"}
+	return block
+
+
+def post_message(settings, payload, timeout):
+	"""
+	Send a non-streaming Messages API request
+
+	Returns the raw `requests.Response`, the caller decides how to handle
+	non-200 statuses.
+	"""
+	return get_http_session(settings).post(
+		settings.api_endpoint,
+		headers=get_headers(settings),
+		json=payload,
+		timeout=timeout
+	)
+
+
+def stream_message(settings, payload, timeout, on_text=None):
+	"""
+	Send a streaming Messages API request and assemble the final message
+
+	Args:
+		settings: Claude API Settings document
+		payload: Messages API payload (without `stream`)
+		timeout: Read timeout in seconds, applies to the gap between events
+		on_text: Optional callable receiving each text delta as it arrives
+
+	Returns a tuple of (response, result). `result` has the same shape as a
+	non-streaming response body and is None when the status is not 200.
+	"""
+	response = get_http_session(settings).post(
+		settings.api_endpoint,
+		headers=get_headers(settings),
+		json=dict(payload, stream=True),
+		timeout=timeout,
+		stream=True
+	)
+
+	if response.status_code != 200:
+		# Read the body so error details are available to the caller
+		response.content
+		return response, None
+
+	result = {"content": [], "usage": {}, "stop_reason": None}
+
+	try:
+		for event, data in iter_sse_events(response):
+			if event == "message_start":
+				message = data.get("message", {})
+				result["id"] = message.get("id")
+				result["model"] = message.get("model")
+				result["usage"].update(message.get("usage") or {})
+
+			elif event == "content_block_start":
+				result["content"].append(dict(data.get("content_block", {})))
+
+			elif event == "content_block_delta":
+				block = result["content"][data.get("index", len(result["content"]) - 1)]
+				delta = data.get("delta", {})
+				if delta.get("type") == "text_delta":
+					block["text"] = block.get("text", "") + delta.get("text", "")
+					if on_text:
+						on_text(delta.get("text", ""))
+				elif delta.get("type") == "input_json_delta":
+					# Tool input arrives as JSON text, parsed once the block is complete
+					block["partial_json"] = block.get("partial_json", "") + delta.get("partial_json", "")
+
+			elif event == "content_block_stop":
+				block = result["content"][data.get("index", len(result["content"]) - 1)]
+				if "partial_json" in block:
+					try:
+						block["input"] = json.loads(block.pop("partial_json") or "{}")
+					except ValueError:
+						# Cut off by max_tokens
+						block["input"] = {}
+
+			elif event == "message_delta":
+				result["stop_reason"] = (data.get("delta") or {}).get("stop_reason")
+				result["usage"].update(data.get("usage") or {})
+
+			elif event == "error":
+				error = data.get("error", {})
+				raise StreamError(error.get("type"), error.get("message"))
+	finally:
+		response.close()
+
+	return response, result
+
+
+def get_batches_url(settings):
+	"""
+	Message Batches endpoint, derived from the Messages endpoint so that a
+	proxy or local stand-in configured there serves batches as well
+	"""
+	return settings.api_endpoint.rstrip("/") + "/batches"
+
+
+def create_batch(settings, batch_requests, timeout):
+	"""
+	Submit a Message Batch of {"custom_id", "params"} requests
+
+	Returns the raw `requests.Response`.
+	"""
+	return get_http_session(settings).post(
+		get_batches_url(settings),
+		headers=get_headers(settings),
+		json={"requests": batch_requests},
+		timeout=timeout
+	)
+
+
+def get_batch(settings, batch_id, timeout):
+	"""Fetch the processing state of a Message Batch, returns the raw response"""
+	return get_http_session(settings).get(
+		f"{get_batches_url(settings)}/{batch_id}",
+		headers=get_headers(settings),
+		timeout=timeout
+	)
+
+
+def iter_batch_results(settings, batch, timeout):
+	"""
+	Yield the result entries of an ended Message Batch
+
+	The JSONL results file is streamed line by line, so large batches are
+	never held in memory at once.
+	"""
+	results_url = batch.get("results_url") or f"{get_batches_url(settings)}/{batch['id']}/results"
+	response = get_http_session(settings).get(
+		results_url,
+		headers=get_headers(settings),
+		timeout=timeout,
+		stream=True
+	)
+	response.raise_for_status()
+
+	try:
+		for line in response.iter_lines(decode_unicode=True):
+			if line:
+				yield json.loads(line)
+	finally:
+		response.close()
+
+
+def iter_sse_events(response):
+	"""
+	Parse a server-sent events stream into (event, data) tuples
+
+	`data` is decoded from JSON; `ping` events are skipped.
+	"""
+	event = None
+	data_lines = []
+
+	for line in response.iter_lines(decode_unicode=True):
+		if line is None:
+			continue
+
+		if line == "":
+			if data_lines and event != "ping":
+				yield event, json.loads("\n".join(data_lines))
+			event = None
+			data_lines = []
+		elif line.startswith(":"):
+			continue
+		elif line.startswith("event:"):
+			event = line[6:].strip()
+		elif line.startswith("data:"):
+			data_lines.append(line[5:].lstrip())
+
+	if data_lines and event != "ping":
+		yield event, json.loads("\n".join(data_lines))
+
+
+def add_usage(totals, usage):
+	"""Add the token counts of `usage` to `totals` in place"""
+	for key, value in usage.items():
+		if isinstance(value, int):
+			totals[key] = totals.get(key, 0) + value
+
+	return totals
+
+
+def get_response_text(result):
+	"""Concatenate all text blocks of a Messages API result"""
+	return "".join(
+		block.get("text", "") for block in result.get("content", [])
+		if block.get("type") == "text"
+	)
+
+
+class StreamError(Exception):
+	"""Error event received in the middle of an SSE stream"""
+
+	def __init__(self, error_type, message):
+		self.error_type = error_type
+		super().__init__(f"{error_type}: {message}")
+
+
+class TextDeltaPublisher:
+	"""
+	Buffer streamed text deltas and push them to the browser in small batches
+
+	Calls `publish(text)` with the buffered text at most every
+	STREAM_FLUSH_INTERVAL seconds or once STREAM_FLUSH_CHARS are pending.
+	The first delta is always pushed immediately.
+	"""
+
+	def __init__(self, publish):
+		self.publish = publish
+		self.buffer = []
+		self.buffered_chars = 0
+		self.last_flush = None
+
+	def __call__(self, text):
+		if not text:
+			return
+
+		self.buffer.append(text)
+		self.buffered_chars += len(text)
+
+		now = time.monotonic()
+		if (
+			self.last_flush is None
+			or now - self.last_flush >= STREAM_FLUSH_INTERVAL
+			or self.buffered_chars >= STREAM_FLUSH_CHARS
+		):
+			self.flush(now)
+
+	def flush(self, now=None):
+		if self.buffer:
+			self.publish("".join(self.buffer))
+			self.buffer = []
+			self.buffered_chars = 0
+		self.last_flush = now or time.monotonic()
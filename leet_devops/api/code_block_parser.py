@@ -0,0 +1,168 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+Incremental parser for fenced code blocks in Claude replies
+
+Has no Frappe dependency, so benchmarks/code_block_parser.py runs it
+standalone.
+"""
+
+import json
+import re
+from collections import namedtuple
+
+FENCE = "```"
+
+# Language tag right after an opening fence, e.g. ```json
+LANGUAGE = re.compile(r"[\w+#.-]*")
+
+CodeBlock = namedtuple("CodeBlock", ["language", "content"])
+
+
+class CodeBlockParser:
+	"""
+	Find fenced code blocks in text that arrives in chunks
+
+	`feed(text)` returns the blocks whose closing fence arrived with that
+	chunk, each exactly once, so a caller can act on a block while the rest
+	of the reply is still being generated. Fences split across chunks are
+	handled. Content is stripped of surrounding whitespace, like the
+	```json\\s*(.*?)\\s*``` pattern this replaces.
+
+	Each chunk is scanned once: outside a block only a possible partial
+	fence is kept, inside one the chunks are collected and joined when the
+	block closes.
+	"""
+
+	def __init__(self, languages=None):
+		# Blocks of other languages are parsed but not returned
+		self.languages = {language.lower() for language in languages} if languages else None
+		self.reset()
+
+	def reset(self):
+		"""Forget everything fed so far, e.g. when a failed stream is retried"""
+		self.pending = ""
+		self.in_block = False
+		self.language = None
+		self.parts = []
+		self.tail = ""
+
+	def feed(self, text):
+		blocks = []
+
+		while text:
+			if self.in_block:
+				text = self._feed_block(text, blocks)
+			else:
+				text = self._feed_outside(text)
+
+		return blocks
+
+	def get_open_block(self):
+		"""The block still waiting for its closing fence, e.g. in a reply cut off by max_tokens"""
+		if not self.in_block or (self.languages is not None and self.language not in self.languages):
+			return None
+
+		return CodeBlock(self.language, "".join(self.parts).strip())
+
+	def _feed_outside(self, text):
+		"""Look for an opening fence, returns the text after it"""
+		text = self.pending + text
+		self.pending = ""
+
+		start = text.find(FENCE)
+		if start < 0:
+			# Trailing backticks may be the start of a fence split over two chunks
+			self.pending = text[len(text.rstrip("`")):]
+			return ""
+
+		match = LANGUAGE.match(text, start + len(FENCE))
+		if match.end() == len(text):
+			# The language tag may continue in the next chunk
+			self.pending = text[start:]
+			return ""
+
+		self.in_block = True
+		self.language = match.group(0).lower()
+		self.parts = []
+		self.tail = ""
+		return text[match.end():]
+
+	def _feed_block(self, text, blocks):
+		"""Collect block content until the closing fence, returns the text after it"""
+		window = self.tail + text
+		end = window.find(FENCE)
+
+		if end < 0:
+			self.parts.append(text)
+			self.tail = window[-(len(FENCE) - 1):]
+			return ""
+
+		# The fence may start in the tail, i.e. in text already collected
+		collected = "".join(self.parts)
+		end += len(collected) - len(self.tail)
+		content = (collected + text)[:end]
+		rest = (collected + text)[end + len(FENCE):]
+
+		if self.languages is None or self.language in self.languages:
+			blocks.append(CodeBlock(self.language, content.strip()))
+
+		self.in_block = False
+		self.language = None
+		self.parts = []
+		self.tail = ""
+		return rest
+
+
+def get_code_blocks(text, languages=None):
+	"""All closed code blocks of a complete text"""
+	return CodeBlockParser(languages).feed(text or "")
+
+
+def get_open_block(text, languages=None):
+	"""The code block left open at the end of a complete text, or None"""
+	parser = CodeBlockParser(languages)
+	parser.feed(text or "")
+	return parser.get_open_block()
+
+
+def load_json_blocks(blocks):
+	"""The parsed values of the blocks that contain valid JSON"""
+	values = []
+	for block in blocks:
+		try:
+			values.append(json.loads(block.content))
+		except ValueError:
+			continue
+
+	return values
+
+
+def is_doctype_definition(value):
+	return isinstance(value, dict) and value.get("doctype") == "DocType" and bool(value.get("name"))
+
+
+def get_doctype_definitions(text):
+	"""DocType definitions in the ```json blocks of a complete text"""
+	return [
+		value for value in load_json_blocks(get_code_blocks(text, ["json"]))
+		if is_doctype_definition(value)
+	]
+
+
+class DocTypeDefinitionStream:
+	"""
+	Feed streamed reply text, get each DocType definition as soon as its
+	```json block is closed
+	"""
+
+	def __init__(self):
+		self.parser = CodeBlockParser(["json"])
+
+	def feed(self, text):
+		return [value for value in load_json_blocks(self.parser.feed(text)) if is_doctype_definition(value)]
+
+	def reset(self):
+		self.parser.reset()
+
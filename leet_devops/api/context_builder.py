@@ -0,0 +1,147 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import json
+import math
+import re
+
+# Input token budget for system prompt, summary and history when the
+# setting is empty
+DEFAULT_BUDGET = 30000
+
+# Output limit of a rolling summary update
+SUMMARY_MAX_TOKENS = 1024
+
+# Fixed per-message cost (role markers, separators) added to the estimate
+MESSAGE_OVERHEAD = 4
+
+# Words, numbers and single punctuation marks. JSON and code are mostly
+# punctuation, which BPE tokenizers encode as (nearly) one token each.
+TOKEN_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation about designing a Frappe app.
+
+Update the summary with the new messages below. Keep every design decision, DocType name, field, relationship and open question; drop pleasantries and repeated JSON. Answer with the updated summary only, at most a few hundred words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}"""
+
+
+def estimate_tokens(text):
+	"""
+	Estimate the token count of a text locally, without an API call
+
+	Long words count as several tokens, like they do in BPE vocabularies.
+	The estimate errs on the high side for prose, which keeps requests
+	safely inside the budget.
+	"""
+	if not text:
+		return 0
+
+	return sum(1 + len(piece) // 8 for piece in TOKEN_PIECE.findall(text))
+
+
+def estimate_message_tokens(message):
+	return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD
+
+
+def estimate_request_tokens(payload):
+	"""Estimated input tokens of a Messages API payload plus its output allowance"""
+	return (
+		estimate_tokens(_content_text(payload.get("system")))
+		+ sum(
+			estimate_tokens(_content_text(msg.get("content"))) + MESSAGE_OVERHEAD
+			for msg in payload.get("messages", [])
+		)
+		+ (estimate_tokens(json.dumps(payload["tools"])) if payload.get("tools") else 0)
+		+ (payload.get("max_tokens") or 0)
+	)
+
+
+def build_context(history, budget, min_start=0):
+	"""
+	Pick the newest messages of `history` that fit into `budget` tokens
+
+	Args:
+		history: List of {"role", "content"} dicts, oldest first
+		budget: Tokens available for history messages
+		min_start: Index of the oldest message that may be included, older
+			ones are covered by the rolling summary
+
+	Returns a tuple of (start, messages) where `start` is the index in
+	`history` of the first message included.
+	"""
+	start = len(history)
+	used = 0
+
+	for index in range(len(history) - 1, min_start - 1, -1):
+		cost = estimate_message_tokens(history[index])
+		if used + cost > budget:
+			break
+		used += cost
+		start = index
+
+	# The Messages API expects the history to open with a user turn
+	while start < len(history) and history[start].get("role") != "user":
+		start += 1
+
+	messages = [
+		{"role": msg["role"], "content": msg["content"]}
+		for msg in history[start:]
+	]
+
+	if not messages:
+		# Even the last exchange is over budget (e.g. one huge JSON reply),
+		# keep it in shortened form rather than losing the latest context
+		last_user = next(
+			(index for index in range(len(history) - 1, min_start - 1, -1)
+				if history[index].get("role") == "user"),
+			None
+		)
+		if last_user is not None:
+			start = last_user
+			share = max(budget // (len(history) - start), 0) - MESSAGE_OVERHEAD
+			messages = [
+				{"role": msg["role"], "content": truncate_to_budget(msg["content"], max(share, 0))}
+				for msg in history[start:]
+			]
+
+	return start, messages
+
+
+def truncate_to_budget(text, budget):
+	"""Cut a text down to roughly `budget` tokens, keeping its head and tail"""
+	if estimate_tokens(text) <= budget:
+		return text
+
+	# Character length is only a proxy, shrink until the estimate fits
+	keep = max(int(len(text) * budget / max(estimate_tokens(text), 1)), 0)
+	while keep and estimate_tokens(text[:keep]) > budget:
+		keep = math.floor(keep * 0.9)
+
+	head = text[:keep // 2]
+	tail = text[len(text) - keep // 2:] if keep // 2 else ""
+	return f"{head}\n[... truncated ...]\n{tail}"
+
+
+def get_summary_prompt(summary, messages):
+	"""Prompt asking the model to fold `messages` into the rolling summary"""
+	transcript = "\n\n".join(
+		f"{msg.get('role', 'user').title()}: {msg.get('content', '')}"
+		for msg in messages
+	)
+
+	return SUMMARY_PROMPT.format(
+		summary=summary or "(empty)",
+		messages=transcript
+	)
+
+
+def _content_text(content):
+	if not content or isinstance(content, str):
+		return content or ""
+
+	return "\n".join(block.get("text", "") for block in content if block.get("type") == "text")
@@ -0,0 +1,151 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+Structured DocType output through tool use
+
+With "Structured DocType Output" enabled in Claude API Settings, requests
+declare a tool whose input schema is a DocType definition. Claude then
+returns definitions as `tool_use` blocks whose input is already parsed
+JSON, no code block has to be found and parsed in the reply text.
+"""
+
+import json
+
+TOOL_NAME = "save_doctype_definition"
+
+FIELD_TYPES = [
+	"Data", "Small Text", "Text", "Long Text", "Text Editor", "Markdown Editor", "HTML Editor", "Code",
+	"Int", "Float", "Currency", "Percent", "Check", "Rating", "Duration",
+	"Date", "Datetime", "Time",
+	"Select", "Link", "Dynamic Link", "Table", "Table MultiSelect",
+	"Attach", "Attach Image", "Image", "Signature", "Color", "Barcode", "Geolocation",
+	"Password", "Read Only", "Phone", "Autocomplete", "JSON", "Icon", "Button", "HTML",
+	"Section Break", "Column Break", "Tab Break", "Heading", "Fold"
+]
+
+_FLAG = {"type": "integer", "enum": [0, 1]}
+
+DOCTYPE_TOOL = {
+	"name": TOOL_NAME,
+	"description": (
+		"Save the complete definition of a Frappe DocType. Call it whenever you create "
+		"a DocType or change one, always with every field, not just the changed ones."
+	),
+	"input_schema": {
+		"type": "object",
+		"properties": {
+			"name": {"type": "string", "description": "DocType name, e.g. Sales Visit"},
+			"module": {"type": "string"},
+			"description": {"type": "string"},
+			"istable": _FLAG,
+			"is_submittable": _FLAG,
+			"issingle": _FLAG,
+			"autoname": {"type": "string", "description": "e.g. hash, field:title or naming_series:"},
+			"title_field": {"type": "string"},
+			"sort_field": {"type": "string"},
+			"sort_order": {"type": "string", "enum": ["ASC", "DESC"]},
+			"fields": {
+				"type": "array",
+				"items": {
+					"type": "object",
+					"properties": {
+						"fieldname": {"type": "string", "pattern": "^[a-z][a-z0-9_]*$"},
+						"fieldtype": {"type": "string", "enum": FIELD_TYPES},
+						"label": {"type": "string"},
+						"options": {
+							"type": "string",
+							"description": "Target DocType of Link and Table fields, newline separated values of Select fields"
+						},
+						"default": {"type": "string"},
+						"description": {"type": "string"},
+						"depends_on": {"type": "string"},
+						"reqd": _FLAG,
+						"unique": _FLAG,
+						"read_only": _FLAG,
+						"hidden": _FLAG,
+						"in_list_view": _FLAG,
+						"in_standard_filter": _FLAG,
+						"search_index": _FLAG,
+						"bold": _FLAG
+					},
+					"required": ["fieldname", "fieldtype"]
+				}
+			},
+			"permissions": {
+				"type": "array",
+				"items": {
+					"type": "object",
+					"properties": {
+						"role": {"type": "string"},
+						"read": _FLAG,
+						"write": _FLAG,
+						"create": _FLAG,
+						"delete": _FLAG,
+						"submit": _FLAG,
+						"cancel": _FLAG
+					},
+					"required": ["role"]
+				}
+			}
+		},
+		"required": ["name", "fields"]
+	}
+}
+
+SYSTEM_PROMPT = f"""
+
+Whenever you create or change a DocType, call the {TOOL_NAME} tool with its complete definition instead of writing the JSON into your reply. Explain your changes in the text of the reply."""
+
+
+def add_tool(payload, force=False):
+	"""
+	Declare the DocType tool on a Messages API payload
+
+	With `force` Claude has to call it, e.g. when the only purpose of the
+	request is a definition.
+	"""
+	payload["system"] = payload["system"] + SYSTEM_PROMPT
+	payload["tools"] = [DOCTYPE_TOOL]
+	payload["tool_choice"] = {"type": "tool", "name": TOOL_NAME} if force else {"type": "auto"}
+
+
+def get_definitions(result, module=None):
+	"""Complete DocType definitions of the tool calls in a Messages API result"""
+	definitions = []
+	for block in result.get("content", []):
+		if block.get("type") != "tool_use" or block.get("name") != TOOL_NAME:
+			continue
+
+		tool_input = block.get("input")
+		# Input cut off by max_tokens doesn't parse to a usable definition
+		if isinstance(tool_input, dict) and tool_input.get("name") and isinstance(tool_input.get("fields"), list):
+			definitions.append(to_doctype_definition(tool_input, module))
+
+	return definitions
+
+
+def to_doctype_definition(tool_input, module=None):
+	"""Fill in what a DocType JSON file has beyond the tool input"""
+	definition = {"doctype": "DocType"}
+	if module:
+		definition["module"] = module
+	definition.update(tool_input)
+	definition["doctype"] = "DocType"
+	definition["field_order"] = [field.get("fieldname") for field in definition["fields"]]
+	return definition
+
+
+def get_message_text(text, definitions):
+	"""
+	Reply text to store for a result with tool calls
+
+	The definitions are appended as ```json blocks, so the conversation
+	history sent in later turns, the chat pages and the DocType scan still
+	see them like before.
+	"""
+	parts = [text.strip()] if text.strip() else []
+	for definition in definitions:
+		parts.append("```json\n" + json.dumps(definition, indent=2) + "\n```")
+
+	return "\n\n".join(parts)
@@ -0,0 +1,75 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+Manifest of the files written by apply_changes
+
+Stored per App Development Session, it maps every generated file, by its
+path relative to the app directory, to the SHA-256 of the content last
+written. Apply diffs the newly generated content against it and writes
+only what changed, so an unchanged DocType is neither rewritten nor
+migrated again. It also holds the hashes of hooks.py, patches.txt and
+modules.txt as of the last full migrate.
+"""
+
+import hashlib
+import json
+import os
+
+
+def get_hash(content):
+	return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def load(value):
+	"""The manifest stored in a session field, empty when unset or unreadable"""
+	try:
+		manifest = json.loads(value or "{}")
+	except ValueError:
+		return {}
+
+	return manifest if isinstance(manifest, dict) else {}
+
+
+def dump(manifest):
+	return json.dumps(manifest, indent=1, sort_keys=True)
+
+
+def is_changed(manifest, app_path, relative_path, content):
+	"""
+	Whether a generated file has to be written
+
+	A file deleted since the last apply is written again even when its
+	content is unchanged.
+	"""
+	if manifest.get(relative_path) != get_hash(content):
+		return True
+
+	return not os.path.exists(os.path.join(app_path, relative_path))
+
+
+# Files of an app whose change needs a full migrate instead of a DocType sync
+MIGRATE_FILES = ("hooks.py", "patches.txt", "modules.txt")
+
+
+def get_changed_migrate_files(manifest, app_path, app_name):
+	"""
+	Hashes of the hooks, patches and modules files of the app that changed
+	since the last full migrate, keyed by relative path
+
+	They are not generated by apply, so their current content is read from
+	disk. A file that doesn't exist is left out.
+	"""
+	changed = {}
+	for filename in MIGRATE_FILES:
+		relative_path = os.path.join(app_name, filename)
+		try:
+			with open(os.path.join(app_path, relative_path)) as f:
+				content_hash = get_hash(f.read())
+		except OSError:
+			continue
+
+		if manifest.get(relative_path) != content_hash:
+			changed[relative_path] = content_hash
+
+	return changed
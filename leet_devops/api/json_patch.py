@@ -0,0 +1,164 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+JSON Patch (RFC 6902) engine for DocType definition edits
+
+Supports all six operations with JSON Pointer (RFC 6901) paths. A patch is
+applied to a copy, so a failing operation leaves the document untouched.
+"""
+
+import copy
+
+OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+
+class JsonPatchError(ValueError):
+	"""The patch is malformed or an operation can't be applied"""
+
+	def __init__(self, message, index=None):
+		self.index = index
+		super().__init__(f"Operation {index}: {message}" if index is not None else message)
+
+
+def apply_patch(document, patch):
+	"""Return a copy of `document` with all operations of `patch` applied"""
+	if not isinstance(patch, list):
+		raise JsonPatchError("A patch must be a list of operations")
+
+	result = copy.deepcopy(document)
+	for index, operation in enumerate(patch):
+		try:
+			result = _apply_operation(result, operation)
+		except JsonPatchError as e:
+			raise JsonPatchError(str(e), index)
+
+	return result
+
+
+def parse_pointer(pointer):
+	"""Split a JSON Pointer into unescaped reference tokens"""
+	if not isinstance(pointer, str):
+		raise JsonPatchError("Path must be a string")
+	if pointer == "":
+		return []
+	if not pointer.startswith("/"):
+		raise JsonPatchError(f"Path {pointer!r} must start with /")
+
+	return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _apply_operation(document, operation):
+	if not isinstance(operation, dict):
+		raise JsonPatchError("An operation must be an object")
+
+	op = operation.get("op")
+	if op not in OPERATIONS:
+		raise JsonPatchError(f"Unknown op {op!r}")
+
+	path = parse_pointer(_require(operation, "path"))
+
+	if op == "add":
+		return _add(document, path, copy.deepcopy(_require(operation, "value")))
+
+	if op == "remove":
+		_remove(document, path)
+		return document
+
+	if op == "replace":
+		value = copy.deepcopy(_require(operation, "value"))
+		if not path:
+			return value
+		_get(document, path)
+		parent, key = _get_parent(document, path)
+		parent[key] = value
+		return document
+
+	if op == "test":
+		if _get(document, path) != _require(operation, "value"):
+			raise JsonPatchError(f"Test failed at {operation['path']}")
+		return document
+
+	from_path = parse_pointer(_require(operation, "from"))
+
+	if op == "move":
+		if path[:len(from_path)] == from_path and path != from_path:
+			raise JsonPatchError("Can't move a value into one of its children")
+		value = _remove(document, from_path)
+		return _add(document, path, value)
+
+	# copy
+	return _add(document, path, copy.deepcopy(_get(document, from_path)))
+
+
+def _require(operation, member):
+	if member not in operation:
+		raise JsonPatchError(f"Missing {member!r}")
+	return operation[member]
+
+
+def _get(document, path):
+	value = document
+	for token in path:
+		if isinstance(value, dict):
+			if token not in value:
+				raise JsonPatchError(f"Path /{'/'.join(path)} does not exist")
+			value = value[token]
+		elif isinstance(value, list):
+			value = value[_get_index(value, token)]
+		else:
+			raise JsonPatchError(f"Path /{'/'.join(path)} does not exist")
+
+	return value
+
+
+def _get_parent(document, path):
+	parent = _get(document, path[:-1])
+	key = path[-1]
+
+	if isinstance(parent, list):
+		return parent, key if key == "-" else _get_index(parent, key, allow_end=True)
+	if isinstance(parent, dict):
+		return parent, key
+
+	raise JsonPatchError(f"Parent of /{'/'.join(path)} is not an object or array")
+
+
+def _get_index(array, token, allow_end=False):
+	if not token.isdigit() or (token != "0" and token.startswith("0")):
+		raise JsonPatchError(f"Invalid array index {token!r}")
+
+	index = int(token)
+	if index > len(array) or (index == len(array) and not allow_end):
+		raise JsonPatchError(f"Array index {index} is out of range")
+
+	return index
+
+
+def _add(document, path, value):
+	if not path:
+		return value
+
+	parent, key = _get_parent(document, path)
+	if isinstance(parent, list):
+		if key == "-":
+			parent.append(value)
+		else:
+			parent.insert(key, value)
+	else:
+		parent[key] = value
+
+	return document
+
+
+def _remove(document, path):
+	if not path:
+		raise JsonPatchError("Can't remove the whole document")
+
+	value = _get(document, path)
+	parent, key = _get_parent(document, path)
+	if key == "-":
+		raise JsonPatchError("Can't remove the end of an array")
+
+	del parent[key]
+	return value
@@ -0,0 +1,159 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+Tolerant parsing of JSON written by a language model
+
+Replies cut off by max_tokens end in the middle of a value, and examples
+copied from the system prompt bring along // comments and trailing
+commas. repair_json fixes what can be fixed without guessing content and
+reports every change it made.
+"""
+
+import json
+
+CLOSERS = {"{": "}", "[": "]"}
+
+# Cut points tried, newest first, when closing the brackets is not enough
+MAX_CUT_ATTEMPTS = 50
+
+# Start of the repairs that complete a cut off text, content may be missing
+TRUNCATION_REPAIRS = ("closed ", "dropped ")
+
+
+def repair_json(text):
+	"""
+	Parse `text`, repairing it where needed
+
+	Comments and trailing commas are removed. An unterminated string is
+	closed, as are all open brackets. When the text still doesn't parse,
+	e.g. because it ends after a key or in the middle of a number, the
+	incomplete last member is dropped.
+
+	Returns a tuple of (value, repairs) where `repairs` lists what was
+	changed, empty when the text was valid. Raises ValueError when the text
+	can't be repaired.
+	"""
+	try:
+		return json.loads(text), []
+	except ValueError:
+		pass
+
+	cleaned, stack, in_string, cut_points, repairs = _clean(text)
+
+	if stack and not in_string and cleaned.rstrip().endswith(","):
+		# Cut off right after a member
+		cleaned = cleaned.rstrip()[:-1]
+		cut_points = [cut for cut in cut_points if cut[0] < len(cleaned)]
+
+	candidate = cleaned + ('"' if in_string else "") + _get_closers(stack)
+	try:
+		value = json.loads(candidate)
+	except ValueError:
+		value = None
+	else:
+		if in_string:
+			repairs.append("closed an unterminated string")
+		if stack:
+			repairs.append(f"closed {len(stack)} open bracket(s)")
+		return value, repairs
+
+	# Drop the incomplete tail back to the last complete member
+	for position, cut_stack in reversed(cut_points[-MAX_CUT_ATTEMPTS:]):
+		try:
+			value = json.loads(cleaned[:position] + _get_closers(cut_stack))
+		except ValueError:
+			continue
+
+		repairs.append(f"dropped the incomplete end: {_shorten(cleaned[position:])}")
+		if cut_stack:
+			repairs.append(f"closed {len(cut_stack)} open bracket(s)")
+		return value, repairs
+
+	raise ValueError("JSON could not be repaired")
+
+
+def is_truncated(repairs):
+	"""Whether the `repairs` of repair_json completed a cut off text"""
+	return any(repair.startswith(TRUNCATION_REPAIRS) for repair in repairs)
+
+
+def _clean(text):
+	"""
+	Copy `text` without comments and trailing commas, tracking open
+	brackets and the positions after which a member is complete
+	"""
+	out = []
+	stack = []
+	# (length of out, copy of stack) right before each comma between members
+	cut_points = []
+	comments = trailing_commas = 0
+	in_string = escaped = False
+	i = 0
+	length = len(text)
+
+	while i < length:
+		char = text[i]
+
+		if in_string:
+			out.append(char)
+			if escaped:
+				escaped = False
+			elif char == "\\":
+				escaped = True
+			elif char == '"':
+				in_string = False
+			i += 1
+			continue
+
+		if char == "/" and text.startswith("//", i):
+			end = text.find("\n", i)
+			i = length if end < 0 else end
+			comments += 1
+			continue
+
+		if char == "/" and text.startswith("/*", i):
+			end = text.find("*/", i + 2)
+			i = length if end < 0 else end + 2
+			comments += 1
+			continue
+
+		if char == '"':
+			in_string = True
+		elif char in CLOSERS:
+			stack.append(char)
+		elif char in "}]":
+			# A comma right before a closing bracket is a trailing comma
+			j = len(out) - 1
+			while j >= 0 and out[j].isspace():
+				j -= 1
+			if j >= 0 and out[j] == ",":
+				del out[j]
+				trailing_commas += 1
+				# Only whitespace follows it, so it was the last cut point
+				if cut_points and cut_points[-1][0] == j:
+					cut_points.pop()
+			if stack:
+				stack.pop()
+		elif char == ",":
+			cut_points.append((len(out), list(stack)))
+
+		out.append(char)
+		i += 1
+
+	repairs = []
+	if comments:
+		repairs.append(f"removed {comments} comment(s)")
+	if trailing_commas:
+		repairs.append(f"removed {trailing_commas} trailing comma(s)")
+
+	return "".join(out), stack, in_string, cut_points, repairs
+
+
+def _get_closers(stack):
+	return "".join(CLOSERS[opener] for opener in reversed(stack))
+
+
+def _shorten(text, length=40):
+	text = " ".join(text.split())
+	return text if len(text) <= length else text[:length] + "..."
@@ -0,0 +1,247 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+Bench-wide queue for the migrates and DocType syncs of apply jobs
+
+Two bench migrate processes on one bench fight over the same database, so
+migrates and syncs run one at a time behind a lock in the Redis cache,
+which every site and node of the bench shares. Applies that need a full
+migrate join the queue of their site; the job that takes the lock runs a
+single migrate for all applies queued on its site and hands the result to
+the others.
+"""
+
+import json
+import time
+import uuid
+
+import frappe
+
+from leet_devops.api import session_events
+
+KEY_PREFIX = "leet_devops:migrate:"
+# Not site specific, the lock covers the whole bench
+LOCK_KEY = KEY_PREFIX + "lock"
+# The other keys are scoped to the site with make_key, session names repeat across sites:
+# hash of session name -> app name of the applies waiting for a migrate
+PENDING_KEY = KEY_PREFIX + "pending"
+# Per session: id of the migrate run that picked up its request
+CLAIM_PREFIX = KEY_PREFIX + "claim:"
+# Per run: result of the migrate, read by every session it covered
+RESULT_PREFIX = KEY_PREFIX + "result:"
+
+# Longer than a migrate may run, a crashed holder releases the lock this way
+LOCK_TIMEOUT = 1200
+RESULT_TTL = 3600
+# Seconds a job waits for the lock before giving up
+WAIT_TIMEOUT = 3600
+POLL_INTERVAL = 2
+
+# Atomically: join the queue, forgetting the claim of an earlier apply
+# KEYS: pending, claim key
+# ARGV: session name, app name
+JOIN_SCRIPT = """
+redis.call('DEL', KEYS[2])
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+"""
+
+# Leave the queue, returns 0 when a run took the request already
+# KEYS: pending
+# ARGV: session name
+LEAVE_SCRIPT = """
+return redis.call('HDEL', KEYS[1], ARGV[1])
+"""
+
+# Atomically: take every queued request and claim it for the run
+# KEYS: pending
+# ARGV: claim prefix, run id, claim ttl
+TAKE_SCRIPT = """
+local pending = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+for i = 1, #pending, 2 do
+	redis.call('SET', ARGV[1] .. pending[i], ARGV[2], 'EX', tonumber(ARGV[3]))
+end
+return pending
+"""
+
+# Delete the lock only while it is still ours
+# KEYS: lock
+# ARGV: token
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+	return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class MigrateQueueTimeout(Exception):
+	pass
+
+
+def acquire_lock():
+	"""Take the bench lock if it is free, returns its token or None"""
+	token = uuid.uuid4().hex
+	if frappe.cache().set(LOCK_KEY, token, nx=True, ex=LOCK_TIMEOUT):
+		return token
+
+	return None
+
+
+def release_lock(token):
+	frappe.cache().register_script(RELEASE_SCRIPT)(keys=[LOCK_KEY], args=[token])
+
+
+def wait_for_lock(should_stop=None):
+	"""
+	Take the bench lock, waiting while another job holds it
+
+	Returns None when `should_stop` returned True before the lock was free.
+	Raises MigrateQueueTimeout after WAIT_TIMEOUT seconds.
+	"""
+	deadline = time.monotonic() + WAIT_TIMEOUT
+	while True:
+		token = acquire_lock()
+		if token:
+			return token
+
+		if should_stop and should_stop():
+			return None
+
+		if time.monotonic() > deadline:
+			raise MigrateQueueTimeout(f"The bench was busy migrating for more than {WAIT_TIMEOUT} seconds")
+
+		time.sleep(POLL_INTERVAL)
+
+
+def migrate(session_name, app_name, run_migrate, is_cancelled):
+	"""
+	Get `app_name` migrated for an apply of `session_name`
+
+	Queued requests are served by one migrate: whichever job takes the
+	lock migrates its site with `run_migrate`, which covers every app queued
+	there, streams the output to all sessions it covers and stores the
+	result for them. A request
+	cancelled while it is still queued leaves the queue; a running
+	migrate is only stopped once every session it covers is cancelled.
+
+	`is_cancelled(session_name)` is polled while waiting. Returns the result
+	of `run_migrate`.
+	"""
+	cache = frappe.cache()
+	claim_key = cache.make_key(CLAIM_PREFIX + session_name)
+	cache.register_script(JOIN_SCRIPT)(keys=[cache.make_key(PENDING_KEY), claim_key], args=[session_name, app_name])
+
+	deadline = time.monotonic() + WAIT_TIMEOUT
+	queued = False
+
+	while True:
+		run_id = frappe.safe_decode(cache.get(claim_key))
+		if run_id:
+			result = wait_for_result(run_id, session_name, is_cancelled)
+			cache.delete(claim_key)
+			return result
+
+		token = acquire_lock()
+		if token:
+			try:
+				batch = take_pending(token)
+				if batch:
+					result = run_batch(token, batch, run_migrate, is_cancelled)
+					if session_name in batch:
+						cache.delete(claim_key)
+						return result
+			finally:
+				release_lock(token)
+
+			# Our request was taken by a run that started between the check and
+			# the lock, its result is read through the claim
+			continue
+
+		if is_cancelled(session_name) and leave_queue(session_name):
+			return {
+				"success": False,
+				"cancelled": True
+			}
+
+		if time.monotonic() > deadline:
+			leave_queue(session_name)
+			raise MigrateQueueTimeout(f"The bench was busy migrating for more than {WAIT_TIMEOUT} seconds")
+
+		if not queued:
+			queued = True
+			session_events.publish_apply_progress(session_name, "migrate_queued")
+
+		time.sleep(POLL_INTERVAL)
+
+
+def leave_queue(session_name):
+	cache = frappe.cache()
+	return cache.register_script(LEAVE_SCRIPT)(keys=[cache.make_key(PENDING_KEY)], args=[session_name])
+
+
+def take_pending(run_id):
+	"""Claim every request queued on this site for the run `run_id`"""
+	cache = frappe.cache()
+	pending = cache.register_script(TAKE_SCRIPT)(
+		keys=[cache.make_key(PENDING_KEY)],
+		args=[cache.make_key(CLAIM_PREFIX), run_id, RESULT_TTL]
+	)
+	pending = [frappe.safe_decode(value) for value in pending]
+	return dict(zip(pending[::2], pending[1::2]))
+
+
+def run_batch(run_id, batch, run_migrate, is_cancelled):
+	"""Run one migrate for every queued request and store its result"""
+	sessions = sorted(batch)
+	apps = sorted(set(batch.values()))
+
+	if len(sessions) > 1:
+		for session_name in sessions:
+			session_events.publish_apply_progress(session_name, "migrate_coalesced", apps=apps, sessions=len(sessions))
+
+	def publish_line(line):
+		for session_name in sessions:
+			session_events.publish_apply_progress(session_name, "migrate_output", line=line)
+
+	# Migrating the site covers every queued app
+	result = run_migrate(
+		on_output=publish_line,
+		is_cancelled=lambda: all(is_cancelled(session_name) for session_name in sessions)
+	)
+	result["apps"] = apps
+
+	cache = frappe.cache()
+	cache.set(cache.make_key(RESULT_PREFIX + run_id), json.dumps(result), ex=RESULT_TTL)
+	return result
+
+
+def wait_for_result(run_id, session_name, is_cancelled):
+	"""The result of the migrate run `run_id`, which another job is running"""
+	cache = frappe.cache()
+	result_key = cache.make_key(RESULT_PREFIX + run_id)
+	while True:
+		result = cache.get(result_key)
+		if result:
+			return json.loads(frappe.safe_decode(result))
+
+		if frappe.safe_decode(cache.get(LOCK_KEY)) != run_id:
+			# Released between the two reads, or the holder died without a result
+			result = cache.get(result_key)
+			if result:
+				return json.loads(frappe.safe_decode(result))
+
+			return {
+				"success": False,
+				"error": "The migrate this apply was waiting for did not finish"
+			}
+
+		if is_cancelled(session_name):
+			# The migrate keeps running for the other sessions, this apply stops waiting
+			return {
+				"success": False,
+				"cancelled": True
+			}
+
+		time.sleep(POLL_INTERVAL)
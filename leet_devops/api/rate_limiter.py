@@ -0,0 +1,255 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import hashlib
+import time
+import uuid
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint
+
+# Keys are derived from the API key, not the site, so every site and bench
+# node using the same Anthropic key shares one set of limits
+KEY_PREFIX = "leet_devops:ratelimit:"
+
+DEFAULT_WAIT_TIMEOUT = 300
+
+# Waiters refresh their heartbeat on every poll; a waiter silent for longer
+# (crashed worker) loses its place in the queue
+WAITER_STALE_AFTER = 30
+POLL_INTERVAL = 0.25
+
+# Atomically: drop expired holders and stale waiters, then let the head of
+# the FIFO queue take a concurrency slot once both token buckets can pay
+# for the request. Returns "ok", "queued" (not at the head or no free slot)
+# or the number of seconds the head has to wait for the buckets to refill.
+#
+# KEYS: holders, waiters, heartbeats, request bucket, token bucket
+# ARGV: member, max concurrent, lease seconds, stale seconds,
+#       requests/min, tokens/min, token cost, queue ticket
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local member = ARGV[1]
+local limit = tonumber(ARGV[2])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now - tonumber(ARGV[4]))
+for _, waiter in ipairs(stale) do
+	redis.call('ZREM', KEYS[2], waiter)
+	redis.call('ZREM', KEYS[3], waiter)
+end
+
+-- Join (or, after being dropped as stale, rejoin) the queue at our ticket
+if redis.call('ZSCORE', KEYS[2], member) == false then
+	redis.call('ZADD', KEYS[2], tonumber(ARGV[8]), member)
+end
+redis.call('ZADD', KEYS[3], now, member)
+
+local head = redis.call('ZRANGE', KEYS[2], 0, 0)[1]
+if head ~= member or (limit > 0 and redis.call('ZCARD', KEYS[1]) >= limit) then
+	return 'queued'
+end
+
+local function refill(key, per_minute)
+	if per_minute <= 0 then
+		return nil
+	end
+	local state = redis.call('HMGET', key, 'tokens', 'ts')
+	local tokens = tonumber(state[1]) or per_minute
+	local ts = tonumber(state[2]) or now
+	return math.min(per_minute, tokens + math.max(0, now - ts) * per_minute / 60)
+end
+
+local rpm = tonumber(ARGV[5])
+local tpm = tonumber(ARGV[6])
+local cost = math.min(tonumber(ARGV[7]), math.max(tpm, 0))
+local requests = refill(KEYS[4], rpm)
+local tokens = refill(KEYS[5], tpm)
+
+local wait = 0
+if requests and requests < 1 then
+	wait = math.max(wait, (1 - requests) * 60 / rpm)
+end
+if tokens and tokens < cost then
+	wait = math.max(wait, (cost - tokens) * 60 / tpm)
+end
+if wait > 0 then
+	return tostring(wait)
+end
+
+if requests then
+	redis.call('HSET', KEYS[4], 'tokens', requests - 1, 'ts', now)
+	redis.call('EXPIRE', KEYS[4], 120)
+end
+if tokens then
+	redis.call('HSET', KEYS[5], 'tokens', tokens - cost, 'ts', now)
+	redis.call('EXPIRE', KEYS[5], 120)
+end
+
+redis.call('ZREM', KEYS[2], member)
+redis.call('ZREM', KEYS[3], member)
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), member)
+return 'ok'
+"""
+
+# Return tokens reserved for a request that used fewer than estimated
+# KEYS: token bucket; ARGV: tokens/min, tokens to return
+REFUND_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local per_minute = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+if state[1] == false then
+	return 0
+end
+local tokens = tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * per_minute / 60
+redis.call('HSET', KEYS[1], 'tokens', math.min(per_minute, tokens + tonumber(ARGV[2])), 'ts', now)
+return 1
+"""
+
+
+class RateLimitTimeout(Exception):
+	"""Waited longer than the configured timeout for a rate limit slot"""
+
+
+class Lease:
+	"""A granted request slot, remembers what was reserved so it can be settled"""
+
+	def __init__(self, limits, member, reserved_tokens):
+		self.limits = limits
+		self.member = member
+		self.reserved_tokens = reserved_tokens
+		self.used_tokens = None
+
+	def record_usage(self, usage):
+		"""Settle the token reservation against the `usage` of the response"""
+		self.used_tokens = (
+			(usage.get("input_tokens") or 0)
+			+ (usage.get("cache_creation_input_tokens") or 0)
+			+ (usage.get("output_tokens") or 0)
+		)
+
+
+def get_limits(settings):
+	"""Rate limit configuration from Claude API Settings"""
+	return frappe._dict({
+		"requests_per_minute": cint(settings.requests_per_minute),
+		"tokens_per_minute": cint(settings.tokens_per_minute),
+		"max_concurrent": cint(settings.max_concurrent_requests),
+		"wait_timeout": cint(settings.rate_limit_wait_timeout) or DEFAULT_WAIT_TIMEOUT,
+		"lease": cint(settings.timeout or 180) + 60,
+		"prefix": KEY_PREFIX + hashlib.sha256(
+			(settings.get_password("api_key") or "").encode("utf-8")
+		).hexdigest()[:16] + ":"
+	})
+
+
+def is_enabled(limits):
+	return bool(limits.requests_per_minute or limits.tokens_per_minute or limits.max_concurrent)
+
+
+@contextmanager
+def reserve(settings, estimated_tokens):
+	"""
+	Wait for a fair turn under the shared limits and hold it for one request
+
+	Callers queue in FIFO order across all workers and bench nodes. The head
+	of the queue takes a slot of the concurrency semaphore once the
+	requests/min and tokens/min buckets can pay for the request; everybody
+	else keeps waiting behind it. Yields a Lease, call `record_usage` on it
+	with the response usage to return over-reserved tokens.
+
+	Raises RateLimitTimeout when no turn was granted within the configured
+	wait timeout.
+	"""
+	limits = get_limits(settings)
+	if not is_enabled(limits):
+		yield Lease(limits, None, 0)
+		return
+
+	lease = acquire(limits, estimated_tokens)
+	try:
+		yield lease
+	finally:
+		release(lease)
+
+
+def acquire(limits, estimated_tokens):
+	cache = frappe.cache()
+	member = uuid.uuid4().hex
+	ticket = cache.incr(limits.prefix + "tickets")
+	cost = min(cint(estimated_tokens), limits.tokens_per_minute) if limits.tokens_per_minute else 0
+
+	script = cache.register_script(ACQUIRE_SCRIPT)
+	keys = [limits.prefix + name for name in ("holders", "waiters", "heartbeats", "requests", "tokens")]
+	deadline = time.monotonic() + limits.wait_timeout
+
+	try:
+		while True:
+			state = frappe.safe_decode(script(keys=keys, args=[
+				member,
+				limits.max_concurrent,
+				limits.lease,
+				WAITER_STALE_AFTER,
+				limits.requests_per_minute,
+				limits.tokens_per_minute,
+				cost,
+				ticket
+			]))
+
+			if state == "ok":
+				return Lease(limits, member, cost)
+
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				raise RateLimitTimeout(
+					f"No Claude API capacity within {limits.wait_timeout} seconds, please try again"
+				)
+
+			wait = POLL_INTERVAL if state == "queued" else float(state)
+			time.sleep(min(wait, POLL_INTERVAL * 4, remaining))
+	except BaseException:
+		cache.zrem(limits.prefix + "waiters", member)
+		cache.zrem(limits.prefix + "heartbeats", member)
+		raise
+
+
+def release(lease):
+	if not lease.member:
+		return
+
+	cache = frappe.cache()
+	limits = lease.limits
+	cache.zrem(limits.prefix + "holders", lease.member)
+
+	if limits.tokens_per_minute and lease.used_tokens is not None and lease.used_tokens < lease.reserved_tokens:
+		cache.register_script(REFUND_SCRIPT)(
+			keys=[limits.prefix + "tokens"],
+			args=[limits.tokens_per_minute, lease.reserved_tokens - lease.used_tokens]
+		)
+
+
+@frappe.whitelist()
+def get_rate_limit_status():
+	"""
+	Current queue length, active requests and bucket levels for the API key
+	"""
+	frappe.only_for("System Manager")
+
+	limits = get_limits(frappe.get_single("Claude API Settings"))
+	cache = frappe.cache()
+
+	return {
+		"enabled": is_enabled(limits),
+		"waiting": cache.zcard(limits.prefix + "waiters"),
+		"active": cache.zcount(limits.prefix + "holders", time.time(), "+inf"),
+		"requests_available": frappe.safe_decode(cache.hmget(limits.prefix + "requests", ["tokens"])[0]),
+		"tokens_available": frappe.safe_decode(cache.hmget(limits.prefix + "tokens", ["tokens"])[0]),
+		"limits": {
+			"requests_per_minute": limits.requests_per_minute,
+			"tokens_per_minute": limits.tokens_per_minute,
+			"max_concurrent": limits.max_concurrent
+		}
+	}
@@ -0,0 +1,134 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+CACHE_PREFIX = "leet_devops:claude_response:"
+
+# Sorted set of cached request hashes scored by last access time, used for
+# LRU eviction once the configured number of entries is exceeded
+INDEX_KEY = "leet_devops:claude_response_index"
+
+# Per session and client request id (the stream id): the reply already given
+# to that request, so a resend of it doesn't start another turn
+REQUEST_PREFIX = "leet_devops:claude_request:"
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_ENTRIES = 500
+
+
+def is_enabled(settings):
+	"""
+	Check whether replies for the current settings may be served from cache
+
+	By default only deterministic (temperature 0) requests are cached.
+	"""
+	mode = settings.response_cache_mode or "Temperature 0 Only"
+
+	if mode == "Disabled":
+		return False
+	if mode == "Always":
+		return True
+
+	return flt(settings.temperature) == 0
+
+
+def get_request_hash(payload, session_name, doctype_session_name, history, message):
+	"""
+	Hash what determines the reply to `message` in a conversation
+
+	The history is represented by the scope and its last message instead of
+	the full message list, which grows with every turn. A message repeated
+	after its earlier turn therefore hashes differently, resends are
+	recognized by their request id instead (see get_sent_reply). Cache
+	breakpoints and other block metadata are ignored, so the same request
+	hashes the same with prompt caching on or off.
+	"""
+	anchor = history[-1] if history else None
+	normalized = {
+		"session": session_name,
+		"doctype_session": doctype_session_name,
+		"anchor": anchor.get("name") if anchor else None,
+		"message": message,
+		"model": payload.get("model"),
+		"temperature": flt(payload.get("temperature")),
+		"system": _content_text(payload.get("system")),
+		"tools": [tool.get("name") for tool in payload.get("tools") or []]
+	}
+
+	return hashlib.sha256(
+		json.dumps(normalized, sort_keys=True, separators=(",", ":")).encode("utf-8")
+	).hexdigest()
+
+
+def get_response(request_hash):
+	"""Get the cached result for a request hash, or None"""
+	cache = frappe.cache()
+
+	value = cache.get(cache.make_key(CACHE_PREFIX + request_hash))
+	if value is None:
+		# Expired by TTL, drop it from the LRU index as well
+		cache.zrem(cache.make_key(INDEX_KEY), request_hash)
+		return None
+
+	cache.zadd(cache.make_key(INDEX_KEY), {request_hash: time.time()})
+	return json.loads(value)
+
+
+def store_response(settings, request_hash, result):
+	"""Cache a result and evict the least recently used entries over the limit"""
+	cache = frappe.cache()
+	ttl = cint(settings.response_cache_ttl) or DEFAULT_TTL
+	max_entries = cint(settings.response_cache_max_entries) or DEFAULT_MAX_ENTRIES
+	index_key = cache.make_key(INDEX_KEY)
+	now = time.time()
+
+	cache.set(cache.make_key(CACHE_PREFIX + request_hash), json.dumps(result), ex=ttl)
+	cache.zadd(index_key, {request_hash: now})
+
+	# Entries not accessed for a whole TTL have expired already
+	cache.zremrangebyscore(index_key, 0, now - ttl)
+
+	overflow = cache.zcard(index_key) - max_entries
+	if overflow > 0:
+		evicted = cache.zrange(index_key, 0, overflow - 1)
+		if evicted:
+			cache.delete(*[
+				cache.make_key(CACHE_PREFIX + frappe.safe_decode(request_hash))
+				for request_hash in evicted
+			])
+		cache.zremrangebyrank(index_key, 0, overflow - 1)
+
+
+def get_sent_reply(session_name, request_id):
+	"""The result already returned for the request `request_id` of a session, or None"""
+	cache = frappe.cache()
+	value = cache.get(cache.make_key(f"{REQUEST_PREFIX}{session_name}:{request_id}"))
+	return json.loads(value) if value else None
+
+
+def store_sent_reply(settings, session_name, request_id, result):
+	"""Remember the result returned for a request, a resend with the same id gets it back"""
+	cache = frappe.cache()
+	ttl = cint(settings.response_cache_ttl) or DEFAULT_TTL
+	cache.set(cache.make_key(f"{REQUEST_PREFIX}{session_name}:{request_id}"), json.dumps(result), ex=ttl)
+
+
+def _content_text(content):
+	if content is None:
+		return ""
+	if isinstance(content, str):
+		return content
+
+	if all(block.get("type") == "text" for block in content):
+		return "".join(block.get("text", "") for block in content)
+
+	return [
+		{key: value for key, value in block.items() if key != "cache_control"}
+		for block in content
+	]
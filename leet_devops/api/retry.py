@@ -0,0 +1,169 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import hashlib
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import frappe
+import requests
+from frappe.utils import cint
+
+from leet_devops.api import claude_client
+
+# Rate limited (429), overloaded (529), server errors and request timeouts
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504, 529}
+
+# Types of an `error` event in the middle of a stream that are retried
+RETRYABLE_STREAM_ERRORS = {"overloaded_error", "api_error", "rate_limit_error"}
+
+DEFAULT_MAX_RETRIES = 3
+
+# Decorrelated jitter bounds (seconds)
+BASE_DELAY = 1
+MAX_DELAY = 60
+
+# A `retry-after` longer than this is not waited for, the error is returned
+MAX_RETRY_AFTER = 120
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 30
+
+# Failures further apart than this don't add up towards opening the circuit
+FAILURE_WINDOW = 60
+
+# Keys are derived from the endpoint, not the site, so all sites and bench
+# nodes calling the same endpoint share one breaker
+BREAKER_PREFIX = "leet_devops:circuit:"
+
+
+class CircuitOpenError(Exception):
+	"""The endpoint failed repeatedly, calls are refused until the cooldown ends"""
+
+
+def call_with_retry(settings, send):
+	"""
+	Call `send(attempt)` until it succeeds or retrying makes no sense
+
+	`send` performs one request and returns a (response, result) tuple.
+	Retryable statuses, timeouts, connection errors and overloaded stream
+	errors are retried after the delay asked for by `retry-after`, or else
+	after a decorrelated jitter backoff. Each of these failures counts
+	towards a circuit breaker shared by all workers; while it is open calls
+	raise CircuitOpenError without touching the network.
+
+	Returns the last (response, result); re-raises the exception of the
+	last attempt when it failed with one.
+	"""
+	breaker = CircuitBreaker(settings)
+	max_attempts = (cint(settings.max_retries) or DEFAULT_MAX_RETRIES) + 1
+	delay = BASE_DELAY
+
+	for attempt in range(max_attempts):
+		if not breaker.allow_request():
+			raise CircuitOpenError(
+				"Claude API is failing repeatedly, requests are paused for a moment. Please try again shortly."
+			)
+
+		try:
+			response, result = send(attempt)
+		except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, claude_client.StreamError) as e:
+			if isinstance(e, claude_client.StreamError) and e.error_type not in RETRYABLE_STREAM_ERRORS:
+				raise
+
+			breaker.record_failure()
+			if attempt + 1 >= max_attempts:
+				raise
+
+			delay = get_next_delay(delay)
+			time.sleep(delay)
+			continue
+
+		if response.status_code not in RETRYABLE_STATUS:
+			# Success or a client error: either way the endpoint is healthy
+			breaker.record_success()
+			return response, result
+
+		breaker.record_failure()
+		retry_after = get_retry_after(response)
+		if attempt + 1 >= max_attempts or (retry_after or 0) > MAX_RETRY_AFTER:
+			return response, result
+
+		delay = get_next_delay(delay)
+		time.sleep(retry_after if retry_after is not None else delay)
+
+
+def get_next_delay(previous):
+	"""Decorrelated jitter: random between the base and three times the last delay"""
+	return min(MAX_DELAY, random.uniform(BASE_DELAY, previous * 3))
+
+
+def get_retry_after(response):
+	"""Seconds to wait from the `retry-after` header (seconds or HTTP date), or None"""
+	value = response.headers.get("retry-after")
+	if not value:
+		return None
+
+	try:
+		return max(float(value), 0)
+	except ValueError:
+		pass
+
+	try:
+		return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+	except (TypeError, ValueError):
+		return None
+
+
+class CircuitBreaker:
+	"""
+	Redis backed circuit breaker for one API endpoint
+
+	After `threshold` failures in a row the circuit opens for `cooldown`
+	seconds. Then a single probe request is let through (half-open): it
+	closes the circuit on success and opens it again on failure.
+	"""
+
+	def __init__(self, settings):
+		self.threshold = cint(settings.circuit_breaker_threshold) or DEFAULT_FAILURE_THRESHOLD
+		self.cooldown = cint(settings.circuit_breaker_cooldown) or DEFAULT_COOLDOWN
+		self.probe_timeout = claude_client.get_timeout(settings)
+
+		prefix = BREAKER_PREFIX + hashlib.sha256(
+			(settings.api_endpoint or "").encode("utf-8")
+		).hexdigest()[:16] + ":"
+		self.failures_key = prefix + "failures"
+		self.open_key = prefix + "open"
+		self.probe_key = prefix + "probe"
+
+	def allow_request(self):
+		cache = frappe.cache()
+		if cache.get(self.open_key):
+			return False
+
+		if cint(cache.get(self.failures_key)) >= self.threshold:
+			# Cooldown is over, only one worker may probe the endpoint
+			return bool(cache.set(self.probe_key, 1, nx=True, ex=self.probe_timeout))
+
+		return True
+
+	def record_success(self):
+		frappe.cache().delete(self.failures_key, self.probe_key)
+
+	def record_failure(self):
+		cache = frappe.cache()
+		failures = cache.incr(self.failures_key)
+		cache.expire(self.failures_key, max(FAILURE_WINDOW, self.cooldown * 2))
+
+		if failures >= self.threshold:
+			cache.set(self.open_key, 1, ex=self.cooldown)
+			cache.delete(self.probe_key)
+
+	def get_state(self):
+		cache = frappe.cache()
+		if cache.get(self.open_key):
+			return "Open"
+		if cint(cache.get(self.failures_key)) >= self.threshold:
+			return "Half Open"
+		return "Closed"
@@ -0,0 +1,77 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+
+# Every event is sent to the document room of the session, pages showing a
+# session join it with frappe.realtime.doc_subscribe
+EVENT = "leet_devops_session_event"
+
+DOCTYPE_SESSION_FIELDS = ("doctype_name", "doctype_title", "status", "fields_count")
+
+
+def publish(session_name, event_type, after_commit=True, **data):
+	"""
+	Push a typed change of `session_name` to every page that shows it
+
+	Events are sent after the transaction commits, so a page that reacts
+	to one by reading from the server never sees older data.
+	"""
+	frappe.publish_realtime(
+		EVENT,
+		dict(data, session=session_name, type=event_type),
+		doctype="App Development Session",
+		docname=session_name,
+		after_commit=after_commit
+	)
+
+
+def publish_status(session):
+	publish(
+		session.name,
+		"status",
+		status=session.status,
+		verification_status=session.verification_status
+	)
+
+
+def publish_doctype_session(doctype_session):
+	"""A DocType Session row was added, or its status or definition changed"""
+	publish(
+		doctype_session.parent,
+		"doctype_session",
+		doctype_session={field: doctype_session.get(field) for field in DOCTYPE_SESSION_FIELDS}
+	)
+
+
+def publish_message(message, origin=None):
+	"""
+	A Session Message was added
+
+	`origin` is the stream id of the request that wrote it, the page that
+	sent the request already shows the message and skips the event.
+	"""
+	publish(
+		message.session,
+		"message",
+		doctype_session_name=message.doctype_session_name,
+		origin=origin,
+		message={
+			"name": message.name,
+			"role": message.role,
+			"content": message.content,
+			"timestamp": message.timestamp
+		}
+	)
+
+
+def publish_verification(session_name, verified, results):
+	publish(session_name, "verification", verified=verified, results=results)
+
+
+def publish_apply_progress(session_name, phase, **data):
+	"""
+	A step of a running apply, sent right away: the apply job keeps its
+	transaction open while it writes files and runs migrate
+	"""
+	publish(session_name, "apply_progress", after_commit=False, phase=phase, **data)
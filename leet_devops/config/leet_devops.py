@@ -16,6 +16,18 @@ def get_data():
                     "name": "File Change Log",
                     "label": _("File Change Log"),
                     "description": _("Track file changes and operations")
+                },
+                {
+                    "type": "doctype",
+                    "name": "Claude Chat Job",
+                    "label": _("Claude Chat Job"),
+                    "description": _("Queued and completed background chat requests")
+                },
+                {
+                    "type": "doctype",
+                    "name": "Claude Batch",
+                    "label": _("Claude Batch"),
+                    "description": _("Bulk validation or regeneration of DocType definitions")
                 }
             ]
         },
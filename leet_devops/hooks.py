@@ -118,6 +118,15 @@ app_license = "MIT"
 # 	]
 # }
 
+scheduler_events = {
+	"hourly": [
+		"leet_devops.api.batch_api.poll_batches"
+	],
+	"daily": [
+		"leet_devops.api.claude_api.delete_old_chat_jobs"
+	]
+}
+
 # Testing
 # -------
 
@@ -36,6 +36,10 @@ frappe.ui.form.on('App Development Session', {
 				});
 			}, __('Actions'));
 			
+			frm.add_custom_button(__('Generate DocTypes'), function() {
+				show_generate_doctypes_dialog(frm);
+			}, __('Actions'));
+			
 			// Make it primary button
 			frm.page.set_primary_action(__('Open Chat'), function() {
 				window.location.href = `/app/app-development-chat?session=${encodeURIComponent(frm.doc.name)}`;
@@ -43,3 +47,96 @@ frappe.ui.form.on('App Development Session', {
 		}
 	}
 });
+
+function show_generate_doctypes_dialog(frm) {
+	// Pre-fill with the DocTypes that have no definition yet
+	let pending = (frm.doc.doctype_sessions || [])
+		.filter(dt => !dt.doctype_definition)
+		.map(dt => ({doctype_name: dt.doctype_name, spec: ''}));
+	
+	let dialog = new frappe.ui.Dialog({
+		title: __('Generate DocTypes'),
+		size: 'large',
+		fields: [
+			{
+				fieldtype: 'HTML',
+				options: `<p class="text-muted">${__('Definitions are generated in parallel and written to the DocType Sessions as they arrive.')}</p>`
+			},
+			{
+				fieldname: 'doctypes',
+				fieldtype: 'Table',
+				label: __('DocTypes'),
+				in_place_edit: true,
+				data: pending,
+				fields: [
+					{fieldname: 'doctype_name', fieldtype: 'Data', label: __('DocType Name'), in_list_view: 1, reqd: 1, columns: 3},
+					{fieldname: 'spec', fieldtype: 'Small Text', label: __('Requirements'), in_list_view: 1, columns: 7}
+				]
+			}
+		],
+		primary_action_label: __('Generate'),
+		primary_action(values) {
+			let doctypes = (values.doctypes || [])
+				.filter(row => row.doctype_name)
+				.map(row => ({name: row.doctype_name, spec: row.spec}));
+			
+			if (!doctypes.length) {
+				frappe.msgprint(__('Add at least one DocType'));
+				return;
+			}
+			
+			frappe.call({
+				method: 'leet_devops.api.claude_api.generate_doctypes',
+				args: {
+					session_name: frm.doc.name,
+					doctypes: doctypes
+				},
+				callback: function(r) {
+					if (r.message.error) {
+						frappe.msgprint({
+							title: 'Error',
+							indicator: 'red',
+							message: r.message.error
+						});
+						return;
+					}
+					dialog.hide();
+					track_generation(frm, r.message.generation, r.message.total);
+				}
+			});
+		}
+	});
+	
+	dialog.show();
+}
+
+function track_generation(frm, generation, total) {
+	let title = __('Generating DocTypes');
+	frappe.show_progress(title, 0, total, __('Queued'));
+	
+	let on_update = function(data) {
+		if (data.generation !== generation) return;
+		
+		let finished = data.completed + data.failed;
+		let label = data.status === 'Failed'
+			? __('{0} failed: {1}', [data.doctype_name, data.error || ''])
+			: __('{0}: {1}', [data.doctype_name, data.status]);
+		frappe.show_progress(title, finished, data.total, label);
+		
+		if (data.status === 'Completed' && !frm.is_dirty()) {
+			frm.reload_doc();
+		}
+		
+		if (data.done) {
+			frappe.realtime.off('claude_generation_update', on_update);
+			frappe.hide_progress();
+			frappe.show_alert({
+				message: __('{0} of {1} DocTypes generated', [data.completed, data.total]),
+				indicator: data.failed ? 'orange' : 'green'
+			});
+			frm.reload_doc();
+		}
+	};
+	
+	frappe.realtime.on('claude_generation_update', on_update);
+}
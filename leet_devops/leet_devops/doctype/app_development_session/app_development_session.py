@@ -3,40 +3,42 @@
 
 import frappe
 from frappe.model.document import Document
-import json
+
+from leet_devops.leet_devops.doctype.session_message.session_message import (
+	add_session_message,
+	get_session_messages
+)
 
 class AppDevelopmentSession(Document):
 	def validate(self):
 		if not self.app_title:
 			self.app_title = self.app_name.replace("_", " ").title()
 	
-	def before_save(self):
-		# Parse conversation history if it's a string
-		if isinstance(self.conversation_history, str) and self.conversation_history:
-			try:
-				json.loads(self.conversation_history)
-			except json.JSONDecodeError:
-				pass  # It's plain text, keep as is
+	def on_trash(self):
+		frappe.db.delete("Extracted DocType Definition", {"session": self.name})
+		frappe.db.delete("DocType Definition Revision", {"session": self.name})
+		frappe.db.delete("Session Message", {"session": self.name})
+	
+	def add_message(self, role, content, doctype_session_name=None, usage=None, origin=None):
+		"""Append a message to the main conversation, or to a DocType's one"""
+		return add_session_message(self.name, role, content, doctype_session_name, usage, origin)
 	
-	def add_message(self, role, content):
-		"""Add a message to conversation history"""
-		try:
-			history = json.loads(self.conversation_history) if self.conversation_history else []
-		except json.JSONDecodeError:
-			history = []
-		
-		history.append({
-			"role": role,
-			"content": content,
-			"timestamp": frappe.utils.now()
-		})
-		
-		self.conversation_history = json.dumps(history, indent=2)
-		self.save()
+	def db_add_usage(self, usage):
+		"""Add token counts straight in the database, safe while other jobs update the session"""
+		frappe.db.sql("""
+			update `tabApp Development Session`
+			set total_input_tokens = ifnull(total_input_tokens, 0) + %s,
+				total_output_tokens = ifnull(total_output_tokens, 0) + %s,
+				cache_creation_tokens = ifnull(cache_creation_tokens, 0) + %s,
+				cache_read_tokens = ifnull(cache_read_tokens, 0) + %s
+			where name = %s""", (
+			usage.get("input_tokens") or 0,
+			usage.get("output_tokens") or 0,
+			usage.get("cache_creation_input_tokens") or 0,
+			usage.get("cache_read_input_tokens") or 0,
+			self.name
+		))
 	
 	def get_conversation_history(self):
-		"""Get parsed conversation history"""
-		try:
-			return json.loads(self.conversation_history) if self.conversation_history else []
-		except json.JSONDecodeError:
-			return []
+		"""Get the messages of the main conversation"""
+		return get_session_messages(self.name)
@@ -0,0 +1,46 @@
+frappe.ui.form.on('Claude Batch', {
+	refresh(frm) {
+		if (frm.is_new()) return;
+		
+		if (!frm.doc.batch_id && ['Draft', 'Failed'].includes(frm.doc.status)) {
+			frm.add_custom_button(__('Submit Batch'), function() {
+				call_batch_method(frm, 'submit_batch');
+			});
+		}
+		
+		if (frm.doc.status === 'Submitted') {
+			frm.add_custom_button(__('Check Status'), function() {
+				call_batch_method(frm, 'refresh_batch');
+			});
+		}
+		
+		if (frm.doc.status === 'Failed' && frm.doc.ended_on) {
+			frm.add_custom_button(__('Retry Ingestion'), function() {
+				call_batch_method(frm, 'refresh_batch');
+			});
+		}
+	}
+});
+
+function call_batch_method(frm, method) {
+	frappe.call({
+		method: `leet_devops.api.batch_api.${method}`,
+		args: {
+			batch_name: frm.doc.name
+		},
+		callback: function(r) {
+			if (r.message.error) {
+				frappe.msgprint({
+					title: 'Error',
+					indicator: 'red',
+					message: r.message.error
+				});
+			} else {
+				if (r.message.message) {
+					frappe.show_alert({message: r.message.message, indicator: 'green'});
+				}
+				frm.reload_doc();
+			}
+		}
+	});
+}
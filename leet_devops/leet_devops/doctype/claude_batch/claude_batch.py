@@ -0,0 +1,14 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+import json
+
+class ClaudeBatch(Document):
+	def get_request_map(self):
+		"""Get parsed custom_id -> DocType Session mapping"""
+		try:
+			return json.loads(self.request_map) if self.request_map else {}
+		except json.JSONDecodeError:
+			return {}
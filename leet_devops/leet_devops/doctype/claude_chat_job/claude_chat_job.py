@@ -0,0 +1,31 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+import json
+
+class ClaudeChatJob(Document):
+	def get_result(self):
+		"""Job state in the same shape `send_message_to_claude` returns"""
+		result = {
+			"job": self.name,
+			"status": self.status,
+			"session": self.session,
+			"doctype_session_name": self.doctype_session_name,
+			"stream_id": self.stream_id
+		}
+		
+		if self.status == "Completed":
+			result.update({
+				"success": True,
+				"message": self.response,
+				"usage": json.loads(self.usage) if self.usage else {}
+			})
+		elif self.status == "Failed":
+			result.update({
+				"error": self.error,
+				"details": self.error_details
+			})
+		
+		return result
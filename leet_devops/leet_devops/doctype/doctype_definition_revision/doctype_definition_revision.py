@@ -0,0 +1,47 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+import json
+
+class DocTypeDefinitionRevision(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("DocType Definition Revision", ["session", "doctype_session_name", "revision"])
+
+
+def add_revision(session_name, doctype_session_name, definition, patch=None, previous_definition=None):
+	"""
+	Record a new revision of a DocType definition
+
+	The first revision of a DocType also stores `previous_definition` as
+	revision 1, so every patch can be traced back to what it was applied
+	to. The caller commits. Returns the new revision number.
+	"""
+	latest = frappe.db.get_value(
+		"DocType Definition Revision",
+		{"session": session_name, "doctype_session_name": doctype_session_name},
+		"max(revision)"
+	) or 0
+
+	if not latest and previous_definition:
+		insert_revision(session_name, doctype_session_name, 1, "Initial", previous_definition)
+		latest = 1
+
+	insert_revision(session_name, doctype_session_name, latest + 1, "JSON Patch", definition, patch)
+	return latest + 1
+
+
+def insert_revision(session_name, doctype_session_name, revision, source, definition, patch=None):
+	frappe.get_doc({
+		"doctype": "DocType Definition Revision",
+		"session": session_name,
+		"doctype_session_name": doctype_session_name,
+		"revision": revision,
+		"source": source,
+		"patch": json.dumps(patch, indent=2) if patch is not None else None,
+		"definition": definition if isinstance(definition, str) else json.dumps(definition, indent=2)
+	}).insert(ignore_permissions=True)
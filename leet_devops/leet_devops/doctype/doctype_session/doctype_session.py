@@ -5,6 +5,11 @@ import frappe
 from frappe.model.document import Document
 import json
 
+from leet_devops.leet_devops.doctype.session_message.session_message import (
+	add_session_message,
+	get_session_messages
+)
+
 class DocTypeSession(Document):
 	def validate(self):
 		if not self.doctype_title:
@@ -18,17 +23,10 @@ class DocTypeSession(Document):
 			except json.JSONDecodeError:
 				pass
 	
-	def add_message(self, role, content):
-		"""Add a message to conversation history"""
-		try:
-			history = json.loads(self.conversation_history) if self.conversation_history else []
-		except json.JSONDecodeError:
-			history = []
-		
-		history.append({
-			"role": role,
-			"content": content,
-			"timestamp": frappe.utils.now()
-		})
-		
-		self.conversation_history = json.dumps(history, indent=2)
+	def add_message(self, role, content, usage=None):
+		"""Append a message to the conversation about this DocType"""
+		return add_session_message(self.parent, role, content, self.doctype_name, usage)
+	
+	def get_conversation_history(self):
+		"""Get the messages of the conversation about this DocType"""
+		return get_session_messages(self.parent, self.doctype_name)
@@ -0,0 +1,81 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+import hashlib
+import json
+
+from leet_devops.api.code_block_parser import get_doctype_definitions
+
+# Messages read per query while indexing
+SCAN_BATCH_SIZE = 500
+
+class ExtractedDocTypeDefinition(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Extracted DocType Definition", ["session", "content_hash"])
+
+
+def get_content_hash(definition):
+	return hashlib.sha256(json.dumps(definition, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def index_new_messages(session_name, last_scanned=None):
+	"""
+	Index the DocType definitions of the main conversation messages newer
+	than the message named `last_scanned`
+
+	Every message is parsed once: the caller stores the returned name of
+	the newest scanned message and passes it in next time. A definition
+	already indexed for the session is not added again. The caller commits.
+	"""
+	filters = {
+		"session": session_name,
+		"doctype_session_name": ["is", "not set"],
+		"role": "assistant"
+	}
+	cursor = frappe.db.get_value("Session Message", last_scanned, "creation") if last_scanned else None
+
+	known_hashes = set(frappe.get_all(
+		"Extracted DocType Definition",
+		filters={"session": session_name},
+		pluck="content_hash"
+	))
+
+	while True:
+		if cursor:
+			filters["creation"] = [">", cursor]
+
+		messages = frappe.get_all(
+			"Session Message",
+			filters=filters,
+			fields=["name", "content", "creation"],
+			order_by="creation asc",
+			limit_page_length=SCAN_BATCH_SIZE
+		)
+
+		for message in messages:
+			for definition in get_doctype_definitions(message.content):
+				content_hash = get_content_hash(definition)
+				if content_hash in known_hashes:
+					continue
+
+				known_hashes.add(content_hash)
+				frappe.get_doc({
+					"doctype": "Extracted DocType Definition",
+					"session": session_name,
+					"doctype_name": definition["name"],
+					"session_message": message.name,
+					"content_hash": content_hash,
+					"definition": json.dumps(definition, indent=2)
+				}).insert(ignore_permissions=True)
+
+		if messages:
+			last_scanned = messages[-1].name
+			cursor = messages[-1].creation
+
+		if len(messages) < SCAN_BATCH_SIZE:
+			return last_scanned
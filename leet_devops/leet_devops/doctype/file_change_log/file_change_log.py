@@ -3,19 +3,117 @@
 
 import frappe
 from frappe.model.document import Document
+from frappe.utils import cint, now_datetime
 import os
 
+# Series of the "FILE-LOG-.#####" autoname, names reserved in bulk come from it too
+SERIES_KEY = "FILE-LOG-"
+NAME_DIGITS = 5
+
+# Entries buffered by FileChangeLogWriter before they are inserted
+FLUSH_SIZE = 200
+
+# Characters of the file content stored with an entry
+CONTENT_LENGTH = 1000
+
+FIELDS = [
+	"name", "creation", "modified", "owner", "modified_by",
+	"session_reference", "app_name", "operation_type", "timestamp",
+	"file_path", "file_type", "file_content", "status", "error_message"
+]
+
+FILE_TYPES = {
+	'.json': 'JSON',
+	'.py': 'Python',
+	'.js': 'JS',
+	'.html': 'HTML',
+	'.css': 'CSS',
+	'.md': 'Markdown'
+}
+
 class FileChangeLog(Document):
 	def validate(self):
 		# Determine file type from extension if not set
 		if not self.file_type and self.file_path:
-			ext = os.path.splitext(self.file_path)[1].lower()
-			type_map = {
-				'.json': 'JSON',
-				'.py': 'Python',
-				'.js': 'JS',
-				'.html': 'HTML',
-				'.css': 'CSS',
-				'.md': 'Markdown'
-			}
-			self.file_type = type_map.get(ext, 'Other')
+			self.file_type = get_file_type(self.file_path)
+
+
+def get_file_type(file_path):
+	return FILE_TYPES.get(os.path.splitext(file_path)[1].lower(), 'Other')
+
+
+class FileChangeLogWriter:
+	"""
+	Collect the File Change Log entries of one operation and insert them
+	with one multi-row insert per FLUSH_SIZE entries
+
+	Entries are written without document hooks, what validate() would fill
+	in is set here. Names are reserved from the series in one update. When
+	a multi-row insert fails its entries are inserted one by one, so only
+	the failing ones are lost and reported.
+	"""
+
+	def __init__(self, session_name, app_name, flush_size=FLUSH_SIZE):
+		self.session_name = session_name
+		self.app_name = app_name
+		self.flush_size = flush_size
+		self.entries = []
+		# {"file_path", "error"} of every entry that could not be inserted
+		self.failed = []
+
+	def add(self, file_path, content="", operation_type="Create", file_type=None, status="Applied"):
+		self.entries.append((operation_type, file_path, file_type or get_file_type(file_path), (content or "")[:CONTENT_LENGTH], status))
+		if len(self.entries) >= self.flush_size:
+			self.flush()
+
+	def flush(self):
+		"""Insert the buffered entries, returns the entries that failed so far. The caller commits."""
+		if not self.entries:
+			return self.failed
+
+		entries, self.entries = self.entries, []
+		now = now_datetime()
+		user = frappe.session.user
+		values = [
+			(name, now, now, user, user, self.session_name, self.app_name, operation_type, now, file_path, file_type, content, status, None)
+			for name, (operation_type, file_path, file_type, content, status) in zip(reserve_names(len(entries)), entries)
+		]
+
+		frappe.db.savepoint("file_change_log")
+		try:
+			frappe.db.bulk_insert("File Change Log", FIELDS, values)
+		except Exception:
+			frappe.db.rollback(save_point="file_change_log")
+			self.insert_each(values)
+
+		return self.failed
+
+	def insert_each(self, values):
+		for row in values:
+			frappe.db.savepoint("file_change_log")
+			try:
+				frappe.db.bulk_insert("File Change Log", FIELDS, [row])
+			except Exception as e:
+				frappe.db.rollback(save_point="file_change_log")
+				self.failed.append({
+					"file_path": row[FIELDS.index("file_path")],
+					"error": str(e)
+				})
+
+
+def reserve_names(count):
+	"""
+	Take `count` consecutive names from the series in a single update
+
+	Uses the series row make_autoname counts "FILE-LOG-.#####" in, so names
+	of entries inserted one by one continue after the reserved ones.
+	"""
+	current = frappe.db.sql("select `current` from `tabSeries` where `name` = %s for update", SERIES_KEY)
+	if current:
+		current = cint(current[0][0])
+	else:
+		frappe.db.sql("insert into `tabSeries` (`name`, `current`) values (%s, 0)", SERIES_KEY)
+		current = 0
+
+	frappe.db.sql("update `tabSeries` set `current` = %s where `name` = %s", (current + count, SERIES_KEY))
+	return [f"{SERIES_KEY}{number:0{NAME_DIGITS}d}" for number in range(current + 1, current + count + 1)]
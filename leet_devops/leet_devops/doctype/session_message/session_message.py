@@ -0,0 +1,105 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+import json
+
+from leet_devops.api import session_events
+
+class SessionMessage(Document):
+	pass
+
+
+def on_doctype_update():
+	# Messages of one conversation are always read in insertion order
+	frappe.db.add_index("Session Message", ["session", "doctype_session_name", "creation"])
+
+
+def add_session_message(session_name, role, content, doctype_session_name=None, usage=None, origin=None):
+	"""
+	Append one message to a conversation and announce it to open pages
+
+	Only the new row is written, the session document is neither loaded
+	nor saved. The caller commits. `origin` is the stream id of the
+	request the message belongs to.
+	"""
+	message = frappe.get_doc({
+		"doctype": "Session Message",
+		"session": session_name,
+		"doctype_session_name": doctype_session_name,
+		"role": role,
+		"content": content,
+		"timestamp": frappe.utils.now(),
+		"usage": json.dumps(usage) if usage else None
+	})
+	message.insert(ignore_permissions=True)
+	session_events.publish_message(message, origin)
+	return message
+
+
+def get_session_messages(session_name, doctype_session_name=None):
+	"""Messages of the main conversation or of one DocType, oldest first"""
+	return frappe.get_all(
+		"Session Message",
+		filters=get_scope_filters(session_name, doctype_session_name),
+		fields=["name", "role", "content", "timestamp"],
+		order_by="creation asc"
+	)
+
+
+def get_message_page(session_name, doctype_session_name=None, limit=50, before=None):
+	"""
+	The newest `limit` messages older than the message named `before`
+
+	Returns a tuple of (messages, has_more) with the messages oldest first.
+	The name of the first message is the cursor for the next older page.
+	"""
+	filters = get_scope_filters(session_name, doctype_session_name)
+	if before:
+		cursor = frappe.db.get_value("Session Message", before, "creation")
+		if cursor:
+			filters["creation"] = ["<", cursor]
+
+	messages = frappe.get_all(
+		"Session Message",
+		filters=filters,
+		fields=["name", "role", "content", "timestamp"],
+		order_by="creation desc",
+		limit_page_length=limit + 1
+	)
+
+	has_more = len(messages) > limit
+	return list(reversed(messages[:limit])), has_more
+
+
+def get_messages_after(session_name, doctype_session_name=None, limit=50, after=None):
+	"""
+	Messages newer than the message named `after`, oldest first
+
+	Returns None when `after` is unknown or more than `limit` messages are
+	newer, the caller then has to start over from the latest page.
+	"""
+	cursor = frappe.db.get_value("Session Message", after, "creation") if after else None
+	if not cursor:
+		return None
+
+	filters = get_scope_filters(session_name, doctype_session_name)
+	filters["creation"] = [">", cursor]
+
+	messages = frappe.get_all(
+		"Session Message",
+		filters=filters,
+		fields=["name", "role", "content", "timestamp"],
+		order_by="creation asc",
+		limit_page_length=limit + 1
+	)
+
+	return messages if len(messages) <= limit else None
+
+
+def get_scope_filters(session_name, doctype_session_name=None):
+	return {
+		"session": session_name,
+		"doctype_session_name": doctype_session_name or ["is", "not set"]
+	}
@@ -81,6 +81,32 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 
 	let currentSession = null;
 	let currentDoctypeSession = null;
+	let activeStream = null;
+	let pendingJob = null;
+	let jobPoller = null;
+	let jobsResumed = false;
+	let applyPoller = null;
+	let historyCursor = null;
+	let historyHasMore = false;
+	let historyLoading = false;
+	let messageList = null;
+	// Server messages of the shown conversation, oldest first, as cached in IndexedDB
+	let loadedMessages = [];
+	// Message events that arrived while a page of history was loading
+	let pendingMessageEvents = [];
+	// Stream ids of the requests sent from this page, their messages are shown already
+	const sentStreams = new Set();
+	// Message and stream id of a send that failed with a network error, sending the
+	// same message again reuses the id so the server answers it only once
+	let failedSend = null;
+	// DocType definitions offered during the current reply, and the ones a session was created for
+	let offeredDefinitions = new Set();
+	const createdDefinitions = new Set();
+
+	// Messages fetched per request, older ones are loaded on scroll
+	const HISTORY_PAGE_SIZE = 50;
+	// Lines of progress and migrate output shown while changes are applied
+	const APPLY_LOG_LINES = 200;
 
 	// Build the page HTML
 	$(page.body).html(`
@@ -278,6 +304,13 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 				margin-bottom: 10px;
 				font-size: 13px;
 			}
+			
+			.apply-log {
+				max-height: 300px;
+				overflow-y: auto;
+				font-size: 12px;
+				white-space: pre-wrap;
+			}
 		</style>
 		
 		<div class="chat-container">
@@ -322,6 +355,9 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 				<button class="btn btn-default" id="refresh-button">
 					Refresh
 				</button>
+				<button class="btn btn-default" id="cancel-apply-button" style="display: none;">
+					Cancel Apply
+				</button>
 			</div>
 
 			<div class="changes-preview" id="changes-preview">
@@ -331,23 +367,46 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 		</div>
 	`);
 
-	// Load session data
-	loadSession();
+	// Shared windowed message renderer, also used by the website chat page
+	frappe.require([
+		'/assets/leet_devops/js/message_format.js',
+		'/assets/leet_devops/js/message_list.js',
+		'/assets/leet_devops/js/message_cache.js'
+	], function() {
+		messageList = new leetDevops.MessageList($('#messages-container')[0], {
+			workerUrl: '/assets/leet_devops/js/message_format_worker.js',
+			renderEmpty: renderGreeting
+		});
+		
+		// Load session data
+		loadSession();
+	});
 
 	function loadSession() {
 		frappe.call({
-			method: 'frappe.client.get',
+			method: 'leet_devops.api.claude_api.get_session_overview',
 			args: {
-				doctype: 'App Development Session',
-				name: sessionName
+				session_name: sessionName
 			},
 			callback: function(r) {
-				if (r.message) {
-					currentSession = r.message;
+				if (r.message && r.message.session) {
+					currentSession = r.message.session;
 					renderSessionInfo();
 					renderDoctypeTabs();
 					loadConversationHistory();
 					setupEventListeners();
+					
+					if (!jobsResumed) {
+						jobsResumed = true;
+						// Changes made by other pages and background jobs arrive as session events
+						frappe.realtime.doc_subscribe('App Development Session', currentSession.name);
+						resumeChatJobs();
+						
+						// Apply keeps running in the background when the page is left
+						if (currentSession.status === 'Applying Changes') {
+							trackApply();
+						}
+					}
 				} else {
 					frappe.msgprint('Session not found');
 				}
@@ -383,7 +442,7 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 
 	function renderDoctypeTabs() {
 		let tabs = `
-			<div class="doctype-tab active" data-doctype="">
+			<div class="doctype-tab ${currentDoctypeSession ? '' : 'active'}" data-doctype="">
 				Main App
 			</div>
 		`;
@@ -391,7 +450,7 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 		if (currentSession.doctype_sessions) {
 			currentSession.doctype_sessions.forEach(dt => {
 				tabs += `
-					<div class="doctype-tab" data-doctype="${dt.doctype_name}">
+					<div class="doctype-tab ${dt.doctype_name === currentDoctypeSession ? 'active' : ''}" data-doctype="${dt.doctype_name}">
 						${dt.doctype_title || dt.doctype_name}
 						<span class="status-badge ${getStatusClass(dt.status)}">${dt.status}</span>
 					</div>
@@ -422,71 +481,147 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 	}
 
 	function loadConversationHistory() {
-		let history = [];
-		
-		try {
-			if (currentDoctypeSession) {
-				const dtSession = currentSession.doctype_sessions.find(
-					dt => dt.doctype_name === currentDoctypeSession
-				);
-				if (dtSession && dtSession.conversation_history) {
-					history = JSON.parse(dtSession.conversation_history);
-				}
+		const doctypeSession = currentDoctypeSession;
+		historyLoading = true;
+		pendingMessageEvents = [];
+		
+		leetDevops.messageCache.get(currentSession.name, doctypeSession).then(cached => {
+			// Ignore replies for a tab that is no longer shown
+			if (doctypeSession !== currentDoctypeSession) return;
+			
+			if (cached && cached.messages.length) {
+				// Show the cached copy right away, then only fetch what is new
+				loadedMessages = cached.messages;
+				historyCursor = cached.cursor;
+				historyHasMore = cached.has_more;
+				renderConversation(loadedMessages);
 			} else {
-				if (currentSession.conversation_history) {
-					history = JSON.parse(currentSession.conversation_history);
-				}
+				loadedMessages = [];
+				historyCursor = null;
+				historyHasMore = false;
 			}
-		} catch (e) {
-			console.error('Error parsing conversation history:', e);
-		}
+			
+			const newest = loadedMessages[loadedMessages.length - 1];
+			fetchMessages({after: newest && newest.name}, function(page) {
+				if (doctypeSession !== currentDoctypeSession) return;
+				
+				historyLoading = false;
+				
+				if (page.delta) {
+					page.messages.forEach(msg => messageList.appendMessage(msg));
+					loadedMessages = loadedMessages.concat(page.messages);
+				} else {
+					loadedMessages = page.messages;
+					historyCursor = page.cursor;
+					historyHasMore = page.has_more;
+					renderConversation(loadedMessages);
+				}
+				
+				saveConversationCache();
+				applyPendingMessageEvents();
+				fillViewport();
+			});
+		});
+	}
+
+	function loadOlderMessages() {
+		if (historyLoading || !historyHasMore) return;
 		
+		const doctypeSession = currentDoctypeSession;
+		historyLoading = true;
+		renderOlderIndicator();
+		
+		fetchMessages({before: historyCursor}, function(page) {
+			if (doctypeSession !== currentDoctypeSession) return;
+			
+			historyLoading = false;
+			historyCursor = page.cursor || historyCursor;
+			historyHasMore = page.has_more;
+			
+			$('#messages-container .older-messages').remove();
+			messageList.prependMessages(page.messages);
+			renderOlderIndicator();
+			
+			loadedMessages = page.messages.concat(loadedMessages);
+			saveConversationCache();
+			applyPendingMessageEvents();
+		});
+	}
+
+	function applyPendingMessageEvents() {
+		const events = pendingMessageEvents;
+		pendingMessageEvents = [];
+		events.forEach(onMessageEvent);
+	}
+
+	function fetchMessages(cursor, callback) {
+		frappe.call({
+			method: 'leet_devops.api.claude_api.get_session_messages',
+			args: Object.assign({
+				session_name: currentSession.name,
+				doctype_session_name: currentDoctypeSession,
+				limit: HISTORY_PAGE_SIZE
+			}, cursor),
+			callback: function(r) {
+				if (!r.message || r.message.error) {
+					console.error('Error loading conversation history:', r.message && r.message.error);
+					// Keep a cached copy on screen, otherwise show an empty conversation
+					callback({messages: [], delta: Boolean(cursor.after), has_more: false, cursor: null});
+					return;
+				}
+				callback(r.message);
+			}
+		});
+	}
+
+	function saveConversationCache() {
+		leetDevops.messageCache.put(currentSession.name, currentDoctypeSession, {
+			messages: loadedMessages,
+			has_more: historyHasMore,
+			cursor: historyCursor
+		});
+	}
+
+	function renderOlderIndicator() {
 		const container = $('#messages-container');
+		container.find('.older-messages').remove();
 		
-		if (history.length === 0) {
-			container.html(`
-				<div class="message assistant">
-					<div class="message-header">Claude AI</div>
-					<div class="message-content">
-						Hello! I'm here to help you develop your Frappe app. 
-						${currentDoctypeSession 
-							? `We're working on the <strong>${currentDoctypeSession}</strong> DocType. How can I help you modify or improve it?`
-							: 'You can ask me to create DocTypes, explain concepts, or help with your app architecture.'}
-					</div>
+		if (historyHasMore) {
+			container.prepend(`
+				<div class="older-messages text-muted text-center" style="cursor: pointer; margin-bottom: 15px;">
+					${historyLoading ? __('Loading older messages...') : __('Scroll up or click to load older messages')}
 				</div>
 			`);
-		} else {
-			let html = '';
-			history.forEach(msg => {
-				const timestamp = msg.timestamp ? new Date(msg.timestamp).toLocaleString() : '';
-				html += `
-					<div class="message ${msg.role}">
-						<div class="message-header">
-							${msg.role === 'user' ? 'You' : 'Claude AI'}
-							${timestamp ? `<span style="float: right; font-weight: normal;">${timestamp}</span>` : ''}
-						</div>
-						<div class="message-content">${formatMessage(msg.content)}</div>
-					</div>
-				`;
-			});
-			container.html(html);
 		}
-		
-		container.scrollTop(container[0].scrollHeight);
 	}
 
-	function formatMessage(content) {
-		content = content.replace(/```(\w+)?\n([\s\S]*?)```/g, (match, lang, code) => {
-			return `<pre><code>${escapeHtml(code)}</code></pre>`;
-		});
-		content = content.replace(/\n/g, '<br>');
-		return content;
+	function renderConversation(history) {
+		$('#messages-container .older-messages').remove();
+		messageList.setMessages(history);
+		renderOlderIndicator();
+	}
+
+	function fillViewport() {
+		const container = $('#messages-container')[0];
+		
+		// Without a scrollbar there is no scroll event to page with
+		if (historyHasMore && container.scrollHeight <= container.clientHeight) {
+			loadOlderMessages();
+		}
 	}
 
-	function escapeHtml(text) {
-		const div = document.createElement('div');
-		div.textContent = text;
-		return div.innerHTML;
+	function renderGreeting() {
+		return `
+			<div class="message assistant">
+				<div class="message-header">Claude AI</div>
+				<div class="message-content">
+					Hello! I'm here to help you develop your Frappe app. 
+					${currentDoctypeSession 
+						? `We're working on the <strong>${currentDoctypeSession}</strong> DocType. How can I help you modify or improve it?`
+						: 'You can ask me to create DocTypes, explain concepts, or help with your app architecture.'}
+				</div>
+			</div>
+		`;
 	}
 
 	function setupEventListeners() {
@@ -499,10 +634,116 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 			}
 		});
 		
+		$('#messages-container').off('scroll').on('scroll', function() {
+			if (this.scrollTop < 80) {
+				loadOlderMessages();
+			}
+		});
+		
+		$('#messages-container').off('click', '.older-messages').on('click', '.older-messages', loadOlderMessages);
+		
 		$('#apply-button').off('click').on('click', applyChanges);
 		$('#verify-button').off('click').on('click', verifyFiles);
 		$('#scan-button').off('click').on('click', scanAndCreateSessions);
 		$('#refresh-button').off('click').on('click', loadSession);
+		$('#cancel-apply-button').off('click').on('click', cancelApply);
+		
+		frappe.realtime.off('claude_stream');
+		frappe.realtime.on('claude_stream', onStreamEvent);
+		frappe.realtime.off('claude_job_update');
+		frappe.realtime.on('claude_job_update', onChatJobUpdate);
+		frappe.realtime.off('leet_devops_session_event');
+		frappe.realtime.on('leet_devops_session_event', onSessionEvent);
+	}
+
+	function onSessionEvent(data) {
+		if (!currentSession || data.session !== currentSession.name) return;
+		
+		if (data.type === 'status') {
+			currentSession.status = data.status;
+			currentSession.verification_status = data.verification_status;
+			renderSessionInfo();
+		} else if (data.type === 'doctype_session') {
+			updateDoctypeSession(data.doctype_session);
+		} else if (data.type === 'message') {
+			onMessageEvent(data);
+		} else if (data.type === 'verification') {
+			showVerificationResults(data.results);
+		} else if (data.type === 'apply_progress') {
+			onApplyProgress(data);
+		} else if (data.type === 'apply_result') {
+			finishApply(data.result);
+		}
+	}
+
+	function updateDoctypeSession(row) {
+		const rows = currentSession.doctype_sessions = currentSession.doctype_sessions || [];
+		const existing = rows.find(dt => dt.doctype_name === row.doctype_name);
+		
+		if (existing) {
+			Object.assign(existing, row);
+		} else {
+			rows.push(row);
+		}
+		
+		renderSessionInfo();
+		renderDoctypeTabs();
+	}
+
+	function onMessageEvent(data) {
+		// Other conversations are brought up to date when their tab is opened
+		if ((data.doctype_session_name || null) !== currentDoctypeSession) return;
+		if (historyLoading) {
+			// Merged once the page arrives, which may include the message already
+			pendingMessageEvents.push(data);
+			return;
+		}
+		if (loadedMessages.some(msg => msg.name === data.message.name)) return;
+		
+		// Messages sent from this page are shown already, they are only
+		// recorded so the cached conversation has no gaps
+		if (!sentStreams.has(data.origin)) {
+			messageList.appendMessage(data.message);
+		}
+		loadedMessages.push(data.message);
+		saveConversationCache();
+	}
+
+	function onStreamEvent(data) {
+		// Ignore events of other tabs or of a request that already finished
+		if (!activeStream || data.stream_id !== activeStream.id) return;
+		
+		if (data.reset) {
+			activeStream.text = '';
+		}
+		if (data.delta) {
+			activeStream.text += data.delta;
+		}
+		if (activeStream.text) {
+			$('#thinking-message .message-content')
+				.css('white-space', 'pre-wrap')
+				.text(activeStream.text);
+			$('#messages-container').scrollTop($('#messages-container')[0].scrollHeight);
+		}
+		if (data.definitions) {
+			offerDefinitions(data.definitions);
+		}
+	}
+
+	function offerDefinitions(definitions) {
+		// Definitions whose code block closed can be used before the reply ends
+		definitions.forEach(definition => {
+			if (offeredDefinitions.has(definition.name) || hasDoctypeSession(definition.name)) return;
+			offeredDefinitions.add(definition.name);
+			
+			const button = $('<button class="btn btn-xs btn-default" style="margin: 8px 8px 0 0;"></button>')
+				.text(`Create DocType Session for ${definition.name}`)
+				.on('click', function() {
+					button.prop('disabled', true);
+					createDoctypeSession(definition.name, definition);
+				});
+			$('#thinking-message .definition-actions').append(button);
+		});
 	}
 
 	function sendMessage() {
@@ -511,57 +752,43 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 		
 		if (!message) return;
 		
-		input.prop('disabled', true);
-		$('#send-button').prop('disabled', true).html('<i class="fa fa-spinner fa-spin"></i> Sending...');
-		
-		addMessageToUI('user', message);
+		// The message of a resend is shown already
+		const resend = failedSend && failedSend.message === message;
+		if (!resend) {
+			addMessageToUI('user', message);
+		}
 		input.val('');
 		
-		// Add a "thinking" indicator
-		const thinkingDiv = $(`
-			<div class="message assistant" id="thinking-message">
-				<div class="message-header">Claude AI</div>
-				<div class="message-content">
-					<i class="fa fa-circle-o-notch fa-spin"></i> Thinking... This may take up to 3 minutes for complex requests.
-				</div>
-			</div>
-		`);
-		$('#messages-container').append(thinkingDiv);
-		$('#messages-container').scrollTop($('#messages-container')[0].scrollHeight);
+		// Streamed text replaces the thinking indicator as it arrives
+		showThinking(resend ? failedSend.streamId : frappe.utils.get_random(10));
+		sentStreams.add(activeStream.id);
+		failedSend = null;
 		
 		frappe.call({
 			method: 'leet_devops.api.claude_api.send_message_to_claude',
 			args: {
 				session_name: currentSession.name,
 				message: message,
-				doctype_session_name: currentDoctypeSession
+				doctype_session_name: currentDoctypeSession,
+				stream: 1,
+				stream_id: activeStream.id
 			},
 			callback: function(r) {
-				// Remove thinking indicator
-				$('#thinking-message').remove();
-				
-				input.prop('disabled', false);
-				$('#send-button').prop('disabled', false).text('Send');
-				
-				if (r.message.error) {
-					frappe.msgprint({
-						title: 'Error',
-						indicator: 'red',
-						message: r.message.error + (r.message.details ? '<br><br><small>' + r.message.details + '</small>' : '')
-					});
+				if (r.message.queued) {
+					// The reply is generated by a background job
+					trackChatJob(r.message.job);
 				} else {
-					addMessageToUI('assistant', r.message.message);
-					checkForDoctypeDefinition(r.message.message);
-					loadSession();
+					finishMessage(r.message);
 				}
-				
-				input.focus();
 			},
 			error: function(err) {
+				failedSend = { message: message, streamId: activeStream.id };
+				
 				// Remove thinking indicator
+				activeStream = null;
 				$('#thinking-message').remove();
 				
-				input.prop('disabled', false);
+				$('#chat-input').prop('disabled', false);
 				$('#send-button').prop('disabled', false).text('Send');
 				frappe.msgprint({
 					title: 'Error',
@@ -572,22 +799,119 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 		});
 	}
 
-	function addMessageToUI(role, content) {
-		const container = $('#messages-container');
-		const timestamp = new Date().toLocaleString();
+	function showThinking(streamId) {
+		$('#chat-input').prop('disabled', true);
+		$('#send-button').prop('disabled', true).html('<i class="fa fa-spinner fa-spin"></i> Sending...');
 		
-		const messageDiv = $(`
-			<div class="message ${role}">
-				<div class="message-header">
-					${role === 'user' ? 'You' : 'Claude AI'}
-					<span style="float: right; font-weight: normal;">${timestamp}</span>
+		// Add a "thinking" indicator
+		const thinkingDiv = $(`
+			<div class="message assistant" id="thinking-message">
+				<div class="message-header">Claude AI</div>
+				<div class="message-content">
+					<i class="fa fa-circle-o-notch fa-spin"></i> Thinking... This may take up to 3 minutes for complex requests.
 				</div>
-				<div class="message-content">${formatMessage(content)}</div>
+				<div class="definition-actions"></div>
 			</div>
 		`);
+		$('#messages-container').append(thinkingDiv);
+		$('#messages-container').scrollTop($('#messages-container')[0].scrollHeight);
+		
+		activeStream = { id: streamId, text: '' };
+		offeredDefinitions = new Set();
+	}
+
+	function finishMessage(result) {
+		// Remove thinking indicator
+		activeStream = null;
+		$('#thinking-message').remove();
+		
+		const input = $('#chat-input');
+		input.prop('disabled', false);
+		$('#send-button').prop('disabled', false).text('Send');
+		
+		if (result.error) {
+			frappe.msgprint({
+				title: 'Error',
+				indicator: 'red',
+				message: result.error + (result.details ? '<br><br><small>' + result.details + '</small>' : '')
+			});
+		} else {
+			addMessageToUI('assistant', result.message);
+			// Definitions returned through the DocType tool are saved already
+			(result.saved_definitions || []).forEach(name => createdDefinitions.add(name));
+			checkForDoctypeDefinition(result.message);
+			showPatchResult(result.patch);
+		}
+		
+		input.focus();
+	}
+
+	function showPatchResult(patch) {
+		if (!patch) {
+			return;
+		}
+		
+		if (patch.error) {
+			frappe.msgprint({
+				title: 'Patch Not Applied',
+				indicator: 'orange',
+				message: patch.error
+			});
+		} else {
+			frappe.show_alert({
+				message: 'Definition updated to revision ' + patch.revision,
+				indicator: 'green'
+			});
+		}
+	}
+
+	function trackChatJob(jobName) {
+		pendingJob = jobName;
+		
+		// Polling covers realtime events missed e.g. during a socket reconnect
+		clearInterval(jobPoller);
+		jobPoller = setInterval(() => {
+			frappe.call({
+				method: 'leet_devops.api.claude_api.get_chat_job',
+				args: { job_name: jobName },
+				callback: r => onChatJobUpdate(r.message)
+			});
+		}, 5000);
+	}
+
+	function onChatJobUpdate(data) {
+		if (!data || !pendingJob || data.job !== pendingJob) return;
+		if (data.status !== 'Completed' && data.status !== 'Failed') return;
 		
-		container.append(messageDiv);
-		container.scrollTop(container[0].scrollHeight);
+		pendingJob = null;
+		clearInterval(jobPoller);
+		finishMessage(data);
+	}
+
+	function resumeChatJobs() {
+		// Pick up a reply that was still being generated when the page was left
+		frappe.call({
+			method: 'leet_devops.api.claude_api.get_active_chat_jobs',
+			args: { session_name: sessionName },
+			callback: function(r) {
+				if (!r.message || !r.message.jobs || !r.message.jobs.length || pendingJob) return;
+				
+				const job = r.message.jobs[r.message.jobs.length - 1];
+				switchDoctypeSession(job.doctype_session_name || '');
+				addMessageToUI('user', job.message);
+				showThinking(job.stream_id);
+				sentStreams.add(job.stream_id);
+				trackChatJob(job.name);
+			}
+		});
+	}
+
+	function addMessageToUI(role, content) {
+		messageList.appendMessage({
+			role: role,
+			content: content,
+			timestamp: new Date().toISOString()
+		});
 	}
 
 	function checkForDoctypeDefinition(message) {
@@ -596,7 +920,7 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 		if (jsonMatch) {
 			try {
 				const definition = JSON.parse(jsonMatch[1]);
-				if (definition.doctype === 'DocType' && definition.name) {
+				if (definition.doctype === 'DocType' && definition.name && !hasDoctypeSession(definition.name)) {
 					frappe.confirm(
 						`I found a DocType definition for "${definition.name}". Would you like to create a session for it?`,
 						() => createDoctypeSession(definition.name, definition)
@@ -608,6 +932,11 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 		}
 	}
 
+	function hasDoctypeSession(doctypeName) {
+		return createdDefinitions.has(doctypeName)
+			|| (currentSession.doctype_sessions || []).some(dt => dt.doctype_name === doctypeName);
+	}
+
 	function createDoctypeSession(doctypeName, definition) {
 		frappe.call({
 			method: 'leet_devops.api.claude_api.create_doctype_session',
@@ -624,11 +953,11 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 						message: r.message.error
 					});
 				} else {
+					createdDefinitions.add(doctypeName);
 					frappe.show_alert({
 						message: `DocType session created for ${doctypeName}`,
 						indicator: 'green'
 					});
-					loadSession();
 				}
 			}
 		});
@@ -646,21 +975,15 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 						session_name: currentSession.name
 					},
 					callback: function(r) {
-						$('#apply-button').prop('disabled', false).text('Apply Changes');
-						
 						if (r.message.error) {
+							setApplying(false);
 							frappe.msgprint({
 								title: 'Error',
 								indicator: 'red',
 								message: 'Error applying changes: ' + r.message.error
 							});
 						} else {
-							frappe.show_alert({
-								message: 'Changes applied successfully!',
-								indicator: 'green'
-							});
-							showChangesPreview(r.message.results);
-							loadSession();
+							trackApply();
 						}
 					}
 				});
@@ -668,6 +991,106 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 		);
 	}
 
+	function cancelApply() {
+		$('#cancel-apply-button').prop('disabled', true).text('Cancelling...');
+		
+		frappe.call({
+			method: 'leet_devops.api.claude_api.cancel_apply',
+			args: {
+				session_name: currentSession.name
+			},
+			callback: function(r) {
+				if (r.message.error) {
+					frappe.msgprint(r.message.error);
+				}
+			}
+		});
+	}
+
+	function setApplying(applying) {
+		$('#apply-button').prop('disabled', applying).text(applying ? 'Applying...' : 'Apply Changes');
+		$('#cancel-apply-button').toggle(applying).prop('disabled', false).text('Cancel Apply');
+	}
+
+	function trackApply() {
+		setApplying(true);
+		$('#changes-content').html('<pre class="apply-log" id="apply-log"></pre>');
+		$('#changes-preview').show();
+		
+		// Covers a result event missed while the page was reconnecting
+		clearInterval(applyPoller);
+		applyPoller = setInterval(() => {
+			frappe.call({
+				method: 'leet_devops.api.claude_api.get_apply_status',
+				args: { session_name: currentSession.name },
+				callback: r => {
+					if (r.message && !r.message.applying) {
+						finishApply(r.message);
+					}
+				}
+			});
+		}, 10000);
+	}
+
+	function onApplyProgress(data) {
+		const log = document.getElementById('apply-log');
+		if (!log) return;
+		
+		const lines = log.textContent ? log.textContent.split('\n') : [];
+		lines.push(formatApplyProgress(data));
+		log.textContent = lines.slice(-APPLY_LOG_LINES).join('\n');
+		log.scrollTop = log.scrollHeight;
+	}
+
+	function formatApplyProgress(data) {
+		switch (data.phase) {
+			case 'scaffold':
+				return 'Creating app structure...';
+			case 'files':
+				return `Wrote ${data.files} file(s) of ${data.doctype}`;
+			case 'sync':
+				return `Syncing ${data.doctypes.join(', ')}...`;
+			case 'migrate':
+				return `Running bench migrate (${data.reason})...`;
+			case 'migrate_queued':
+				return 'Waiting for another migrate of the bench to finish...';
+			case 'migrate_coalesced':
+				return `Migrating together with ${data.sessions - 1} other apply(s): ${data.apps.join(', ')}`;
+			default:
+				return data.line || '';
+		}
+	}
+
+	function finishApply(result) {
+		// The result arrives as event and through polling, only the first one counts
+		if (!applyPoller) return;
+		
+		clearInterval(applyPoller);
+		applyPoller = null;
+		setApplying(false);
+		
+		if (result.error) {
+			frappe.msgprint({
+				title: 'Error',
+				indicator: 'red',
+				message: 'Error applying changes: ' + result.error
+			});
+		} else if (result.cancelled) {
+			frappe.show_alert({
+				message: 'Applying changes was cancelled',
+				indicator: 'orange'
+			});
+		} else {
+			frappe.show_alert({
+				message: 'Changes applied successfully!',
+				indicator: 'green'
+			});
+		}
+		if (result.results) {
+			showChangesPreview(result.results);
+		}
+	}
+
 	function verifyFiles() {
 		$('#verify-button').prop('disabled', true).text('Verifying...');
 		
@@ -699,7 +1122,6 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 						});
 					}
 					showVerificationResults(r.message.results);
-					loadSession();
 				}
 			}
 		});
@@ -730,7 +1152,6 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 							message: r.message.message + '<br><br>Created sessions for:<br>' + 
 								r.message.doctypes.map(d => '• ' + d).join('<br>')
 						});
-						loadSession(); // Reload to show new tabs
 					} else {
 						frappe.msgprint({
 							title: 'No New Sessions',
@@ -751,7 +1172,7 @@ frappe.pages['app-development-chat'].on_page_load = function(wrapper) {
 				html += `
 					<div class="change-item">
 						<strong>${result.doctype}</strong>: ${result.status}
-						${result.files ? `<br><small>Files: ${result.files.join(', ')}</small>` : ''}
+						${result.files && result.files.length ? `<br><small>Files: ${result.files.join(', ')}</small>` : ''}
 						${result.error ? `<br><span style="color: red;">Error: ${result.error}</span>` : ''}
 					</div>
 				`;
@@ -0,0 +1,70 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import json
+from datetime import timedelta
+
+import frappe
+from frappe.utils import get_datetime, now_datetime
+
+FIELDS = [
+	"name", "creation", "modified", "owner", "modified_by",
+	"session", "doctype_session_name", "role", "content", "timestamp"
+]
+
+
+def execute():
+	"""Move the conversation_history JSON of sessions and DocType Sessions into Session Message rows"""
+	if frappe.db.has_column("App Development Session", "conversation_history"):
+		for row in frappe.db.sql("""
+			select name, owner, conversation_history
+			from `tabApp Development Session`
+			where ifnull(conversation_history, '') != ''""", as_dict=True):
+			move_history(row.name, None, row.owner, row.conversation_history)
+			frappe.db.sql("""update `tabApp Development Session`
+				set conversation_history = null where name = %s""", row.name)
+			frappe.db.commit()
+
+	if frappe.db.has_column("DocType Session", "conversation_history"):
+		for row in frappe.db.sql("""
+			select name, parent, doctype_name, owner, conversation_history
+			from `tabDocType Session`
+			where parenttype = 'App Development Session'
+				and ifnull(conversation_history, '') != ''""", as_dict=True):
+			move_history(row.parent, row.doctype_name, row.owner, row.conversation_history)
+			frappe.db.sql("""update `tabDocType Session`
+				set conversation_history = null where name = %s""", row.name)
+			frappe.db.commit()
+
+
+def move_history(session_name, doctype_session_name, owner, conversation_history):
+	try:
+		history = json.loads(conversation_history)
+	except json.JSONDecodeError:
+		return
+
+	if not isinstance(history, list):
+		return
+
+	values = []
+	# Messages are read back in creation order, keep it strictly increasing
+	creation = None
+	for msg in history:
+		if not isinstance(msg, dict) or msg.get("role") not in ("user", "assistant"):
+			continue
+
+		try:
+			timestamp = get_datetime(msg.get("timestamp")) if msg.get("timestamp") else None
+		except Exception:
+			timestamp = None
+
+		candidate = timestamp or now_datetime()
+		creation = max(candidate, creation + timedelta(microseconds=1)) if creation else candidate
+
+		values.append((
+			frappe.generate_hash(), creation, creation, owner, owner,
+			session_name, doctype_session_name, msg["role"], msg.get("content") or "", timestamp
+		))
+
+	if values:
+		frappe.db.bulk_insert("Session Message", FIELDS, values)
@@ -0,0 +1,28 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import cint
+
+from leet_devops.leet_devops.doctype.file_change_log.file_change_log import SERIES_KEY
+
+
+def execute():
+	"""
+	Continue the "FILE-LOG-" series after the highest existing File Change Log
+
+	Names made by the former "format:FILE-LOG-{#####}" autoname were counted
+	in the series without prefix, the "FILE-LOG-.#####" autoname counts in
+	the "FILE-LOG-" one.
+	"""
+	highest = frappe.db.sql("""
+		select max(cast(substring(`name`, %s) as unsigned))
+		from `tabFile Change Log`
+		where `name` like %s""", (len(SERIES_KEY) + 1, SERIES_KEY + "%"))
+	highest = cint(highest[0][0]) if highest else 0
+
+	current = frappe.db.sql("select `current` from `tabSeries` where `name` = %s for update", SERIES_KEY)
+	if not current:
+		frappe.db.sql("insert into `tabSeries` (`name`, `current`) values (%s, %s)", (SERIES_KEY, highest))
+	elif cint(current[0][0]) < highest:
+		frappe.db.sql("update `tabSeries` set `current` = %s where `name` = %s", (highest, SERIES_KEY))
@@ -2,9 +2,39 @@
 
 let currentSession = null;
 let currentDoctypeSession = null;
+let activeStream = null;
+let pendingJob = null;
+let jobPoller = null;
+let jobsResumed = false;
+let applyPoller = null;
+let historyCursor = null;
+let historyHasMore = false;
+let historyLoading = false;
+let messageList = null;
+// Server messages of the shown conversation, oldest first, as cached in IndexedDB
+let loadedMessages = [];
+// Message events that arrived while a page of history was loading
+let pendingMessageEvents = [];
+// Stream ids of the requests sent from this page, their messages are shown already
+const sentStreams = new Set();
+// Message and stream id of a send that failed with a network error, sending the
+// same message again reuses the id so the server answers it only once
+let failedSend = null;
+// DocType definitions offered during the current reply, and the ones a session was created for
+let offeredDefinitions = new Set();
+const createdDefinitions = new Set();
+
+// Messages fetched per request, older ones are loaded on scroll
+const HISTORY_PAGE_SIZE = 50;
+// Lines of progress and migrate output shown while changes are applied
+const APPLY_LOG_LINES = 200;
 
 // Initialize on page load
 frappe.ready(function() {
+    messageList = new leetDevops.MessageList(document.getElementById('messages-container'), {
+        workerUrl: '/assets/leet_devops/js/message_format_worker.js',
+        renderEmpty: renderGreeting
+    });
     loadSessionFromUrl();
     setupEventListeners();
 });
@@ -19,6 +49,144 @@ function setupEventListeners() {
     });
     document.getElementById('apply-button').addEventListener('click', applyChanges);
     document.getElementById('verify-button').addEventListener('click', verifyFiles);
+    document.getElementById('cancel-apply-button').addEventListener('click', cancelApply);
+    
+    const messagesContainer = document.getElementById('messages-container');
+    messagesContainer.addEventListener('scroll', () => {
+        if (messagesContainer.scrollTop < 80) {
+            loadOlderMessages();
+        }
+    });
+    messagesContainer.addEventListener('click', (e) => {
+        if (e.target.closest('.older-messages')) {
+            loadOlderMessages();
+        }
+    });
+    
+    // Realtime is not available on every website setup, replies then arrive in one piece
+    if (frappe.realtime) {
+        frappe.realtime.on('claude_stream', onStreamEvent);
+        frappe.realtime.on('claude_job_update', onChatJobUpdate);
+        frappe.realtime.on('leet_devops_session_event', onSessionEvent);
+    }
+}
+
+function onSessionEvent(data) {
+    if (!currentSession || data.session !== currentSession.name) return;
+    
+    if (data.type === 'status') {
+        currentSession.status = data.status;
+        currentSession.verification_status = data.verification_status;
+        renderSessionInfo();
+    } else if (data.type === 'doctype_session') {
+        updateDoctypeSession(data.doctype_session);
+    } else if (data.type === 'message') {
+        onMessageEvent(data);
+    } else if (data.type === 'verification') {
+        showVerificationResults(data.results);
+    } else if (data.type === 'apply_progress') {
+        onApplyProgress(data);
+    } else if (data.type === 'apply_result') {
+        finishApply(data.result);
+    }
+}
+
+function updateDoctypeSession(row) {
+    const rows = currentSession.doctype_sessions = currentSession.doctype_sessions || [];
+    const existing = rows.find(dt => dt.doctype_name === row.doctype_name);
+    
+    if (existing) {
+        Object.assign(existing, row);
+    } else {
+        rows.push(row);
+    }
+    
+    renderSessionInfo();
+    renderDoctypeTabs();
+}
+
+function onMessageEvent(data) {
+    // Other conversations are brought up to date when their tab is opened
+    if ((data.doctype_session_name || null) !== currentDoctypeSession) return;
+    if (historyLoading) {
+        // Merged once the page arrives, which may include the message already
+        pendingMessageEvents.push(data);
+        return;
+    }
+    if (loadedMessages.some(msg => msg.name === data.message.name)) return;
+    
+    // Messages sent from this page are shown already, they are only
+    // recorded so the cached conversation has no gaps
+    if (!sentStreams.has(data.origin)) {
+        messageList.appendMessage(data.message);
+    }
+    loadedMessages.push(data.message);
+    saveConversationCache();
+}
+
+function refreshWithoutRealtime() {
+    // Without realtime no session events arrive, read the session again instead
+    if (!frappe.realtime) {
+        loadSession(currentSession.name);
+    }
+}
+
+function onStreamEvent(data) {
+    // Ignore events of other tabs or of a request that already finished
+    if (!activeStream || data.stream_id !== activeStream.id) return;
+    
+    if (data.reset) {
+        activeStream.text = '';
+    }
+    if (data.delta) {
+        activeStream.text += data.delta;
+    }
+    
+    const messagesContainer = document.getElementById('messages-container');
+    let streamDiv = document.getElementById('streaming-message');
+    if (!streamDiv) {
+        streamDiv = document.createElement('div');
+        streamDiv.id = 'streaming-message';
+        streamDiv.className = 'message assistant';
+        streamDiv.innerHTML = `
+            <div class="message-header">Claude AI</div>
+            <div class="message-content" style="white-space: pre-wrap;"></div>
+            <div class="definition-actions"></div>
+        `;
+        messagesContainer.appendChild(streamDiv);
+    }
+    
+    streamDiv.querySelector('.message-content').textContent = activeStream.text;
+    if (data.definitions) {
+        offerDefinitions(streamDiv, data.definitions);
+    }
+    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+}
+
+function offerDefinitions(streamDiv, definitions) {
+    // Definitions whose code block closed can be used before the reply ends
+    definitions.forEach(definition => {
+        if (offeredDefinitions.has(definition.name) || hasDoctypeSession(definition.name)) return;
+        offeredDefinitions.add(definition.name);
+        
+        const button = document.createElement('button');
+        button.className = 'btn btn-xs btn-default';
+        button.style.margin = '8px 8px 0 0';
+        button.textContent = `Create DocType Session for ${definition.name}`;
+        button.addEventListener('click', () => {
+            button.disabled = true;
+            createDoctypeSession(definition.name, definition);
+        });
+        streamDiv.querySelector('.definition-actions').appendChild(button);
+    });
+}
+
+function endStream() {
+    activeStream = null;
+    const streamDiv = document.getElementById('streaming-message');
+    if (streamDiv) {
+        streamDiv.remove();
+    }
 }
 
 function loadSessionFromUrl() {
@@ -34,17 +202,30 @@ function loadSessionFromUrl() {
 
 function loadSession(sessionName) {
     frappe.call({
-        method: 'frappe.client.get',
+        method: 'leet_devops.api.claude_api.get_session_overview',
         args: {
-            doctype: 'App Development Session',
-            name: sessionName
+            session_name: sessionName
         },
         callback: function(r) {
-            if (r.message) {
-                currentSession = r.message;
+            if (r.message && r.message.session) {
+                currentSession = r.message.session;
                 renderSessionInfo();
                 renderDoctypeTabs();
                 loadConversationHistory();
+                
+                if (!jobsResumed) {
+                    jobsResumed = true;
+                    // Changes made by other pages and background jobs arrive as session events
+                    if (frappe.realtime && frappe.realtime.doc_subscribe) {
+                        frappe.realtime.doc_subscribe('App Development Session', currentSession.name);
+                    }
+                    resumeChatJobs();
+                    
+                    // Apply keeps running in the background when the page is left
+                    if (currentSession.status === 'Applying Changes') {
+                        trackApply();
+                    }
+                }
             } else {
                 showError('Session not found');
             }
@@ -84,7 +265,7 @@ function renderDoctypeTabs() {
     const tabsContainer = document.getElementById('doctype-tabs');
     
     let tabs = `
-        <div class="doctype-tab active" data-doctype="">
+        <div class="doctype-tab ${currentDoctypeSession ? '' : 'active'}" data-doctype="">
             Main App
         </div>
     `;
@@ -92,7 +273,7 @@ function renderDoctypeTabs() {
     if (currentSession.doctype_sessions) {
         currentSession.doctype_sessions.forEach(dt => {
             tabs += `
-                <div class="doctype-tab" data-doctype="${dt.doctype_name}">
+                <div class="doctype-tab ${dt.doctype_name === currentDoctypeSession ? 'active' : ''}" data-doctype="${dt.doctype_name}">
                     ${dt.doctype_title || dt.doctype_name}
                     <span class="status-badge ${getStatusClass(dt.status)}">${dt.status}</span>
                 </div>
@@ -133,75 +314,147 @@ function switchDoctypeSession(doctypeName) {
 }
 
 function loadConversationHistory() {
-    const messagesContainer = document.getElementById('messages-container');
-    let history = [];
-    
-    try {
-        if (currentDoctypeSession) {
-            // Load specific DocType session history
-            const dtSession = currentSession.doctype_sessions.find(
-                dt => dt.doctype_name === currentDoctypeSession
-            );
-            if (dtSession && dtSession.conversation_history) {
-                history = JSON.parse(dtSession.conversation_history);
-            }
+    const doctypeSession = currentDoctypeSession;
+    historyLoading = true;
+    pendingMessageEvents = [];
+    
+    leetDevops.messageCache.get(currentSession.name, doctypeSession).then(cached => {
+        // Ignore replies for a tab that is no longer shown
+        if (doctypeSession !== currentDoctypeSession) return;
+        
+        if (cached && cached.messages.length) {
+            // Show the cached copy right away, then only fetch what is new
+            loadedMessages = cached.messages;
+            historyCursor = cached.cursor;
+            historyHasMore = cached.has_more;
+            renderConversation(loadedMessages);
         } else {
-            // Load main session history
-            if (currentSession.conversation_history) {
-                history = JSON.parse(currentSession.conversation_history);
-            }
+            loadedMessages = [];
+            historyCursor = null;
+            historyHasMore = false;
         }
-    } catch (e) {
-        console.error('Error parsing conversation history:', e);
-    }
+        
+        const newest = loadedMessages[loadedMessages.length - 1];
+        fetchMessages({after: newest && newest.name}, function(page) {
+            if (doctypeSession !== currentDoctypeSession) return;
+            
+            historyLoading = false;
+            
+            if (page.delta) {
+                page.messages.forEach(msg => messageList.appendMessage(msg));
+                loadedMessages = loadedMessages.concat(page.messages);
+            } else {
+                loadedMessages = page.messages;
+                historyCursor = page.cursor;
+                historyHasMore = page.has_more;
+                renderConversation(loadedMessages);
+            }
+            
+            saveConversationCache();
+            applyPendingMessageEvents();
+            fillViewport();
+        });
+    });
+}
+
+function loadOlderMessages() {
+    if (historyLoading || !historyHasMore) return;
     
-    if (history.length === 0) {
-        messagesContainer.innerHTML = `
-            <div class="message assistant">
-                <div class="message-header">Claude AI</div>
-                <div class="message-content">
-                    Hello! I'm here to help you develop your Frappe app. 
-                    ${currentDoctypeSession 
-                        ? `We're working on the ${currentDoctypeSession} DocType. How can I help you modify or improve it?`
-                        : 'You can ask me to create DocTypes, explain concepts, or help with your app architecture.'}
-                </div>
-            </div>
-        `;
-    } else {
-        messagesContainer.innerHTML = history.map(msg => {
-            const timestamp = msg.timestamp ? new Date(msg.timestamp).toLocaleString() : '';
-            return `
-                <div class="message ${msg.role}">
-                    <div class="message-header">
-                        ${msg.role === 'user' ? 'You' : 'Claude AI'}
-                        ${timestamp ? `<span style="float: right; font-weight: normal; font-size: 11px;">${timestamp}</span>` : ''}
-                    </div>
-                    <div class="message-content">${formatMessage(msg.content)}</div>
-                </div>
-            `;
-        }).join('');
-    }
+    const doctypeSession = currentDoctypeSession;
+    historyLoading = true;
+    renderOlderIndicator();
     
-    // Scroll to bottom
-    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    fetchMessages({before: historyCursor}, function(page) {
+        if (doctypeSession !== currentDoctypeSession) return;
+        
+        historyLoading = false;
+        historyCursor = page.cursor || historyCursor;
+        historyHasMore = page.has_more;
+        
+        document.querySelectorAll('#messages-container .older-messages').forEach(el => el.remove());
+        messageList.prependMessages(page.messages);
+        renderOlderIndicator();
+        
+        loadedMessages = page.messages.concat(loadedMessages);
+        saveConversationCache();
+        applyPendingMessageEvents();
+    });
+}
+
+function applyPendingMessageEvents() {
+    const events = pendingMessageEvents;
+    pendingMessageEvents = [];
+    events.forEach(onMessageEvent);
 }
 
-function formatMessage(content) {
-    // Convert markdown-style code blocks to HTML
-    content = content.replace(/```(\w+)?\n([\s\S]*?)```/g, (match, lang, code) => {
-        return `<pre><code>${escapeHtml(code)}</code></pre>`;
+function fetchMessages(cursor, callback) {
+    frappe.call({
+        method: 'leet_devops.api.claude_api.get_session_messages',
+        args: Object.assign({
+            session_name: currentSession.name,
+            doctype_session_name: currentDoctypeSession,
+            limit: HISTORY_PAGE_SIZE
+        }, cursor),
+        callback: function(r) {
+            if (!r.message || r.message.error) {
+                console.error('Error loading conversation history:', r.message && r.message.error);
+                // Keep a cached copy on screen, otherwise show an empty conversation
+                callback({messages: [], delta: Boolean(cursor.after), has_more: false, cursor: null});
+                return;
+            }
+            callback(r.message);
+        }
+    });
+}
+
+function saveConversationCache() {
+    leetDevops.messageCache.put(currentSession.name, currentDoctypeSession, {
+        messages: loadedMessages,
+        has_more: historyHasMore,
+        cursor: historyCursor
     });
+}
+
+function renderOlderIndicator() {
+    const messagesContainer = document.getElementById('messages-container');
+    messagesContainer.querySelectorAll('.older-messages').forEach(el => el.remove());
     
-    // Convert newlines to <br>
-    content = content.replace(/\n/g, '<br>');
+    if (historyHasMore) {
+        messagesContainer.insertAdjacentHTML('afterbegin', `
+            <div class="older-messages" style="text-align: center; color: #888; cursor: pointer; margin-bottom: 15px;">
+                ${historyLoading ? 'Loading older messages...' : 'Scroll up or click to load older messages'}
+            </div>
+        `);
+    }
+}
+
+function renderConversation(history) {
+    document.querySelectorAll('#messages-container .older-messages').forEach(el => el.remove());
+    messageList.setMessages(history);
+    renderOlderIndicator();
+}
+
+function fillViewport() {
+    const messagesContainer = document.getElementById('messages-container');
     
-    return content;
+    // Without a scrollbar there is no scroll event to page with
+    if (historyHasMore && messagesContainer.scrollHeight <= messagesContainer.clientHeight) {
+        loadOlderMessages();
+    }
 }
 
-function escapeHtml(text) {
-    const div = document.createElement('div');
-    div.textContent = text;
-    return div.innerHTML;
+function renderGreeting() {
+    return `
+        <div class="message assistant">
+            <div class="message-header">Claude AI</div>
+            <div class="message-content">
+                Hello! I'm here to help you develop your Frappe app. 
+                ${currentDoctypeSession 
+                    ? `We're working on the ${currentDoctypeSession} DocType. How can I help you modify or improve it?`
+                    : 'You can ask me to create DocTypes, explain concepts, or help with your app architecture.'}
+            </div>
+        </div>
+    `;
 }
 
 function sendMessage() {
@@ -214,40 +467,40 @@ function sendMessage() {
     input.disabled = true;
     document.getElementById('send-button').disabled = true;
     
-    // Add user message to UI immediately
-    addMessageToUI('user', message);
+    // Add user message to UI immediately, the message of a resend is shown already
+    const resend = failedSend && failedSend.message === message;
+    if (!resend) {
+        addMessageToUI('user', message);
+    }
     input.value = '';
     
+    // Streamed text is shown as it arrives and replaced by the final reply
+    activeStream = { id: resend ? failedSend.streamId : frappe.utils.get_random(10), text: '' };
+    offeredDefinitions = new Set();
+    sentStreams.add(activeStream.id);
+    failedSend = null;
+    
     // Send to API
     frappe.call({
         method: 'leet_devops.api.claude_api.send_message_to_claude',
         args: {
             session_name: currentSession.name,
             message: message,
-            doctype_session_name: currentDoctypeSession
+            doctype_session_name: currentDoctypeSession,
+            stream: frappe.realtime ? 1 : 0,
+            stream_id: activeStream.id
         },
         callback: function(r) {
-            input.disabled = false;
-            document.getElementById('send-button').disabled = false;
-            
-            if (r.message.error) {
-                showError('Error: ' + r.message.error);
-                if (r.message.details) {
-                    console.error(r.message.details);
-                }
+            if (r.message.queued) {
+                // The reply is generated by a background job
+                trackChatJob(r.message.job);
             } else {
-                addMessageToUI('assistant', r.message.message);
-                
-                // Check if response contains DocType definition
-                checkForDoctypeDefinition(r.message.message);
-                
-                // Reload session to get updated data
-                loadSession(currentSession.name);
+                finishMessage(r.message);
             }
-            
-            input.focus();
         },
         error: function(err) {
+            failedSend = { message: message, streamId: activeStream.id };
+            endStream();
             input.disabled = false;
             document.getElementById('send-button').disabled = false;
             showError('Network error: ' + err.message);
@@ -255,22 +508,93 @@ function sendMessage() {
     });
 }
 
-function addMessageToUI(role, content) {
-    const messagesContainer = document.getElementById('messages-container');
-    const timestamp = new Date().toLocaleString();
-    
-    const messageDiv = document.createElement('div');
-    messageDiv.className = `message ${role}`;
-    messageDiv.innerHTML = `
-        <div class="message-header">
-            ${role === 'user' ? 'You' : 'Claude AI'}
-            <span style="float: right; font-weight: normal; font-size: 11px;">${timestamp}</span>
-        </div>
-        <div class="message-content">${formatMessage(content)}</div>
-    `;
+function finishMessage(result) {
+    const input = document.getElementById('chat-input');
     
-    messagesContainer.appendChild(messageDiv);
-    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    endStream();
+    input.disabled = false;
+    document.getElementById('send-button').disabled = false;
+    
+    if (result.error) {
+        showError('Error: ' + result.error);
+        if (result.details) {
+            console.error(result.details);
+        }
+    } else {
+        addMessageToUI('assistant', result.message);
+        
+        // Definitions returned through the DocType tool are saved already
+        (result.saved_definitions || []).forEach(name => createdDefinitions.add(name));
+        
+        // Check if response contains DocType definition
+        checkForDoctypeDefinition(result.message);
+        
+        // Edits to a DocType come back as a JSON Patch applied on the server
+        if (result.patch) {
+            if (result.patch.error) {
+                showError('Patch not applied: ' + result.patch.error);
+            } else {
+                showSuccess('Definition updated to revision ' + result.patch.revision);
+            }
+        }
+        
+        refreshWithoutRealtime();
+    }
+    
+    input.focus();
+}
+
+function trackChatJob(jobName) {
+    pendingJob = jobName;
+    
+    // Polling is the only channel when realtime is unavailable and covers missed events otherwise
+    clearInterval(jobPoller);
+    jobPoller = setInterval(() => {
+        frappe.call({
+            method: 'leet_devops.api.claude_api.get_chat_job',
+            args: { job_name: jobName },
+            callback: r => onChatJobUpdate(r.message)
+        });
+    }, frappe.realtime ? 5000 : 2000);
+}
+
+function onChatJobUpdate(data) {
+    if (!data || !pendingJob || data.job !== pendingJob) return;
+    if (data.status !== 'Completed' && data.status !== 'Failed') return;
+    
+    pendingJob = null;
+    clearInterval(jobPoller);
+    finishMessage(data);
+}
+
+function resumeChatJobs() {
+    // Pick up a reply that was still being generated when the page was left
+    frappe.call({
+        method: 'leet_devops.api.claude_api.get_active_chat_jobs',
+        args: { session_name: currentSession.name },
+        callback: function(r) {
+            if (!r.message || !r.message.jobs || !r.message.jobs.length || pendingJob) return;
+            
+            const job = r.message.jobs[r.message.jobs.length - 1];
+            switchDoctypeSession(job.doctype_session_name || '');
+            addMessageToUI('user', job.message);
+            
+            document.getElementById('chat-input').disabled = true;
+            document.getElementById('send-button').disabled = true;
+            activeStream = { id: job.stream_id, text: '' };
+            offeredDefinitions = new Set();
+            sentStreams.add(job.stream_id);
+            trackChatJob(job.name);
+        }
+    });
+}
+
+function addMessageToUI(role, content) {
+    messageList.appendMessage({
+        role: role,
+        content: content,
+        timestamp: new Date().toISOString()
+    });
 }
 
 function checkForDoctypeDefinition(message) {
@@ -280,7 +604,7 @@ function checkForDoctypeDefinition(message) {
     if (jsonMatch) {
         try {
             const definition = JSON.parse(jsonMatch[1]);
-            if (definition.doctype === 'DocType' && definition.name) {
+            if (definition.doctype === 'DocType' && definition.name && !hasDoctypeSession(definition.name)) {
                 // Offer to create a DocType session
                 if (confirm(`I found a DocType definition for "${definition.name}". Would you like to create a session for it?`)) {
                     createDoctypeSession(definition.name, definition);
@@ -292,6 +616,11 @@ function checkForDoctypeDefinition(message) {
     }
 }
 
+function hasDoctypeSession(doctypeName) {
+    return createdDefinitions.has(doctypeName)
+        || (currentSession.doctype_sessions || []).some(dt => dt.doctype_name === doctypeName);
+}
+
 function createDoctypeSession(doctypeName, definition) {
     frappe.call({
         method: 'leet_devops.api.claude_api.create_doctype_session',
@@ -304,8 +633,9 @@ function createDoctypeSession(doctypeName, definition) {
             if (r.message.error) {
                 showError(r.message.error);
             } else {
+                createdDefinitions.add(doctypeName);
                 showSuccess(`DocType session created for ${doctypeName}`);
-                loadSession(currentSession.name);
+                refreshWithoutRealtime();
             }
         }
     });
@@ -325,20 +655,115 @@ function applyChanges() {
             session_name: currentSession.name
         },
         callback: function(r) {
-            document.getElementById('apply-button').disabled = false;
-            document.getElementById('apply-button').textContent = 'Apply Changes';
-            
             if (r.message.error) {
+                setApplying(false);
                 showError('Error applying changes: ' + r.message.error);
             } else {
-                showSuccess('Changes applied successfully!');
-                showChangesPreview(r.message.results);
-                loadSession(currentSession.name);
+                trackApply();
             }
         }
     });
 }
 
+function cancelApply() {
+    const cancelButton = document.getElementById('cancel-apply-button');
+    cancelButton.disabled = true;
+    cancelButton.textContent = 'Cancelling...';
+    
+    frappe.call({
+        method: 'leet_devops.api.claude_api.cancel_apply',
+        args: {
+            session_name: currentSession.name
+        },
+        callback: function(r) {
+            if (r.message.error) {
+                showError(r.message.error);
+            }
+        }
+    });
+}
+
+function setApplying(applying) {
+    const applyButton = document.getElementById('apply-button');
+    applyButton.disabled = applying;
+    applyButton.textContent = applying ? 'Applying...' : 'Apply Changes';
+    
+    const cancelButton = document.getElementById('cancel-apply-button');
+    cancelButton.style.display = applying ? '' : 'none';
+    cancelButton.disabled = false;
+    cancelButton.textContent = 'Cancel Apply';
+}
+
+function trackApply() {
+    setApplying(true);
+    document.getElementById('changes-content').innerHTML = '<pre class="apply-log" id="apply-log"></pre>';
+    document.getElementById('changes-preview').style.display = 'block';
+    
+    // Polling is the only channel when realtime is unavailable and covers a missed result otherwise
+    clearInterval(applyPoller);
+    applyPoller = setInterval(() => {
+        frappe.call({
+            method: 'leet_devops.api.claude_api.get_apply_status',
+            args: { session_name: currentSession.name },
+            callback: r => {
+                if (r.message && !r.message.applying) {
+                    finishApply(r.message);
+                }
+            }
+        });
+    }, frappe.realtime ? 10000 : 3000);
+}
+
+function onApplyProgress(data) {
+    const log = document.getElementById('apply-log');
+    if (!log) return;
+    
+    const lines = log.textContent ? log.textContent.split('\n') : [];
+    lines.push(formatApplyProgress(data));
+    log.textContent = lines.slice(-APPLY_LOG_LINES).join('\n');
+    log.scrollTop = log.scrollHeight;
+}
+
+function formatApplyProgress(data) {
+    switch (data.phase) {
+        case 'scaffold':
+            return 'Creating app structure...';
+        case 'files':
+            return `Wrote ${data.files} file(s) of ${data.doctype}`;
+        case 'sync':
+            return `Syncing ${data.doctypes.join(', ')}...`;
+        case 'migrate':
+            return `Running bench migrate (${data.reason})...`;
+        case 'migrate_queued':
+            return 'Waiting for another migrate of the bench to finish...';
+        case 'migrate_coalesced':
+            return `Migrating together with ${data.sessions - 1} other apply(s): ${data.apps.join(', ')}`;
+        default:
+            return data.line || '';
+    }
+}
+
+function finishApply(result) {
+    // The result arrives as event and through polling, only the first one counts
+    if (!applyPoller) return;
+    
+    clearInterval(applyPoller);
+    applyPoller = null;
+    setApplying(false);
+    
+    if (result.error) {
+        showError('Error applying changes: ' + result.error);
+    } else if (result.cancelled) {
+        showError('Applying changes was cancelled.');
+    } else {
+        showSuccess('Changes applied successfully!');
+    }
+    if (result.results) {
+        showChangesPreview(result.results);
+    }
+    refreshWithoutRealtime();
+}
+
 function verifyFiles() {
     document.getElementById('verify-button').disabled = true;
     document.getElementById('verify-button').textContent = 'Verifying...';
@@ -361,7 +786,7 @@ function verifyFiles() {
                     showError('Some files are missing or could not be verified.');
                 }
                 showVerificationResults(r.message.results);
-                loadSession(currentSession.name);
+                refreshWithoutRealtime();
             }
         }
     });
@@ -377,7 +802,7 @@ function showChangesPreview(results) {
             html += `
                 <div class="change-item">
                     <strong>${result.doctype}</strong>: ${result.status}
-                    ${result.files ? `<br><small>Files: ${result.files.join(', ')}</small>` : ''}
+                    ${result.files && result.files.length ? `<br><small>Files: ${result.files.join(', ')}</small>` : ''}
                     ${result.error ? `<br><span style="color: red;">Error: ${result.error}</span>` : ''}
                 </div>
             `;
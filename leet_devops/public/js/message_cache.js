@@ -0,0 +1,100 @@
+// Leet Devops - IndexedDB cache of chat conversations
+//
+// One record per user, session and scope (main chat or a DocType) holding
+// the newest messages the page has seen plus the paging cursor, so a page
+// can show a conversation before the server answers and then only ask for
+// the messages newer than the last cached one.
+
+(function(root) {
+    const leetDevops = root.leetDevops = root.leetDevops || {};
+
+    const DB_NAME = 'leet_devops_chat';
+    const DB_VERSION = 1;
+    const STORE = 'conversations';
+
+    // Older messages are dropped from a record beyond this count
+    const MAX_CACHED_MESSAGES = 500;
+
+    let dbPromise = null;
+
+    function openDb() {
+        if (dbPromise) return dbPromise;
+
+        dbPromise = new Promise((resolve) => {
+            if (!root.indexedDB) {
+                resolve(null);
+                return;
+            }
+
+            try {
+                const request = root.indexedDB.open(DB_NAME, DB_VERSION);
+                request.onupgradeneeded = () => {
+                    request.result.createObjectStore(STORE, {keyPath: 'key'});
+                };
+                request.onsuccess = () => resolve(request.result);
+                // Private windows and disabled storage just work without a cache
+                request.onerror = () => resolve(null);
+                request.onblocked = () => resolve(null);
+            } catch (e) {
+                resolve(null);
+            }
+        });
+
+        return dbPromise;
+    }
+
+    function getKey(session, scope) {
+        const user = (root.frappe && frappe.session && frappe.session.user) || 'Guest';
+        return `${user}::${session}::${scope || ''}`;
+    }
+
+    function withStore(mode, callback) {
+        return openDb().then(db => {
+            if (!db) return null;
+
+            return new Promise((resolve) => {
+                try {
+                    const tx = db.transaction(STORE, mode);
+                    const request = callback(tx.objectStore(STORE));
+                    tx.oncomplete = () => resolve(request ? request.result : null);
+                    tx.onerror = () => resolve(null);
+                    tx.onabort = () => resolve(null);
+                } catch (e) {
+                    resolve(null);
+                }
+            });
+        });
+    }
+
+    leetDevops.messageCache = {
+        // Resolves to {messages, has_more, cursor} or null
+        get(session, scope) {
+            return withStore('readonly', store => store.get(getKey(session, scope)))
+                .then(record => record || null);
+        },
+
+        put(session, scope, conversation) {
+            let messages = conversation.messages || [];
+            let hasMore = conversation.has_more;
+            let cursor = conversation.cursor;
+
+            if (messages.length > MAX_CACHED_MESSAGES) {
+                messages = messages.slice(messages.length - MAX_CACHED_MESSAGES);
+                hasMore = true;
+                cursor = messages[0].name;
+            }
+
+            return withStore('readwrite', store => store.put({
+                key: getKey(session, scope),
+                messages: messages,
+                has_more: hasMore,
+                cursor: cursor,
+                updated: Date.now()
+            }));
+        },
+
+        remove(session, scope) {
+            return withStore('readwrite', store => store.delete(getKey(session, scope)));
+        }
+    };
+})(self);
@@ -0,0 +1,23 @@
+// Leet Devops - Chat message formatting
+// Shared by both chat pages and the formatting worker, keep it free of DOM access
+
+(function(root) {
+    const leetDevops = root.leetDevops = root.leetDevops || {};
+
+    leetDevops.escapeHtml = function(text) {
+        return String(text)
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;');
+    };
+
+    leetDevops.formatMessage = function(content) {
+        // Convert markdown-style code blocks to HTML
+        content = (content || '').replace(/```(\w+)?\n([\s\S]*?)```/g, (match, lang, code) => {
+            return `<pre><code>${leetDevops.escapeHtml(code)}</code></pre>`;
+        });
+
+        // Convert newlines to <br>
+        return content.replace(/\n/g, '<br>');
+    };
+})(self);
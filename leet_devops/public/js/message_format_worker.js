@@ -0,0 +1,8 @@
+// Leet Devops - Formats long chat messages off the main thread
+
+importScripts('message_format.js');
+
+self.onmessage = function(e) {
+    const {id, content} = e.data;
+    self.postMessage({id: id, html: self.leetDevops.formatMessage(content)});
+};
@@ -0,0 +1,294 @@
+// Leet Devops - Windowed chat message list
+//
+// Only the messages in and around the visible part of the scroll container
+// are kept in the DOM, the rest is represented by two spacers sized from
+// measured (or estimated) message heights. Formatted HTML is cached per
+// message id, long messages are formatted by a Web Worker.
+
+(function(root) {
+    const leetDevops = root.leetDevops = root.leetDevops || {};
+
+    // Extra pixels rendered above and below the viewport
+    const OVERSCAN = 800;
+
+    // Messages longer than this are formatted in the worker
+    const WORKER_MIN_LENGTH = 2000;
+
+    // Distance from the bottom (px) within which new messages keep the list scrolled down
+    const STICK_TO_BOTTOM = 60;
+
+    let localIds = 0;
+
+    class MessageList {
+        constructor(container, options) {
+            this.container = container;
+            this.options = options || {};
+            this.messages = [];
+            this.heights = new Map();
+            this.htmlCache = new Map();
+            this.rows = new Map();
+            this.pending = new Set();
+            this.frame = null;
+
+            this.root = document.createElement('div');
+            this.root.className = 'message-list';
+            this.topSpacer = document.createElement('div');
+            this.items = document.createElement('div');
+            this.bottomSpacer = document.createElement('div');
+            this.root.append(this.topSpacer, this.items, this.bottomSpacer);
+            container.appendChild(this.root);
+
+            this.worker = this.createWorker();
+            container.addEventListener('scroll', () => this.scheduleRender());
+            root.addEventListener('resize', () => {
+                // Widths changed, every measured height is stale
+                this.heights.clear();
+                this.scheduleRender();
+            });
+        }
+
+        createWorker() {
+            if (!this.options.workerUrl || typeof Worker === 'undefined') return null;
+
+            try {
+                const worker = new Worker(this.options.workerUrl);
+                worker.onmessage = (e) => this.onFormatted(e.data.id, e.data.html);
+                worker.onerror = () => {
+                    // Fall back to formatting on the main thread
+                    this.worker = null;
+                    this.pending.forEach(id => this.onFormatted(id, null));
+                };
+                return worker;
+            } catch (e) {
+                return null;
+            }
+        }
+
+        setMessages(messages) {
+            this.messages = messages.map(msg => this.normalize(msg));
+            this.rows.clear();
+            this.items.replaceChildren();
+            this.render();
+            this.scrollToBottom();
+        }
+
+        prependMessages(messages) {
+            if (!messages.length) return;
+
+            const added = messages.map(msg => this.normalize(msg));
+            this.messages = added.concat(this.messages);
+
+            // The new messages are above the viewport, keep what the user reads in place
+            const addedHeight = added.reduce((sum, msg) => sum + this.getHeight(msg), 0);
+            this.updateSpacers();
+            this.container.scrollTop += addedHeight;
+            this.render();
+        }
+
+        appendMessage(message) {
+            const atBottom = this.isAtBottom();
+            const msg = this.normalize(message);
+            this.messages.push(msg);
+            this.render();
+
+            if (atBottom || msg.role === 'user') {
+                this.scrollToBottom();
+            }
+            return msg.id;
+        }
+
+        clear() {
+            this.setMessages([]);
+        }
+
+        normalize(message) {
+            return {
+                id: message.name || message.id || `local-${++localIds}`,
+                role: message.role,
+                content: message.content || '',
+                timestamp: message.timestamp
+            };
+        }
+
+        isAtBottom() {
+            const c = this.container;
+            return c.scrollHeight - c.scrollTop - c.clientHeight < STICK_TO_BOTTOM;
+        }
+
+        scrollToBottom() {
+            // Rendering the last messages replaces their estimated heights with
+            // measured ones, which moves the bottom, so repeat until it is stable
+            for (let i = 0; i < 3; i++) {
+                const before = this.container.scrollHeight;
+                this.container.scrollTop = before;
+                this.render();
+                if (this.container.scrollHeight === before) break;
+            }
+        }
+
+        scheduleRender() {
+            if (this.frame) return;
+            this.frame = root.requestAnimationFrame(() => {
+                this.frame = null;
+                this.render();
+            });
+        }
+
+        getHeight(msg) {
+            if (this.heights.has(msg.id)) return this.heights.get(msg.id);
+
+            // Header plus wrapped lines, good enough until the message is measured
+            const lines = msg.content.split('\n').reduce(
+                (sum, line) => sum + Math.max(1, Math.ceil(line.length / 90)), 0
+            );
+            return 60 + lines * 20;
+        }
+
+        getListTop() {
+            return this.root.getBoundingClientRect().top
+                - this.container.getBoundingClientRect().top
+                + this.container.scrollTop;
+        }
+
+        getVisibleRange() {
+            const top = this.container.scrollTop - this.getListTop() - OVERSCAN;
+            const bottom = this.container.scrollTop - this.getListTop() + this.container.clientHeight + OVERSCAN;
+
+            let offset = 0;
+            let start = this.messages.length;
+            let end = this.messages.length;
+
+            for (let i = 0; i < this.messages.length; i++) {
+                const height = this.getHeight(this.messages[i]);
+                if (start === this.messages.length && offset + height > top) {
+                    start = i;
+                }
+                if (offset > bottom) {
+                    end = i;
+                    break;
+                }
+                offset += height;
+            }
+
+            return [start, Math.max(start, end)];
+        }
+
+        render() {
+            if (!this.messages.length) {
+                this.rows.clear();
+                this.items.innerHTML = this.options.renderEmpty ? this.options.renderEmpty() : '';
+                this.updateSpacers(0, 0);
+                return;
+            }
+
+            const [start, end] = this.getVisibleRange();
+            const visible = this.messages.slice(start, end);
+            const keep = new Set(visible.map(msg => msg.id));
+
+            this.rows.forEach((row, id) => {
+                if (!keep.has(id)) this.rows.delete(id);
+            });
+
+            this.items.replaceChildren(...visible.map(msg => this.getRow(msg)));
+            this.updateSpacers(start, end);
+
+            // Replace estimates with real heights; rows above the first visible
+            // one shift the content, so compensate the scroll position for them
+            const firstVisible = this.container.scrollTop - this.getListTop();
+            let offset = this.messages.slice(0, start).reduce((sum, msg) => sum + this.getHeight(msg), 0);
+            let shift = 0;
+
+            visible.forEach(msg => {
+                const height = this.rows.get(msg.id).offsetHeight;
+                const previous = this.getHeight(msg);
+                if (height && height !== previous) {
+                    if (offset + previous <= firstVisible) {
+                        shift += height - previous;
+                    }
+                    this.heights.set(msg.id, height);
+                }
+                offset += previous;
+            });
+
+            this.updateSpacers(start, end);
+            if (shift) {
+                this.container.scrollTop += shift;
+            }
+        }
+
+        updateSpacers(start, end) {
+            if (start === undefined) {
+                [start, end] = this.getVisibleRange();
+            }
+
+            let above = 0;
+            let below = 0;
+            this.messages.forEach((msg, i) => {
+                if (i < start) above += this.getHeight(msg);
+                else if (i >= end) below += this.getHeight(msg);
+            });
+
+            this.topSpacer.style.height = `${above}px`;
+            this.bottomSpacer.style.height = `${below}px`;
+        }
+
+        getRow(msg) {
+            let row = this.rows.get(msg.id);
+            if (row) return row;
+
+            row = document.createElement('div');
+            row.className = 'message-row';
+            // Contain the message margin, so offsetHeight is the full row height
+            row.style.display = 'flow-root';
+            row.dataset.id = msg.id;
+
+            const timestamp = msg.timestamp ? new Date(msg.timestamp).toLocaleString() : '';
+            row.innerHTML = `
+                <div class="message ${msg.role}">
+                    <div class="message-header">
+                        ${msg.role === 'user' ? 'You' : 'Claude AI'}
+                        ${timestamp ? `<span style="float: right; font-weight: normal; font-size: 11px;">${timestamp}</span>` : ''}
+                    </div>
+                    <div class="message-content">${this.getHtml(msg)}</div>
+                </div>
+            `;
+
+            this.rows.set(msg.id, row);
+            return row;
+        }
+
+        getHtml(msg) {
+            if (this.htmlCache.has(msg.id)) return this.htmlCache.get(msg.id);
+
+            if (this.worker && msg.content.length >= WORKER_MIN_LENGTH) {
+                if (!this.pending.has(msg.id)) {
+                    this.pending.add(msg.id);
+                    this.worker.postMessage({id: msg.id, content: msg.content});
+                }
+                // Plain text until the formatted version arrives
+                return `<div style="white-space: pre-wrap;">${leetDevops.escapeHtml(msg.content)}</div>`;
+            }
+
+            const html = leetDevops.formatMessage(msg.content);
+            this.htmlCache.set(msg.id, html);
+            return html;
+        }
+
+        onFormatted(id, html) {
+            this.pending.delete(id);
+
+            const msg = this.messages.find(m => m.id === id);
+            if (!msg) return;
+
+            this.htmlCache.set(id, html === null ? leetDevops.formatMessage(msg.content) : html);
+
+            const row = this.rows.get(id);
+            if (row) {
+                row.querySelector('.message-content').innerHTML = this.htmlCache.get(id);
+                this.render();
+            }
+        }
+    }
+
+    leetDevops.MessageList = MessageList;
+})(self);
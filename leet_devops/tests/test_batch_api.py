@@ -0,0 +1,155 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from leet_devops.api import batch_api, claude_client
+
+BATCH_ID = "msgbatch_test"
+
+DEFINITION = {
+	"name": "Test Batch Customer",
+	"module": "Leet Devops",
+	"fields": [
+		{"fieldname": "customer_name", "fieldtype": "Data", "label": "Customer Name"}
+	],
+	"field_order": ["customer_name"]
+}
+
+VALIDATED = dict(DEFINITION, fields=DEFINITION["fields"] + [
+	{"fieldname": "phone", "fieldtype": "Data", "label": "Phone"}
+], field_order=["customer_name", "phone"])
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+	"""Message Batches API of a stand-in server, every request succeeds with VALIDATED"""
+
+	def do_POST(self):
+		body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+		self.server.batch_requests = body["requests"]
+		self.send_json({"id": BATCH_ID, "processing_status": "in_progress"})
+
+	def do_GET(self):
+		if self.path.endswith(f"/batches/{BATCH_ID}"):
+			self.send_json({
+				"id": BATCH_ID,
+				"processing_status": "ended",
+				"request_counts": {"succeeded": len(self.server.batch_requests)},
+				"results_url": f"{self.server.base_url}/batches/{BATCH_ID}/results"
+			})
+		elif self.path.endswith(f"/batches/{BATCH_ID}/results"):
+			reply = "Corrected definition:\n```json\n" + json.dumps(VALIDATED) + "\n```"
+			lines = [
+				json.dumps({
+					"custom_id": request["custom_id"],
+					"result": {
+						"type": "succeeded",
+						"message": {
+							"content": [{"type": "text", "text": reply}],
+							"usage": {"input_tokens": 100, "output_tokens": 50}
+						}
+					}
+				})
+				for request in self.server.batch_requests
+			]
+			self.send_body("\n".join(lines).encode("utf-8"), "application/x-jsonlines")
+		else:
+			self.send_error(404)
+
+	def send_json(self, value):
+		self.send_body(json.dumps(value).encode("utf-8"), "application/json")
+
+	def send_body(self, body, content_type):
+		self.send_response(200)
+		self.send_header("Content-Type", content_type)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+class TestBatchApi(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+		cls.server.base_url = f"http://127.0.0.1:{cls.server.server_port}/v1/messages"
+		cls.server.batch_requests = []
+		threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.server.shutdown()
+		cls.server.server_close()
+		super().tearDownClass()
+
+	def setUp(self):
+		# Settings are changed in memory only, the stand-in is reached through the endpoint
+		self.settings = frappe.get_single("Claude API Settings")
+		self.settings.update({
+			"api_key": "test-key",
+			"api_endpoint": self.server.base_url
+		})
+		get_single = frappe.get_single
+		settings_patch = patch(
+			"frappe.get_single",
+			side_effect=lambda doctype: self.settings if doctype == "Claude API Settings" else get_single(doctype)
+		)
+		settings_patch.start()
+		self.addCleanup(settings_patch.stop)
+		self.addCleanup(claude_client.reset_http_session)
+
+		self.session = frappe.get_doc({
+			"doctype": "App Development Session",
+			"app_name": "test_batch_app",
+			"doctype_sessions": [{
+				"doctype_name": DEFINITION["name"],
+				"doctype_definition": json.dumps(DEFINITION, indent=2),
+				"status": "Applied"
+			}]
+		}).insert()
+		self.batch = frappe.get_doc({
+			"doctype": "Claude Batch",
+			"mode": "Validate",
+			"session": self.session.name
+		}).insert()
+
+	def tearDown(self):
+		# The batch jobs commit, so the rollback of the test doesn't remove these
+		frappe.delete_doc("Claude Batch", self.batch.name, force=True)
+		frappe.delete_doc("App Development Session", self.session.name, force=True)
+		frappe.db.commit()
+
+	def test_submit_poll_ingest(self):
+		row = self.session.doctype_sessions[0]
+
+		with patch("frappe.enqueue") as enqueue:
+			batch_api.process_batch_submission(self.batch.name)
+			self.batch.reload()
+			self.assertEqual(self.batch.status, "Submitted", self.batch.error)
+			self.assertEqual(self.batch.batch_id, BATCH_ID)
+			self.assertEqual([request["custom_id"] for request in self.server.batch_requests], [row.name])
+
+			batch_api.poll_batch(self.batch)
+			self.assertEqual(self.batch.status, "Ended")
+			self.assertEqual(self.batch.succeeded_count, 1)
+			ingestion = enqueue.call_args.kwargs
+			self.assertEqual(ingestion["batch_name"], self.batch.name)
+
+		batch_api.ingest_batch_results(ingestion["batch_name"], ingestion["results_url"])
+
+		self.batch.reload()
+		self.assertEqual(self.batch.status, "Ingested", self.batch.error)
+		self.assertEqual(self.batch.applied_count, 1)
+
+		row.reload()
+		self.assertEqual(json.loads(row.doctype_definition)["field_order"], ["customer_name", "phone"])
+		self.assertEqual(row.status, "Modified")
@@ -0,0 +1,70 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import json
+import unittest
+
+from leet_devops.api.code_block_parser import (
+	CodeBlock, CodeBlockParser, DocTypeDefinitionStream, get_code_blocks, get_open_block
+)
+
+DEFINITION = {"doctype": "DocType", "name": "Customer", "fields": [{"fieldname": "customer_name"}]}
+
+REPLY = (
+	"Here is the DocType:\n\n```json\n" + json.dumps(DEFINITION, indent=2) + "\n```\n\n"
+	"And the controller, with `inline` code:\n\n```python\nclass Customer(Document):\n\tpass\n```\nDone."
+)
+
+
+def feed_chunks(parser, text, size):
+	blocks = []
+	for i in range(0, len(text), size):
+		blocks.extend(parser.feed(text[i:i + size]))
+	return blocks
+
+
+class TestCodeBlockParser(unittest.TestCase):
+	def test_complete_text(self):
+		self.assertEqual(get_code_blocks(REPLY), [
+			CodeBlock("json", json.dumps(DEFINITION, indent=2)),
+			CodeBlock("python", "class Customer(Document):\n\tpass")
+		])
+
+	def test_every_split_point(self):
+		expected = get_code_blocks(REPLY)
+		for split in range(len(REPLY) + 1):
+			parser = CodeBlockParser()
+			blocks = parser.feed(REPLY[:split]) + parser.feed(REPLY[split:])
+			self.assertEqual(blocks, expected, f"split at {split}")
+
+	def test_chunk_sizes(self):
+		expected = get_code_blocks(REPLY)
+		for size in (1, 2, 3, 5, 7, 64):
+			self.assertEqual(feed_chunks(CodeBlockParser(), REPLY, size), expected, f"{size} char chunks")
+
+	def test_block_returned_when_its_fence_closes(self):
+		parser = CodeBlockParser(["json"])
+		end = REPLY.index("```", REPLY.index("```json") + 3)
+
+		self.assertEqual(parser.feed(REPLY[:end + 2]), [])
+		self.assertEqual([block.language for block in parser.feed(REPLY[end + 2:end + 3])], ["json"])
+		self.assertEqual(parser.feed(REPLY[end + 3:]), [])
+
+	def test_languages_filter(self):
+		self.assertEqual([block.language for block in get_code_blocks(REPLY, ["python"])], ["python"])
+
+	def test_open_block(self):
+		cut = REPLY[:REPLY.index('"fields"')]
+		self.assertEqual(get_open_block(cut, ["json"]).language, "json")
+		self.assertIsNone(get_open_block(cut, ["python"]))
+		self.assertIsNone(get_open_block(REPLY))
+
+	def test_reset(self):
+		parser = CodeBlockParser()
+		parser.feed("```json\n{\"partial\": ")
+		parser.reset()
+		self.assertEqual(parser.feed(REPLY), get_code_blocks(REPLY))
+
+	def test_definition_stream(self):
+		stream = DocTypeDefinitionStream()
+		self.assertEqual(feed_chunks(stream, REPLY, 10), [DEFINITION])
@@ -0,0 +1,77 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import unittest
+
+from leet_devops.api import context_builder
+from leet_devops.api.context_builder import build_context, estimate_message_tokens, truncate_to_budget
+
+
+def make_history(turns, words=20):
+	history = []
+	for turn in range(turns):
+		history.append({"role": "user", "content": f"question {turn} " + "word " * words})
+		history.append({"role": "assistant", "content": f"answer {turn} " + "word " * words})
+	return history
+
+
+class TestBuildContext(unittest.TestCase):
+	def test_everything_fits(self):
+		history = make_history(3)
+		self.assertEqual(build_context(history, 10 ** 6), (0, history))
+
+	def test_newest_messages_fill_the_budget(self):
+		history = make_history(10)
+		cost = estimate_message_tokens(history[0])
+		start, messages = build_context(history, cost * 4 + cost // 2)
+
+		self.assertEqual(start, 16)
+		self.assertEqual(messages, history[16:])
+		self.assertLessEqual(sum(estimate_message_tokens(msg) for msg in messages), cost * 4 + cost // 2)
+
+	def test_starts_with_a_user_turn(self):
+		history = make_history(10)
+		cost = estimate_message_tokens(history[0])
+		# Room for three messages, the oldest of them would be an assistant turn
+		start, messages = build_context(history, cost * 3)
+
+		self.assertEqual(start, 18)
+		self.assertEqual(messages[0]["role"], "user")
+
+	def test_min_start(self):
+		history = make_history(5)
+		start, messages = build_context(history, 10 ** 6, min_start=4)
+
+		self.assertEqual(start, 4)
+		self.assertEqual(messages, history[4:])
+
+	def test_oversized_last_exchange_is_truncated(self):
+		history = make_history(2) + [
+			{"role": "user", "content": "Create the DocType"},
+			{"role": "assistant", "content": "field " * 5000 + "end"}
+		]
+		start, messages = build_context(history, 200)
+
+		self.assertEqual(start, 4)
+		self.assertEqual([msg["role"] for msg in messages], ["user", "assistant"])
+		self.assertIn("[... truncated ...]", messages[1]["content"])
+		self.assertTrue(messages[1]["content"].endswith("end"))
+		self.assertLess(len(messages[1]["content"]), len(history[5]["content"]))
+
+	def test_empty_history(self):
+		self.assertEqual(build_context([], 1000), (0, []))
+
+
+class TestTruncateToBudget(unittest.TestCase):
+	def test_short_text_is_unchanged(self):
+		self.assertEqual(truncate_to_budget("a short text", 100), "a short text")
+
+	def test_keeps_head_and_tail(self):
+		text = "head " + "middle " * 2000 + "tail"
+		truncated = truncate_to_budget(text, 100)
+
+		self.assertTrue(truncated.startswith("head"))
+		self.assertTrue(truncated.endswith("tail"))
+		# Within the budget apart from the marker
+		marker = context_builder.estimate_tokens("\n[... truncated ...]\n")
+		self.assertLessEqual(context_builder.estimate_tokens(truncated), 100 + marker)
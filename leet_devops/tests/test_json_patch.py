@@ -0,0 +1,100 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import copy
+import unittest
+
+from leet_devops.api.json_patch import JsonPatchError, apply_patch, parse_pointer
+
+DOCUMENT = {
+	"name": "Customer",
+	"fields": [
+		{"fieldname": "customer_name", "fieldtype": "Data"},
+		{"fieldname": "phone", "fieldtype": "Data"}
+	],
+	"field_order": ["customer_name", "phone"],
+	"a/b": 1,
+	"m~n": 2
+}
+
+
+class TestApplyPatch(unittest.TestCase):
+	def apply(self, *operations):
+		return apply_patch(DOCUMENT, list(operations))
+
+	def assertFails(self, *operations, index=0):
+		with self.assertRaises(JsonPatchError) as context:
+			self.apply(*operations)
+		self.assertEqual(context.exception.index, index)
+
+	def test_add(self):
+		field = {"fieldname": "email", "fieldtype": "Data"}
+		self.assertEqual(self.apply({"op": "add", "path": "/fields/-", "value": field})["fields"][-1], field)
+		self.assertEqual(self.apply({"op": "add", "path": "/fields/0", "value": field})["fields"][0], field)
+		self.assertEqual(self.apply({"op": "add", "path": "/module", "value": "Sales"})["module"], "Sales")
+
+	def test_remove(self):
+		result = self.apply({"op": "remove", "path": "/fields/0"})
+		self.assertEqual([field["fieldname"] for field in result["fields"]], ["phone"])
+
+	def test_replace(self):
+		result = self.apply({"op": "replace", "path": "/fields/1/fieldtype", "value": "Phone"})
+		self.assertEqual(result["fields"][1]["fieldtype"], "Phone")
+
+	def test_move_and_copy(self):
+		result = self.apply({"op": "move", "from": "/field_order/1", "path": "/field_order/0"})
+		self.assertEqual(result["field_order"], ["phone", "customer_name"])
+
+		result = self.apply({"op": "copy", "from": "/fields/1", "path": "/fields/-"})
+		self.assertEqual(result["fields"][2], DOCUMENT["fields"][1])
+
+	def test_test(self):
+		self.assertEqual(self.apply({"op": "test", "path": "/name", "value": "Customer"}), DOCUMENT)
+
+	def test_escaped_pointers(self):
+		self.assertEqual(parse_pointer("/a~1b/m~0n"), ["a/b", "m~n"])
+		result = self.apply({"op": "replace", "path": "/a~1b", "value": 3}, {"op": "remove", "path": "/m~0n"})
+		self.assertEqual(result["a/b"], 3)
+		self.assertNotIn("m~n", result)
+
+	def test_operations_apply_in_order(self):
+		result = self.apply(
+			{"op": "remove", "path": "/fields/0"},
+			{"op": "replace", "path": "/fields/0/fieldtype", "value": "Phone"}
+		)
+		self.assertEqual(result["fields"], [{"fieldname": "phone", "fieldtype": "Phone"}])
+
+	def test_failing_test_operation(self):
+		self.assertFails(
+			{"op": "replace", "path": "/name", "value": "Client"},
+			{"op": "test", "path": "/name", "value": "Customer"},
+			index=1
+		)
+
+	def test_failing_remove(self):
+		self.assertFails({"op": "remove", "path": "/missing"})
+		self.assertFails({"op": "remove", "path": "/fields/2"})
+		self.assertFails({"op": "remove", "path": "/fields/-"})
+		self.assertFails({"op": "remove", "path": ""})
+
+	def test_invalid_paths_and_operations(self):
+		self.assertFails({"op": "add", "path": "/fields/3", "value": {}})
+		self.assertFails({"op": "add", "path": "/fields/01", "value": {}})
+		self.assertFails({"op": "replace", "path": "/missing", "value": 1})
+		self.assertFails({"op": "add", "path": "fields", "value": 1})
+		self.assertFails({"op": "add", "path": "/name/x", "value": 1})
+		self.assertFails({"op": "move", "from": "/fields", "path": "/fields/0"})
+		self.assertFails({"op": "update", "path": "/name", "value": 1})
+		self.assertFails({"op": "add", "path": "/name"})
+
+		with self.assertRaises(JsonPatchError):
+			apply_patch(DOCUMENT, {"op": "add", "path": "/x", "value": 1})
+
+	def test_failing_patch_leaves_document_untouched(self):
+		original = copy.deepcopy(DOCUMENT)
+		self.assertFails(
+			{"op": "remove", "path": "/fields/0"},
+			{"op": "remove", "path": "/missing"},
+			index=1
+		)
+		self.assertEqual(DOCUMENT, original)
@@ -0,0 +1,78 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import json
+import unittest
+
+from leet_devops.api.json_repair import is_truncated, repair_json
+
+DEFINITION = {
+	"doctype": "DocType",
+	"name": "Customer",
+	"fields": [
+		{"fieldname": "customer_name", "fieldtype": "Data", "label": "Customer Name"},
+		{"fieldname": "phone", "fieldtype": "Data", "label": "Phone"}
+	]
+}
+
+
+class TestRepairJson(unittest.TestCase):
+	def test_valid_json_is_unchanged(self):
+		self.assertEqual(repair_json(json.dumps(DEFINITION)), (DEFINITION, []))
+
+	def test_comments_and_trailing_commas(self):
+		text = """{
+			// the DocType
+			"doctype": "DocType", /* inline */
+			"name": "Customer",
+			"fields": [{"fieldname": "a"},],
+		}"""
+		value, repairs = repair_json(text)
+
+		self.assertEqual(value, {"doctype": "DocType", "name": "Customer", "fields": [{"fieldname": "a"}]})
+		self.assertEqual(repairs, ["removed 2 comment(s)", "removed 2 trailing comma(s)"])
+		self.assertFalse(is_truncated(repairs))
+
+	def test_comment_markers_inside_strings_are_kept(self):
+		value, repairs = repair_json('{"url": "https://example.com", "note": "a /* b */ c",}')
+
+		self.assertEqual(value, {"url": "https://example.com", "note": "a /* b */ c"})
+		self.assertEqual(repairs, ["removed 1 trailing comma(s)"])
+
+	def test_unterminated_string_is_closed(self):
+		text = json.dumps(DEFINITION)
+		value, repairs = repair_json(text[:text.index("Phone") + 3])
+
+		self.assertEqual(value["fields"][1]["label"], "Pho")
+		self.assertIn("closed an unterminated string", repairs)
+		self.assertTrue(is_truncated(repairs))
+
+	def test_open_brackets_are_closed(self):
+		text = json.dumps(DEFINITION)
+		value, repairs = repair_json(text[:text.index('{"fieldname": "phone"') - 2])
+
+		self.assertEqual(value["fields"], DEFINITION["fields"][:1])
+		self.assertIn("closed 2 open bracket(s)", repairs)
+		self.assertTrue(is_truncated(repairs))
+
+	def test_incomplete_member_is_dropped(self):
+		text = json.dumps(DEFINITION)
+		value, repairs = repair_json(text[:text.index('"label": "Phone"') + len('"label"')])
+
+		self.assertEqual(value["fields"][1], {"fieldname": "phone", "fieldtype": "Data"})
+		self.assertTrue(any(repair.startswith("dropped the incomplete end") for repair in repairs))
+		self.assertTrue(is_truncated(repairs))
+
+	def test_every_cut_parses_or_raises(self):
+		text = json.dumps(DEFINITION, indent=2)
+		for end in range(1, len(text)):
+			try:
+				value, repairs = repair_json(text[:end])
+			except ValueError:
+				continue
+			self.assertIsInstance(value, (dict, list, str, int, float, type(None)))
+			self.assertTrue(is_truncated(repairs), f"cut at {end}")
+
+	def test_unrepairable(self):
+		with self.assertRaises(ValueError):
+			repair_json("not json at all")
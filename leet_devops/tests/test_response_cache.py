@@ -0,0 +1,70 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from leet_devops.api import response_cache
+
+SESSION = "_Test Response Cache Session"
+
+
+class TestResponseCache(FrappeTestCase):
+	def setUp(self):
+		self.settings = frappe._dict(response_cache_ttl=60, response_cache_max_entries=10)
+		self.payload = {
+			"model": "claude-test",
+			"temperature": 0,
+			"system": "You are a Frappe developer.",
+			"messages": []
+		}
+		self.history = [
+			{"name": "MSG-1", "role": "user", "content": "Create a Customer DocType"},
+			{"name": "MSG-2", "role": "assistant", "content": "Here is the Customer DocType"}
+		]
+		self.hashes = []
+
+	def tearDown(self):
+		cache = frappe.cache()
+		for request_hash in self.hashes:
+			cache.delete(cache.make_key(response_cache.CACHE_PREFIX + request_hash))
+			cache.zrem(cache.make_key(response_cache.INDEX_KEY), request_hash)
+		cache.delete(cache.make_key(f"{response_cache.REQUEST_PREFIX}{SESSION}:stream-1"))
+
+	def get_hash(self, history, message):
+		request_hash = response_cache.get_request_hash(self.payload, SESSION, None, history, message)
+		self.hashes.append(request_hash)
+		return request_hash
+
+	def test_identical_request_hits_cache(self):
+		result = {"message": "Added the phone field", "usage": {}, "definitions": []}
+		response_cache.store_response(self.settings, self.get_hash(self.history, "Add a phone field"), result)
+
+		self.assertEqual(response_cache.get_response(self.get_hash(self.history, "Add a phone field")), result)
+
+	def test_repeated_message_misses_cache(self):
+		message = "continue"
+		result = {"message": "Here are the next fields", "usage": {}, "definitions": []}
+		response_cache.store_response(self.settings, self.get_hash(self.history, message), result)
+
+		# The same message sent again after its turn completed is a new turn
+		history = self.history + [
+			{"name": "MSG-3", "role": "user", "content": message},
+			{"name": "MSG-4", "role": "assistant", "content": result["message"]}
+		]
+		self.assertIsNone(response_cache.get_response(self.get_hash(history, message)))
+
+	def test_other_message_misses_cache(self):
+		result = {"message": "Added the phone field", "usage": {}, "definitions": []}
+		response_cache.store_response(self.settings, self.get_hash(self.history, "Add a phone field"), result)
+
+		self.assertIsNone(response_cache.get_response(self.get_hash(self.history, "Add an email field")))
+		self.assertIsNone(response_cache.get_response(self.get_hash(self.history[:1], "Add a phone field")))
+
+	def test_resend_gets_sent_reply(self):
+		reply = {"success": True, "message": "Added the phone field", "usage": {}, "saved_definitions": []}
+		response_cache.store_sent_reply(self.settings, SESSION, "stream-1", reply)
+
+		self.assertEqual(response_cache.get_sent_reply(SESSION, "stream-1"), reply)
+		self.assertIsNone(response_cache.get_sent_reply(SESSION, "stream-2"))
+		self.assertIsNone(response_cache.get_sent_reply("_Test Other Session", "stream-1"))
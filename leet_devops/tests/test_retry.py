@@ -0,0 +1,134 @@
+# Copyright (c) 2025, Your Company and contributors
+# For license information, please see license.txt
+
+import time
+from email.utils import formatdate
+from unittest.mock import patch
+
+import frappe
+import requests
+from frappe.tests.utils import FrappeTestCase
+
+from leet_devops.api import claude_client, retry
+
+
+class FakeResponse:
+	def __init__(self, status_code, headers=None):
+		self.status_code = status_code
+		self.headers = headers or {}
+
+
+def sequence(*outcomes):
+	"""A `send` that returns or raises the given outcomes in turn and counts its calls"""
+	calls = []
+
+	def send(attempt):
+		calls.append(attempt)
+		outcome = outcomes[min(attempt, len(outcomes) - 1)]
+		if isinstance(outcome, Exception):
+			raise outcome
+		return outcome, None
+
+	return send, calls
+
+
+class TestCallWithRetry(FrappeTestCase):
+	def setUp(self):
+		# A breaker of its own for every test
+		self.settings = frappe._dict(
+			api_endpoint=f"https://test.invalid/{frappe.generate_hash(length=10)}",
+			max_retries=3,
+			circuit_breaker_threshold=100
+		)
+		sleep = patch("leet_devops.api.retry.time.sleep")
+		self.sleep = sleep.start()
+		self.addCleanup(sleep.stop)
+
+	def tearDown(self):
+		breaker = retry.CircuitBreaker(self.settings)
+		frappe.cache().delete(breaker.failures_key, breaker.open_key, breaker.probe_key)
+
+	def test_retryable_status_is_retried(self):
+		send, calls = sequence(FakeResponse(529), FakeResponse(503), FakeResponse(200))
+		response, _ = retry.call_with_retry(self.settings, send)
+
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(calls, [0, 1, 2])
+
+	def test_client_error_is_not_retried(self):
+		send, calls = sequence(FakeResponse(400), FakeResponse(200))
+		response, _ = retry.call_with_retry(self.settings, send)
+
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(calls, [0])
+
+	def test_gives_up_after_max_retries(self):
+		send, calls = sequence(FakeResponse(429))
+		response, _ = retry.call_with_retry(self.settings, send)
+
+		self.assertEqual(response.status_code, 429)
+		self.assertEqual(len(calls), 4)
+
+	def test_waits_for_retry_after(self):
+		send, calls = sequence(FakeResponse(429, {"retry-after": "7"}), FakeResponse(200))
+		retry.call_with_retry(self.settings, send)
+
+		self.sleep.assert_called_once_with(7.0)
+
+	def test_long_retry_after_is_not_waited_for(self):
+		send, calls = sequence(FakeResponse(429, {"retry-after": str(retry.MAX_RETRY_AFTER + 1)}), FakeResponse(200))
+		response, _ = retry.call_with_retry(self.settings, send)
+
+		self.assertEqual(response.status_code, 429)
+		self.assertEqual(calls, [0])
+		self.sleep.assert_not_called()
+
+	def test_timeout_is_retried(self):
+		send, calls = sequence(requests.exceptions.Timeout(), FakeResponse(200))
+		response, _ = retry.call_with_retry(self.settings, send)
+
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(calls, [0, 1])
+
+	def test_last_exception_is_raised(self):
+		send, calls = sequence(requests.exceptions.ConnectionError())
+		with self.assertRaises(requests.exceptions.ConnectionError):
+			retry.call_with_retry(self.settings, send)
+		self.assertEqual(len(calls), 4)
+
+	def test_stream_errors(self):
+		send, calls = sequence(claude_client.StreamError("overloaded_error", "Overloaded"), FakeResponse(200))
+		self.assertEqual(retry.call_with_retry(self.settings, send)[0].status_code, 200)
+
+		send, calls = sequence(claude_client.StreamError("invalid_request_error", "Bad request"), FakeResponse(200))
+		with self.assertRaises(claude_client.StreamError):
+			retry.call_with_retry(self.settings, send)
+		self.assertEqual(calls, [0])
+
+	def test_open_circuit_refuses_calls(self):
+		self.settings.circuit_breaker_threshold = 2
+		send, calls = sequence(FakeResponse(500))
+		with self.assertRaises(retry.CircuitOpenError):
+			retry.call_with_retry(self.settings, send)
+
+		# Opened after the second failure, the third attempt never went out
+		self.assertEqual(len(calls), 2)
+
+		send, calls = sequence(FakeResponse(200))
+		with self.assertRaises(retry.CircuitOpenError):
+			retry.call_with_retry(self.settings, send)
+		self.assertEqual(calls, [])
+
+
+class TestGetRetryAfter(FrappeTestCase):
+	def test_seconds(self):
+		self.assertEqual(retry.get_retry_after(FakeResponse(429, {"retry-after": "12"})), 12.0)
+		self.assertEqual(retry.get_retry_after(FakeResponse(429, {"retry-after": "-3"})), 0)
+
+	def test_http_date(self):
+		value = retry.get_retry_after(FakeResponse(429, {"retry-after": formatdate(time.time() + 30, usegmt=True)}))
+		self.assertAlmostEqual(value, 30, delta=2)
+
+	def test_missing_or_invalid(self):
+		self.assertIsNone(retry.get_retry_after(FakeResponse(429)))
+		self.assertIsNone(retry.get_retry_after(FakeResponse(429, {"retry-after": "soon"})))